@@ -2,7 +2,11 @@ import importlib
 import sys
 from dataclasses import dataclass, field
 from types import ModuleType
-from typing import Literal
+from typing import Any, Literal
+
+import numpy as np
+
+from asset_store import SharedArrayRef
 
 VisionAngle = Literal[
     "front",
@@ -73,3 +77,33 @@ def import_animation_functions() -> ModuleType:
     if "animation_functions" in sys.modules:
         del sys.modules["animation_functions"]
     return importlib.import_module("animation_functions")
+
+
+def is_working_animation_function(
+    code: str,
+    function_name: str,
+    values: np.ndarray | SharedArrayRef,
+    duration: int,
+    fps: int,
+) -> bool:
+    """Check that `function_name` defined in `code` runs for every frame and keeps
+    the shape of its input. Unlike loading it into the `State`, this doesn't touch
+    the scene, so it is safe to run in worker processes."""
+    try:
+        if isinstance(values, SharedArrayRef):
+            # The segment may have been released since the check was submitted.
+            with values.attach() as array:
+                return is_working_animation_function(
+                    code, function_name, array, duration, fps
+                )
+        namespace: dict[str, Any] = {"np": np}
+        exec(code, namespace)
+        function = namespace[function_name]
+        seconds_per_frame = 1.0 / fps
+        for frame in range(duration * fps):
+            t = frame * seconds_per_frame
+            if np.shape(function(t, values.copy())) != values.shape:
+                return False
+    except Exception:
+        return False
+    return True
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Iterator, cast
+
+import numpy as np
+
+from splat_utils import SplatFile, load_splat
+from viser._scene_api import pack_gaussian_splats
+
+
+@dataclass(frozen=True)
+class SharedArrayRef:
+    """Picklable reference to an array in shared memory. Send it to worker
+    processes instead of the array, and `attach()` to it there."""
+
+    shm_name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+    @contextmanager
+    def attach(self) -> Iterator[np.ndarray]:
+        """Read-only view of the array, valid until the context exits."""
+        # Worker processes started by the server share its resource tracker, so
+        # attaching doesn't unlink the segment when the worker exits.
+        shm = shared_memory.SharedMemory(name=self.shm_name)
+        try:
+            array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+            array.flags.writeable = False
+            yield array
+            del array
+        finally:
+            shm.close()
+
+
+@dataclass
+class SharedSplat:
+    """Splat arrays loaded once per process, in read-only shared memory."""
+
+    key: str
+    splat: SplatFile
+    refs: dict[str, SharedArrayRef]
+    """References to each array of `splat`, for worker processes."""
+    packed: np.ndarray | None = None
+    """Gaussians packed for sending to clients. Created on first use. Only read
+    by this process, so kept out of shared memory."""
+    ref_count: int = 0
+    _segments: list[shared_memory.SharedMemory] = field(default_factory=list)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the asset's arrays and packed buffer."""
+        packed_nbytes = 0 if self.packed is None else self.packed.nbytes
+        arrays = cast("dict[str, np.ndarray]", self.splat)
+        return sum(array.nbytes for array in arrays.values()) + packed_nbytes
+
+
+class AssetStore:
+    """Process-wide, reference-counted registry of immutable splat assets.
+
+    Sessions that load the same file share one copy of its arrays and of its
+    packed buffer. Arrays live in `multiprocessing.shared_memory`, so worker
+    processes can attach to them without copying. An asset is freed when its
+    last user releases it.
+    """
+
+    def __init__(self) -> None:
+        self._assets: dict[str, SharedSplat] = {}
+        self._loading: dict[str, threading.Event] = {}
+        """Assets being loaded. Set once they're stored, or failed to load."""
+        self._still_mapped: list[shared_memory.SharedMemory] = []
+        """Unlinked segments that couldn't be closed yet, because views into
+        them were still alive. Closing is retried on the next unlink."""
+        self._lock = threading.Lock()
+        atexit.register(self._unlink_all)
+
+    def acquire(self, path: Path) -> SharedSplat:
+        """Get the splat stored at `path`, loading it if no one holds it yet.
+        Assets are loaded outside the lock, so other assets can be acquired
+        meanwhile. Concurrent acquires of the same asset wait for one load."""
+        key = str(path.resolve())
+        while True:
+            with self._lock:
+                asset = self._assets.get(key)
+                if asset is not None:
+                    asset.ref_count += 1
+                    return asset
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # If that load fails, the next iteration retries it.
+            loading.wait()
+
+        try:
+            asset = self._share(key, load_splat(path))
+            asset.ref_count = 1
+            with self._lock:
+                self._assets[key] = asset
+            return asset
+        finally:
+            with self._lock:
+                self._loading.pop(key)
+            loading.set()
+
+    def release(self, asset: SharedSplat) -> None:
+        with self._lock:
+            asset.ref_count -= 1
+            if asset.ref_count > 0:
+                return
+            self._assets.pop(asset.key)
+        self._unlink(asset)
+
+    def packed(self, asset: SharedSplat) -> np.ndarray:
+        """Packed Gaussians of an asset, see `SceneApi.add_packed_gaussian_splats()`."""
+        with self._lock:
+            if asset.packed is None:
+                splat = asset.splat
+                asset.packed = pack_gaussian_splats(
+                    splat["centers"],
+                    splat["covariances"],
+                    splat["rgbs"],
+                    splat["opacities"],
+                )
+                asset.packed.flags.writeable = False
+            return asset.packed
+
+    def _share(self, key: str, splat: SplatFile) -> SharedSplat:
+        segments: list[shared_memory.SharedMemory] = []
+        shared: dict[str, np.ndarray] = {
+            name: _to_shared(np.asarray(array), segments)
+            for name, array in splat.items()
+        }
+        refs = {
+            name: SharedArrayRef(segment.name, array.shape, array.dtype.str)
+            for (name, array), segment in zip(shared.items(), segments)
+        }
+        return SharedSplat(key, cast(SplatFile, shared), refs, _segments=segments)
+
+    def _unlink_all(self) -> None:
+        with self._lock:
+            assets = list(self._assets.values())
+            self._assets.clear()
+        for asset in assets:
+            self._unlink(asset)
+
+    def _unlink(self, asset: SharedSplat) -> None:
+        # Views into the segments have to be gone before they can be closed.
+        asset.splat = {}  # type: ignore
+        asset.packed = None
+        for shm in asset._segments:
+            shm.unlink()
+        with self._lock:
+            segments = self._still_mapped + asset._segments
+            self._still_mapped.clear()
+            asset._segments.clear()
+            for shm in segments:
+                try:
+                    shm.close()
+                except BufferError:
+                    self._still_mapped.append(shm)
+
+
+def _to_shared(
+    array: np.ndarray, segments: list[shared_memory.SharedMemory]
+) -> np.ndarray:
+    """Copy an array into a new shared memory segment. Returns a read-only view."""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    segments.append(shm)
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    shared[...] = array
+    shared.flags.writeable = False
+    return shared
+
+
+class AssetPreloader:
+    """Loads assets into an `AssetStore` on background threads, and holds a
+    reference to each so they stay loaded until `close()`.
+
+    Assets are preloaded in the order they're requested, until they use
+    `max_bytes` of memory; the asset that crosses the limit is released again.
+    """
+
+    def __init__(self, store: AssetStore, max_bytes: int, max_workers: int = 2):
+        self._store = store
+        self._max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="asset_preloader"
+        )
+        self._held: list[SharedSplat] = []
+        self._held_bytes = 0
+        self._lock = threading.Lock()
+
+    def preload(self, path: Path, pack: bool = False) -> Future[bool]:
+        """Start loading the splat at `path`. With `pack`, its packed buffer is
+        created too. Resolves to whether the asset is held in memory."""
+        return self._executor.submit(self._preload, path, pack)
+
+    def close(self) -> None:
+        """Stop preloading, and release the assets held."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            held = self._held
+            self._held = []
+            self._held_bytes = 0
+        for asset in held:
+            self._store.release(asset)
+
+    def _preload(self, path: Path, pack: bool) -> bool:
+        key = str(path.resolve())
+        with self._lock:
+            if any(asset.key == key for asset in self._held):
+                return True
+            if self._held_bytes >= self._max_bytes:
+                return False
+        asset = self._store.acquire(path)
+        if pack:
+            self._store.packed(asset)
+        with self._lock:
+            # The same path may have been preloaded concurrently.
+            already_held = any(held.key == key for held in self._held)
+            is_held = already_held or (
+                self._held_bytes + asset.nbytes <= self._max_bytes
+            )
+            if not already_held and is_held:
+                self._held.append(asset)
+                self._held_bytes += asset.nbytes
+                return True
+        self._store.release(asset)
+        return is_held
+
+
+asset_store = AssetStore()
+
+# Set ASSET_PRELOAD_MAX_BYTES=0 to disable preloading.
+asset_preloader = AssetPreloader(
+    asset_store,
+    max_bytes=int(os.getenv("ASSET_PRELOAD_MAX_BYTES", str(4 * 1024**3))),
+)
@@ -0,0 +1,303 @@
+"""Benchmarks for the splat hot path: load, animate, pack, and serialize.
+
+Runs offline, against a loopback viser server. From the repository root:
+
+    python -m benchmarks.splat_pipeline --sizes 100000 1000000 5000000
+
+Results are printed and written as JSON, with the mean and best time of each
+case and the peak resident memory while it ran.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Iterator
+
+import msgspec
+import numpy as np
+import psutil
+import tyro
+
+import examples
+from animation import Animation
+from benchmarks.synthetic_splats import make_splat, write_ply_file, write_splat_file
+from splat_utils import (
+    compute_splat_at_t,
+    cull_transparent,
+    load_ply_file,
+    load_splat_file,
+)
+from src import viser
+from src.viser import _client_autobuild, _messages
+
+EXAMPLE_ANIMATIONS = {
+    name.removeprefix("EXAMPLE_").lower(): value
+    for name, value in vars(examples).items()
+    if name.startswith("EXAMPLE_") and isinstance(value, Animation)
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkResult:
+    case: str
+    num_gaussians: int
+    repeats: int
+    mean_seconds: float
+    min_seconds: float
+    peak_rss_mb: float
+    """Highest resident memory of the process while the case ran."""
+    baseline_rss_mb: float
+    """Resident memory before the case ran."""
+
+
+class _PeakRssSampler:
+    """Samples resident memory on a background thread, to catch short peaks."""
+
+    def __init__(self, interval_seconds: float = 0.005) -> None:
+        self._process = psutil.Process()
+        self._interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self.baseline_rss = self._process.memory_info().rss
+        self.peak_rss = self.baseline_rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self) -> _PeakRssSampler:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self._interval_seconds):
+            self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+
+def _measure(
+    case: str, num_gaussians: int, repeats: int, run: Callable[[], object]
+) -> BenchmarkResult:
+    durations = []
+    with _PeakRssSampler() as sampler:
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            run()
+            durations.append(time.perf_counter() - start_time)
+    result = BenchmarkResult(
+        case=case,
+        num_gaussians=num_gaussians,
+        repeats=repeats,
+        mean_seconds=float(np.mean(durations)),
+        min_seconds=float(np.min(durations)),
+        peak_rss_mb=sampler.peak_rss / 1024**2,
+        baseline_rss_mb=sampler.baseline_rss / 1024**2,
+    )
+    print(
+        f"{case:>40} n={num_gaussians:<8} mean={result.mean_seconds * 1000:9.1f}ms"
+        f" min={result.min_seconds * 1000:9.1f}ms peak_rss={result.peak_rss_mb:8.0f}MB"
+    )
+    return result
+
+
+def _animation_module(animation: Animation) -> ModuleType:
+    """Load an animation's functions without writing `animation_functions.py`."""
+    module = ModuleType(f"animation_functions_{animation.title}")
+    module.np = np  # type: ignore
+    for code in (animation.centers_code, animation.rgbs_code, animation.opacities_code):
+        exec(code, module.__dict__)
+    return module
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _loopback_server() -> Iterator[viser.ViserServer]:
+    # No browser connects, so skip building the web client.
+    _client_autobuild.ensure_client_is_built = lambda: None
+    server = viser.ViserServer(host="127.0.0.1", port=_free_port(), verbose=False)
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+def run_benchmarks(
+    sizes: tuple[int, ...], repeats: int, animation_times: int
+) -> list[BenchmarkResult]:
+    results: list[BenchmarkResult] = []
+    with tempfile.TemporaryDirectory() as tmp_dir, _loopback_server() as server:
+        for num_gaussians in sizes:
+            splat = make_splat(num_gaussians)
+
+            # Loading.
+            splat_path = Path(tmp_dir) / f"{num_gaussians}.splat"
+            ply_path = Path(tmp_dir) / f"{num_gaussians}.ply"
+            write_splat_file(splat_path, splat)
+            write_ply_file(ply_path, splat)
+            results.append(
+                _measure(
+                    "load_splat_file",
+                    num_gaussians,
+                    repeats,
+                    lambda: load_splat_file(splat_path, center=True),
+                )
+            )
+            results.append(
+                _measure(
+                    "load_ply_file",
+                    num_gaussians,
+                    repeats,
+                    lambda: load_ply_file(ply_path, center=True),
+                )
+            )
+            splat_path.unlink()
+            ply_path.unlink()
+
+            # Animation. Each repeat computes frames spread over the duration.
+            for name, animation in EXAMPLE_ANIMATIONS.items():
+                animation_functions = _animation_module(animation)
+                times = np.linspace(
+                    0.0, animation.duration, animation_times, endpoint=False
+                )
+                results.append(
+                    _measure(
+                        f"compute_splat_at_t[{name}]",
+                        num_gaussians,
+                        repeats,
+                        lambda: [
+                            compute_splat_at_t(t, splat, animation_functions)
+                            for t in times
+                        ],
+                    )
+                )
+
+            # Culling, with every other Gaussian transparent.
+            faded_splat = {
+                **splat,
+                "opacities": np.where(
+                    np.arange(num_gaussians)[:, None] % 2 == 0,
+                    splat["opacities"],
+                    0.0,
+                ),
+            }
+            results.append(
+                _measure(
+                    "cull_transparent",
+                    num_gaussians,
+                    repeats,
+                    lambda: cull_transparent(faded_splat),  # type: ignore
+                )
+            )
+            del faded_splat
+
+            # Packing, which includes queueing the message to the server.
+            def add_splats() -> None:
+                server.scene.add_gaussian_splats(
+                    "/benchmark_splats",
+                    centers=splat["centers"],
+                    covariances=splat["covariances"],
+                    rgbs=splat["rgbs"],
+                    opacities=splat["opacities"],
+                )
+
+            results.append(
+                _measure(
+                    "SceneApi.add_gaussian_splats", num_gaussians, repeats, add_splats
+                )
+            )
+
+            def add_quantized_splats() -> None:
+                server.scene.add_gaussian_splats(
+                    "/benchmark_splats",
+                    centers=splat["centers"],
+                    covariances=splat["covariances"],
+                    rgbs=splat["rgbs"],
+                    opacities=splat["opacities"],
+                    encoding="quantized",
+                )
+
+            results.append(
+                _measure(
+                    "SceneApi.add_gaussian_splats[quantized]",
+                    num_gaussians,
+                    repeats,
+                    add_quantized_splats,
+                )
+            )
+
+            # Serialization, as done for every outgoing message window.
+            handle = server.scene.add_gaussian_splats(
+                "/benchmark_splats",
+                centers=splat["centers"],
+                covariances=splat["covariances"],
+                rgbs=splat["rgbs"],
+                opacities=splat["opacities"],
+            )
+            message = _messages.GaussianSplatsMessage(
+                "/benchmark_splats", handle._impl.props
+            )
+            results.append(
+                _measure(
+                    "as_serializable_dict+msgpack",
+                    num_gaussians,
+                    repeats,
+                    lambda: msgspec.msgpack.encode(message.as_serializable_dict()),
+                )
+            )
+            handle.remove()
+            del splat, handle, message
+    return results
+
+
+def main(
+    sizes: tuple[int, ...] = (100_000, 1_000_000, 5_000_000),
+    repeats: int = 3,
+    animation_times: int = 4,
+    output: Path = Path("benchmarks/results.json"),
+) -> None:
+    """Run the splat pipeline benchmarks.
+
+    Args:
+        sizes: Numbers of synthetic Gaussians to benchmark with.
+        repeats: Runs per case. Results report the mean and best time.
+        animation_times: Frames computed per run of each example animation.
+        output: Where to write machine-readable results.
+    """
+    results = run_benchmarks(sizes, repeats, animation_times)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "environment": {
+                    "python": sys.version.split()[0],
+                    "numpy": np.__version__,
+                    "platform": platform.platform(),
+                    "cpu_count": os.cpu_count(),
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                },
+                "results": [dataclasses.asdict(result) for result in results],
+            },
+            indent=2,
+        )
+    )
+    print(f"Wrote {len(results)} results to {output}")
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
@@ -0,0 +1,79 @@
+"""Synthetic Gaussian splats, and writers for the file formats we load."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+from plyfile import PlyData, PlyElement
+
+from splat_utils import SplatFile
+from src.viser import transforms as tf
+
+
+def make_splat(num_gaussians: int, seed: int = 0) -> SplatFile:
+    """Random Gaussians in a unit ball, shaped like a loaded splat file."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_gaussians, 3)).astype(np.float32)
+    centers /= np.maximum(np.linalg.norm(centers, axis=-1, keepdims=True), 1.0)
+    scales = rng.uniform(0.001, 0.02, size=(num_gaussians, 3)).astype(np.float32)
+    wxyzs = rng.normal(size=(num_gaussians, 4))
+    wxyzs /= np.linalg.norm(wxyzs, axis=-1, keepdims=True)
+    Rs = tf.SO3(wxyzs).as_matrix()
+    return {
+        "centers": centers,
+        "rgbs": rng.uniform(size=(num_gaussians, 3)),
+        "opacities": rng.uniform(size=(num_gaussians, 1)),
+        "covariances": np.einsum(
+            "nij,njk,nlk->nil", Rs, np.eye(3)[None, :, :] * scales[:, None, :] ** 2, Rs
+        ),
+    }
+
+
+def _scales_and_wxyzs(splat: SplatFile) -> tuple[np.ndarray, np.ndarray]:
+    """Recover per-Gaussian scales and rotations from covariances."""
+    eigenvalues, Rs = np.linalg.eigh(splat["covariances"])
+    # Make rotations proper, so they can be written as quaternions.
+    Rs[np.linalg.det(Rs) < 0, :, 0] *= -1.0
+    scales = np.sqrt(np.maximum(eigenvalues, 0.0))
+    return scales, tf.SO3.from_matrix(Rs).wxyz
+
+
+def write_splat_file(path: Path, splat: SplatFile) -> None:
+    """Write an antimatter15-style splat file, the format `load_splat_file` reads."""
+    num_gaussians = splat["centers"].shape[0]
+    scales, wxyzs = _scales_and_wxyzs(splat)
+    rgba = np.concatenate([splat["rgbs"], splat["opacities"]], axis=-1)
+    buffer = np.concatenate(
+        [
+            splat["centers"].astype(np.float32).view(np.uint8),
+            scales.astype(np.float32).view(np.uint8),
+            np.round(rgba * 255.0).astype(np.uint8),
+            np.round((wxyzs + 1.0) / 2.0 * 255.0).astype(np.uint8),
+        ],
+        axis=-1,
+    )
+    assert buffer.shape == (num_gaussians, 32)
+    path.write_bytes(buffer.tobytes())
+
+
+def write_ply_file(path: Path, splat: SplatFile) -> None:
+    """Write a 3DGS-style PLY file, with the fields `load_ply_file` reads."""
+    SH_C0 = 0.28209479177387814
+    scales, wxyzs = _scales_and_wxyzs(splat)
+    opacities = np.clip(splat["opacities"][:, 0], 1e-4, 1.0 - 1e-4)
+    fields = {
+        "x": splat["centers"][:, 0],
+        "y": splat["centers"][:, 1],
+        "z": splat["centers"][:, 2],
+        **{f"scale_{i}": np.log(np.maximum(scales[:, i], 1e-8)) for i in range(3)},
+        **{f"rot_{i}": wxyzs[:, i] for i in range(4)},
+        **{f"f_dc_{i}": (splat["rgbs"][:, i] - 0.5) / SH_C0 for i in range(3)},
+        "opacity": np.log(opacities / (1.0 - opacities)),
+    }
+    vertices = np.empty(
+        splat["centers"].shape[0], dtype=[(name, "f4") for name in fields]
+    )
+    for name, values in fields.items():
+        vertices[name] = values
+    PlyData([PlyElement.describe(vertices, "vertex")]).write(str(path))
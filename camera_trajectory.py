@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from typing import Literal
+
+import numpy as np
+
+import src.viser.transforms as tf
+from animation import VisionAngle
+
+angle_to_wxyz: dict[VisionAngle, np.ndarray] = {
+    "front": np.array(
+        (
+            -0.36265065445334876,
+            0.6108337481676532,
+            0.6051993021378332,
+            -0.35930549622277347,
+        ),
+        dtype=np.float64,
+    ),
+    "front-left": np.array(
+        (
+            -0.19225236907057855,
+            0.32382193097241246,
+            0.7965697836536122,
+            -0.47292173071036364,
+        ),
+        dtype=np.float64,
+    ),
+    "left": np.array(
+        (
+            -0.000585919369139853,
+            0.0009868983275798675,
+            0.8598738798453849,
+            -0.5105052335577261,
+        ),
+        dtype=np.float64,
+    ),
+    "back-left": np.array(
+        (
+            0.2121473625128815,
+            -0.35733223424885696,
+            0.7821110775173719,
+            -0.4643376286390795,
+        ),
+        dtype=np.float64,
+    ),
+    "back": np.array(
+        (
+            0.3562054170310423,
+            -0.5999776570944623,
+            0.6159633708233828,
+            -0.36569610015568493,
+        ),
+        dtype=np.float64,
+    ),
+    "back-right": np.array(
+        (
+            -0.4652921560875437,
+            0.7837188440329271,
+            -0.3537920811950952,
+            0.21004558142160615,
+        ),
+        dtype=np.float64,
+    ),
+    "right": np.array(
+        (
+            0.5105032759584313,
+            -0.8598705825461803,
+            -0.0025776889566837473,
+            0.001530368271109303,
+        ),
+        dtype=np.float64,
+    ),
+    "front-right": np.array(
+        (
+            -0.47432806819048334,
+            0.7989385602809844,
+            0.31793276035163853,
+            -0.18875598140991362,
+        ),
+        dtype=np.float64,
+    ),
+}
+
+
+angle_to_position: dict[VisionAngle, np.ndarray] = {
+    "front": np.array(
+        (2.875022217052737, -0.02664319904713948, 1.567904330328208), dtype=np.float64
+    ),
+    "front-left": np.array(
+        (2.0060873966827777, 2.0596300556212106, 1.567904330379932), dtype=np.float64
+    ),
+    "left": np.array(
+        (0.006599741612243951, 2.875138092780652, 1.5679043303799316), dtype=np.float64
+    ),
+    "back-left": np.array(
+        (-2.1735037556652226, 1.882111588949201, 1.5679043303799316), dtype=np.float64
+    ),
+    "back": np.array(
+        (-2.8741519708057517, 0.07558477268025747, 1.567904330379932), dtype=np.float64
+    ),
+    "back-right": np.array(
+        (-2.156394225933029, -1.9016904457640853, 1.5679043303799325), dtype=np.float64
+    ),
+    "right": np.array(
+        (0.017237860639105432, -2.8750939924302124, 1.567904330379933), dtype=np.float64
+    ),
+    "front-right": np.array(
+        (1.9754608460919139, -2.089022990468399, 1.567904330379933), dtype=np.float64
+    ),
+}
+
+
+# Cameras look at the object from slightly behind the stored poses.
+T_pose_camera = tf.SE3.from_translation(np.array([0.0, 0.0, -0.5]))
+
+ORBIT_ANGLES: list[VisionAngle] = [*angle_to_wxyz.keys(), "front"]
+"""A full turn around the object, starting and ending at the front."""
+
+Easing = Literal["linear", "smoothstep", "catmull_rom"]
+
+
+def angle_pose(angle: VisionAngle) -> tf.SE3:
+    """T_world_camera for a vision angle."""
+    return tf.SE3(angles_poses([angle]).wxyz_xyz[0])
+
+
+def angles_poses(angles: list[VisionAngle]) -> tf.SE3:
+    """Batched T_world_camera for vision angles. Shape (len(angles),)."""
+    T_world_pose = tf.SE3.from_rotation_and_translation(
+        tf.SO3(np.stack([angle_to_wxyz[angle] for angle in angles])),
+        np.stack([angle_to_position[angle] for angle in angles]),
+    )
+    return T_world_pose @ T_pose_camera
+
+
+def orbit_trajectory(
+    angles: list[VisionAngle], steps_per_move: int, easing: Easing = "linear"
+) -> tf.SE3:
+    """Precompute camera poses that move through `angles` in order.
+
+    Each move between consecutive angles takes `steps_per_move - 1` poses, and
+    the first pose is the first angle, so the trajectory has
+    `1 + (len(angles) - 1) * (steps_per_move - 1)` poses.
+
+    Easing:
+        - "linear": constant-speed geodesic (SE(3) slerp) between angles.
+        - "smoothstep": geodesic that eases in and out of every angle.
+        - "catmull_rom": positions follow a Catmull-Rom spline through all
+          angles, so the camera doesn't change direction abruptly; rotations
+          are slerped.
+    """
+    keyframes = angles_poses(angles)
+    # Fraction of each move that is done at every step, shape (steps - 1,).
+    alphas = np.arange(1, steps_per_move) / (steps_per_move - 1.0)
+    if easing == "smoothstep":
+        alphas = alphas * alphas * (3.0 - 2.0 * alphas)
+
+    # Shape (moves, 1).
+    T_world_start = tf.SE3(keyframes.wxyz_xyz[:-1, None, :])
+    T_world_end = tf.SE3(keyframes.wxyz_xyz[1:, None, :])
+    # Shape (moves, steps - 1).
+    T_start_end_log = (T_world_start.inverse() @ T_world_end).log()
+    T_world_moves = T_world_start @ tf.SE3.exp(T_start_end_log * alphas[None, :, None])
+
+    if easing == "catmull_rom":
+        rotations = T_world_moves.rotation()
+        positions = _catmull_rom(keyframes.translation(), alphas)
+        T_world_moves = tf.SE3.from_rotation_and_translation(rotations, positions)
+
+    return tf.SE3(
+        np.concatenate(
+            [keyframes.wxyz_xyz[:1], T_world_moves.wxyz_xyz.reshape((-1, 7))]
+        )
+    )
+
+
+def _catmull_rom(points: np.ndarray, alphas: np.ndarray) -> np.ndarray:
+    """Evaluate a uniform Catmull-Rom spline through `points` (N, 3) at `alphas`
+    within every segment. Returns (N - 1, len(alphas), 3)."""
+    closed = np.allclose(points[0], points[-1])
+    if closed:
+        # The orbit loops, so tangents at the ends wrap around.
+        padded = np.concatenate([points[-2:-1], points, points[1:2]])
+    else:
+        padded = np.concatenate(
+            [2 * points[:1] - points[1:2], points, 2 * points[-1:] - points[-2:-1]]
+        )
+    p0, p1, p2, p3 = (padded[i : i + len(points) - 1, None, :] for i in range(4))
+    t = alphas[None, :, None]
+    return 0.5 * (
+        2 * p1
+        + (p2 - p0) * t
+        + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t**2
+        + (3 * p1 - p0 - 3 * p2 + p3) * t**3
+    )
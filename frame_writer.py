@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import glob
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Literal
+
+import imageio
+import imageio.v3 as iio
+import numpy as np
+
+from timing_utils import StageTimings
+
+VideoFormat = Literal["mp4", "webm"]
+
+VIDEO_CODECS: dict[VideoFormat, str] = {"mp4": "libx264", "webm": "libvpx-vp9"}
+
+
+class FrameWriter:
+    """Writes final render frames to disk in the background as they arrive.
+
+    Every frame is written to a JPEG sequence, and is optionally encoded into
+    videos at the same time, so memory use doesn't grow with the frame count.
+    Writing and decoding run on a thread pool; a single thread feeds the decoded
+    frames to the video encoders in order.
+    The JPEG sequence doubles as a checkpoint: if a render with the same
+    `fingerprint` was interrupted, its frames are reused instead of rendered again.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        fps: int,
+        fingerprint: str,
+        video_formats: tuple[VideoFormat, ...] = ("mp4",),
+        max_queued_frames: int = 8,
+        max_workers: int = 4,
+        timings: StageTimings | None = None,
+    ) -> None:
+        self.output_dir = output_dir
+        self.fps = fps
+        self.n_frames = 0
+        """Frames written or reused so far."""
+        self.n_existing_frames = self._prepare_output_dir(fingerprint)
+        """Frames left on disk by a previous, interrupted render."""
+
+        self._video_formats = _available_video_formats(video_formats)
+        self._timings = timings or StageTimings()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="frame_writer"
+        )
+        self._queue: queue.Queue[Future[np.ndarray | None] | None] = queue.Queue(
+            maxsize=max_queued_frames
+        )
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(
+            target=self._write_frames, name="frame_writer", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> FrameWriter:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close(complete=exc_type is None)
+
+    def next_frame_exists(self) -> bool:
+        return self.n_frames < self.n_existing_frames
+
+    def reuse_next_frame(self) -> None:
+        """Keep the next frame from the previous render."""
+        assert self.next_frame_exists()
+        self._put(self.n_frames, None)
+
+    def write(self, jpeg: bytes) -> None:
+        """Queue a frame. Blocks while the writer thread is behind."""
+        self._put(self.n_frames, jpeg)
+
+    def close(self, complete: bool = True) -> None:
+        """Wait for queued frames. Videos are only finalized if `complete`."""
+        self._queue.put(None)
+        self._thread.join()
+        self._executor.shutdown()
+        if self._error is not None:
+            raise self._error
+        for video_format in self._video_formats:
+            partial_path = self._video_path(video_format, partial=True)
+            if not os.path.exists(partial_path):
+                # No frames were written.
+                continue
+            if complete:
+                os.replace(partial_path, self._video_path(video_format))
+            else:
+                os.remove(partial_path)
+
+    def _put(self, index: int, jpeg: bytes | None) -> None:
+        if self._error is not None:
+            raise self._error
+        with self._timings.measure("queue"):
+            self._queue.put(self._executor.submit(self._prepare_frame, index, jpeg))
+        self.n_frames += 1
+
+    def _prepare_frame(self, index: int, jpeg: bytes | None) -> np.ndarray | None:
+        """Writes a new frame to disk. Returns the decoded frame if videos need it."""
+        with self._timings.measure("write"):
+            path = self._frame_path(index)
+            if jpeg is None:
+                if not self._video_formats:
+                    return None
+                with open(path, "rb") as file:
+                    jpeg = file.read()
+            else:
+                # Write atomically, so an interrupted render never leaves a
+                # truncated frame behind to be reused.
+                with open(path + ".tmp", "wb") as file:
+                    file.write(jpeg)
+                os.replace(path + ".tmp", path)
+            if not self._video_formats:
+                return None
+            return iio.imread(jpeg, extension=".jpg")
+
+    def _write_frames(self) -> None:
+        video_writers = []
+        try:
+            for video_format in self._video_formats:
+                video_writers.append(
+                    imageio.get_writer(
+                        self._video_path(video_format, partial=True),
+                        format="FFMPEG",  # type: ignore
+                        fps=self.fps,
+                        codec=VIDEO_CODECS[video_format],
+                        macro_block_size=8,
+                    )
+                )
+            while (prepared_frame := self._queue.get()) is not None:
+                image = prepared_frame.result()
+                if image is None:
+                    continue
+                with self._timings.measure("encode"):
+                    for video_writer in video_writers:
+                        video_writer.append_data(image)  # type: ignore
+        except BaseException as e:
+            self._error = e
+            # Keep draining, so the render loop isn't blocked on a full queue.
+            while self._queue.get() is not None:
+                pass
+        finally:
+            for video_writer in video_writers:
+                video_writer.close()
+
+    def _prepare_output_dir(self, fingerprint: str) -> int:
+        """Returns how many frames of a previous render can be reused."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest_path = f"{self.output_dir}/render.json"
+        previous_fingerprint = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as file:
+                previous_fingerprint = json.load(file).get("fingerprint")
+
+        if previous_fingerprint != fingerprint:
+            stale_paths = glob.glob(f"{self.output_dir}/img_*.jpg") + glob.glob(
+                f"{self.output_dir}/video.*"
+            )
+            for path in stale_paths:
+                os.remove(path)
+            with open(manifest_path, "w") as file:
+                json.dump({"fingerprint": fingerprint, "fps": self.fps}, file)
+            return 0
+
+        n_existing_frames = 0
+        while os.path.exists(self._frame_path(n_existing_frames)):
+            n_existing_frames += 1
+        return n_existing_frames
+
+    def _frame_path(self, index: int) -> str:
+        return f"{self.output_dir}/img_{index}.jpg"
+
+    def _video_path(self, video_format: VideoFormat, partial: bool = False) -> str:
+        suffix = ".partial" if partial else ""
+        return f"{self.output_dir}/video{suffix}.{video_format}"
+
+
+def _available_video_formats(
+    video_formats: tuple[VideoFormat, ...],
+) -> tuple[VideoFormat, ...]:
+    if not video_formats:
+        return ()
+    try:
+        import imageio_ffmpeg  # noqa: F401
+    except ImportError:
+        print("imageio-ffmpeg is not installed, only writing JPEG frames.")
+        return ()
+    return video_formats
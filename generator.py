@@ -1,7 +1,24 @@
+import asyncio
+import multiprocessing
+import threading
 import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Coroutine
 
-from animation import Animation, AnimationEvolution, VisionAngle
+import numpy as np
+
+import tracing
+from animation import (
+    Animation,
+    AnimationEvolution,
+    VisionAngle,
+    is_working_animation_function,
+)
+from asset_store import SharedArrayRef
+from image_utils import SCORING_PROFILE
 from llm_utils import (
     generate_abstract_summary,
     generate_animation_score,
@@ -17,11 +34,75 @@ from llm_utils import (
     generate_opacities_code,
     generate_rgbs_behavior,
     generate_rgbs_code,
+    run_llm,
+    submit_llm,
 )
 from renderer import Renderer, render_subdirectory
 from state import State
 from viser import ClientHandle, GuiApi
 
+# Generated code is validated in worker processes, so samples can be checked in
+# parallel and a misbehaving function can't take down the server's state.
+VALIDATION_TIMEOUT_SECONDS = 30.0
+
+
+def _new_validation_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+
+
+_validation_executor = _new_validation_executor()
+_validation_executor_lock = threading.Lock()
+
+
+def _recycle_validation_executor(executor: ProcessPoolExecutor) -> None:
+    """Replace the validation pool, and kill the workers of the old one."""
+    global _validation_executor
+    with _validation_executor_lock:
+        if _validation_executor is executor:
+            _validation_executor = _new_validation_executor()
+    _kill_executor(executor)
+
+
+def _kill_executor(executor: ProcessPoolExecutor) -> None:
+    # Workers stuck in generated code never return, so they have to be killed.
+    # Checks still pending on the pool fail with `BrokenProcessPool`.
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False)
+
+
+async def _validate_in_worker(*args: Any) -> bool:
+    """Run `is_working_animation_function()` in a worker process. Functions that
+    don't finish within `VALIDATION_TIMEOUT_SECONDS`, or that crash their
+    worker, don't work."""
+    loop = asyncio.get_running_loop()
+    executor = _validation_executor
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(executor, is_working_animation_function, *args),
+            VALIDATION_TIMEOUT_SECONDS,
+        )
+    except (asyncio.TimeoutError, BrokenProcessPool):
+        _recycle_validation_executor(executor)
+
+    # The timeout includes time spent queued behind other checks, and the pool
+    # also breaks when a check running next to this one is killed or crashes
+    # its worker. So the check is only failed if it fails in a pool of its own.
+    isolated_executor = ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(
+                isolated_executor, is_working_animation_function, *args
+            ),
+            VALIDATION_TIMEOUT_SECONDS,
+        )
+    except (asyncio.TimeoutError, BrokenProcessPool):
+        return False
+    finally:
+        _kill_executor(isolated_executor)
+
 
 @dataclass
 class GeneratorConfig:
@@ -57,22 +138,40 @@ class Generator:
 
         # Step 1: Get Vision Images
         sub_status.content = "*Rendering Vision Angles...*"
-        vision_images = self._render_vision_angles()
+        with tracing.span("vision_angles", "render"):
+            vision_images = self._render_vision_angles()
 
         # Step 2: Generate Samples With Score
-        samples: list[Animation] = []
+        # All samples are generated concurrently. Each finished sample is rendered
+        # right away, so rendering overlaps with the LLM calls of the others.
         n_samples = self.config.n_samples
-        for i in range(n_samples):
-            sub_status.content = f"*Generating Sample {i + 1}/{n_samples}...*"
-            sample = self._generate_animation(vision_images)
+        sub_status.content = f"*Generating Samples (0/{n_samples})...*"
+        progress = self.gui_api.add_progress_bar(0, animated=True)
+        pending_samples = [
+            submit_llm(self._generate_animation(vision_images))
+            for _ in range(n_samples)
+        ]
+        samples: list[Animation] = []
+        pending_scores: list[Future[int]] = []
+        for i, pending_sample in enumerate(as_completed(pending_samples)):
+            sample = pending_sample.result()
             samples.append(sample)
+            progress.value = (i + 1) / n_samples * 100
             if n_samples > 1:
-                sub_status.content = f"*Scoring Sample {i+1}...*"
-                progress = self.gui_api.add_progress_bar(100, animated=True)
+                sub_status.content = f"*Rendering Sample {i + 1}/{n_samples}...*"
                 sample_dir = f"render/{self.subdirectory}/auto_sample/sample_{i}"
-                score = self._score_animation(sample, sample_dir)
-                sample.score = score
-                progress.remove()
+                first_frames = self._render_for_scoring(sample, sample_dir)
+                pending_scores.append(
+                    submit_llm(
+                        generate_animation_score(first_frames, sample.description)
+                    )
+                )
+            sub_status.content = f"*Generating Samples ({i + 1}/{n_samples})...*"
+        if n_samples > 1:
+            sub_status.content = "*Scoring Samples...*"
+            for sample, pending_score in zip(samples, pending_scores):
+                sample.score = pending_score.result()
+        progress.remove()
         self.output.auto_sampled_animations = samples
 
         # Step 3: Choose Best Sample
@@ -94,49 +193,46 @@ class Generator:
         ## Step 1: Render Base Animation
         sub_status.content = "*Rendering Base Animation...*"
         self.state.active_animation = base_animation
-        time.sleep(1)
+        self._settle()
         self.state.visible_frame = 0
-        time.sleep(1)
+        self._settle()
         renderer = Renderer(self.client, self.gui_api, self.state)
         i = len(self.output.auto_improved_animations)
         base_animation_dir = f"render/{self.subdirectory}/auto_improve/base_animation_{i}"
         base_animation_frames = renderer.render_first_frames(base_animation_dir)
 
-        ## Step 2.1: Improve `compute_centers`
-        sub_status.content = "*Improving `compute_centers`...*"
+        ## Step 2: Improve `compute_centers`, `compute_rgbs` and `compute_opacities`
+        sub_status.content = "*Improving Animation Functions...*"
         progress = self.gui_api.add_progress_bar(1, animated=True)
-        base_centers_code = base_animation.centers_code
-        improved_centers_code = ""
-        while True:
-            improved_centers_code = generate_auto_improved_centers_code(
-                base_centers_code, base_animation_frames, description, code_temperature
+        (
+            improved_centers_code,
+            improved_rgbs_code,
+            improved_opacities_code,
+        ) = run_llm(
+            self._generate_working_code(
+                partial(
+                    generate_auto_improved_centers_code,
+                    base_animation.centers_code,
+                    base_animation_frames,
+                    description,
+                    code_temperature,
+                ),
+                partial(
+                    generate_auto_improved_rgbs_code,
+                    base_animation.rgbs_code,
+                    base_animation_frames,
+                    description,
+                    code_temperature,
+                ),
+                partial(
+                    generate_auto_improved_opacities_code,
+                    base_animation.opacities_code,
+                    base_animation_frames,
+                    description,
+                    code_temperature,
+                ),
             )
-            if self._is_working_centers_code(improved_centers_code):
-                break
-
-        ## Step 2.2: Improve `compute_rgbs`
-        sub_status.content = "*Improving `compute_rgbs`...*"
-        progress.value = 34
-        base_rgbs_code = base_animation.rgbs_code
-        improved_rgbs_code = ""
-        while True:
-            improved_rgbs_code = generate_auto_improved_rgbs_code(
-                base_rgbs_code, base_animation_frames, description, code_temperature
-            )
-            if self._is_working_rgbs_code(improved_rgbs_code):
-                break
-
-        ## Step 2.3: Improve `compute_opacities`
-        sub_status.content = "*Improving `compute_opacities`...*"
-        progress.value = 67
-        base_opacities_code = base_animation.opacities_code
-        improved_opacities_code = ""
-        while True:
-            improved_opacities_code = generate_auto_improved_opacities_code(
-                base_opacities_code, base_animation_frames, description, code_temperature
-            )
-            if self._is_working_opacities_code(improved_opacities_code):
-                break
+        )
         progress.remove()
 
         # Step 3: Save Improved Animation
@@ -169,48 +265,48 @@ class Generator:
         ## Step 1: Render Base Animation
         sub_status.content = "*Rendering Base Animation...*"
         self.state.active_animation = base_animation
-        time.sleep(1)
+        self._settle()
         self.state.visible_frame = 0
-        time.sleep(1)
+        self._settle()
         renderer = Renderer(self.client, self.gui_api, self.state)
         image_dir = f"render/{self.subdirectory}/feedback/input_{len(self.output.feedback_to_animation)}"
         first_frames = renderer.render_first_frames(image_dir)
 
-        ## Step 2.1: Improve `compute_centers`
-        sub_status.content = "*Improving `compute_centers`...*"
+        ## Step 2: Improve `compute_centers`, `compute_rgbs` and `compute_opacities`
+        sub_status.content = "*Improving Animation Functions...*"
         progress = self.gui_api.add_progress_bar(1, animated=True)
-        base_centers_code = base_animation.centers_code
-        improved_centers_code = ""
-        while True:
-            improved_centers_code = generate_feedback_improved_centers_code(
-                feedback, base_centers_code, first_frames, description, code_temperature
-            )
-            if self._is_working_centers_code(improved_centers_code):
-                break
-
-        ## Step 2.2: Improve `compute_rgbs`
-        sub_status.content = "*Improving `compute_rgbs`...*"
-        progress.value = 34
-        base_rgbs_code = base_animation.rgbs_code
-        improved_rgbs_code = ""
-        while True:
-            improved_rgbs_code = generate_feedback_improved_rgbs_code(
-                feedback, base_rgbs_code, first_frames, description, code_temperature
-            )
-            if self._is_working_rgbs_code(improved_rgbs_code):
-                break
-
-        ## Step 2.3: Improve `compute_opacities`
-        sub_status.content = "*Improving `compute_opacities`...*"
-        progress.value = 67
-        base_opacities_code = base_animation.opacities_code
-        improved_opacities_code = ""
-        while True:
-            improved_opacities_code = generate_feedback_improved_opacities_code(
-                feedback, base_opacities_code, first_frames, description, code_temperature
+        (
+            improved_centers_code,
+            improved_rgbs_code,
+            improved_opacities_code,
+        ) = run_llm(
+            self._generate_working_code(
+                partial(
+                    generate_feedback_improved_centers_code,
+                    feedback,
+                    base_animation.centers_code,
+                    first_frames,
+                    description,
+                    code_temperature,
+                ),
+                partial(
+                    generate_feedback_improved_rgbs_code,
+                    feedback,
+                    base_animation.rgbs_code,
+                    first_frames,
+                    description,
+                    code_temperature,
+                ),
+                partial(
+                    generate_feedback_improved_opacities_code,
+                    feedback,
+                    base_animation.opacities_code,
+                    first_frames,
+                    description,
+                    code_temperature,
+                ),
             )
-            if self._is_working_opacities_code(improved_opacities_code):
-                break
+        )
         progress.remove()
 
         # Step 3: Save Improved Animation
@@ -232,7 +328,11 @@ class Generator:
         sub_status.remove()
         status.remove()
 
-    def _generate_animation(self, images: list[str] = []) -> Animation:
+    async def _generate_animation(self, images: list[str] = []) -> Animation:
+        with tracing.span("generate_animation", "generation"):
+            return await self._generate_animation_untraced(images)
+
+    async def _generate_animation_untraced(self, images: list[str]) -> Animation:
         title = self.config.animation_title
         description = self.config.animation_description
         duration = self.config.animation_duration
@@ -240,63 +340,35 @@ class Generator:
         code_temperature = self.config.code_temperature
 
         # Design Phase
-        status = self.gui_api.add_markdown("(1/7) *Interpreting Description...*")
-        progress = self.gui_api.add_progress_bar(value=12, animated=True)
-        abstract_summary = generate_abstract_summary(
+        abstract_summary = await generate_abstract_summary(
             description, duration, design_temperature, images
         )
-
-        status.content = "(2/7) *Designing Centers Behavior...*"
-        progress.value = 24
-        centers_behavior = generate_centers_behavior(
-            abstract_summary, design_temperature, images
-        )
-
-        status.content = "(3/7) *Designing RGBs Behavior...*"
-        progress.value = 36
-        rgbs_behavior = generate_rgbs_behavior(
-            abstract_summary, design_temperature, images
-        )
-
-        status.content = "(4/7) *Designing Opacities Behavior...*"
-        progress.value = 48
-        opacities_behavior = generate_opacities_behavior(
-            abstract_summary, design_temperature, images
+        centers_behavior, rgbs_behavior, opacities_behavior = await asyncio.gather(
+            generate_centers_behavior(abstract_summary, design_temperature, images),
+            generate_rgbs_behavior(abstract_summary, design_temperature, images),
+            generate_opacities_behavior(abstract_summary, design_temperature, images),
         )
 
         # Code Phase
-        status.content = "(5/7) *Generating `compute_centers`...*"
-        progress.value = 60
-        centers_code = ""
-        while True:
-            centers_code = generate_centers_code(
-                centers_behavior, duration, code_temperature, images
-            )
-            if self._is_working_centers_code(centers_code):
-                break
-
-        status.content = "(6/7) *Generating `compute_rgbs`...*"
-        progress.value = 72
-        rgbs_code = ""
-        while True:
-            rgbs_code = generate_rgbs_code(
-                rgbs_behavior, duration, code_temperature, images
-            )
-            if self._is_working_rgbs_code(rgbs_code):
-                break
-
-        status.content = "(7/7) *Generating `compute_opacities`...*"
-        progress.value = 85
-        opacities_code = ""
-        while True:
-            opacities_code = generate_opacities_code(
-                opacities_behavior, duration, code_temperature, images
-            )
-            if self._is_working_opacities_code(opacities_code):
-                break
-
-        progress.remove()
-        status.remove()
+        centers_code, rgbs_code, opacities_code = await self._generate_working_code(
+            partial(
+                generate_centers_code,
+                centers_behavior,
+                duration,
+                code_temperature,
+                images,
+            ),
+            partial(
+                generate_rgbs_code, rgbs_behavior, duration, code_temperature, images
+            ),
+            partial(
+                generate_opacities_code,
+                opacities_behavior,
+                duration,
+                code_temperature,
+                images,
+            ),
+        )
 
         return Animation(
             title,
@@ -311,6 +383,64 @@ class Generator:
             opacities_code,
         )
 
+    async def _generate_working_code(
+        self,
+        centers_request: Callable[[], Coroutine[Any, Any, str]],
+        rgbs_request: Callable[[], Coroutine[Any, Any, str]],
+        opacities_request: Callable[[], Coroutine[Any, Any, str]],
+    ) -> tuple[str, str, str]:
+        """Request all three animation functions concurrently. Functions that
+        fail validation are requested again until every one of them works."""
+        requests = (centers_request, rgbs_request, opacities_request)
+        function_names = ("compute_centers", "compute_rgbs", "compute_opacities")
+        values: tuple[np.ndarray | SharedArrayRef, ...]
+        loop = asyncio.get_running_loop()
+        if self.state.quality == "preview":
+            # The coarse level is small enough to send to workers as is. It's
+            # built on first use, which takes too long to run on the event loop.
+            preview_data = await loop.run_in_executor(
+                None, lambda: self.state.preview_data
+            )
+            values = (
+                preview_data["centers"],
+                preview_data["rgbs"],
+                preview_data["opacities"],
+            )
+        else:
+            # Workers attach to the shared arrays of the scene, instead of
+            # receiving pickled copies of them.
+            object_asset = self.state.object_asset
+            assert object_asset is not None
+            values = (
+                object_asset.refs["centers"],
+                object_asset.refs["rgbs"],
+                object_asset.refs["opacities"],
+            )
+        duration = self.config.animation_duration
+        fps = self.state.fps
+
+        codes = ["", "", ""]
+        pending = [0, 1, 2]
+        while pending:
+            results = await asyncio.gather(*(requests[i]() for i in pending))
+            for i, code in zip(pending, results):
+                codes[i] = code
+            with tracing.span("validate", "validation", functions=len(pending)):
+                checks = await asyncio.gather(
+                    *(
+                        _validate_in_worker(
+                            codes[i],
+                            function_names[i],
+                            values[i],
+                            duration,
+                            fps,
+                        )
+                        for i in pending
+                    )
+                )
+            pending = [i for i, works in zip(pending, checks) if not works]
+        return codes[0], codes[1], codes[2]
+
     def _render_vision_angles(self) -> list[str]:
         angles = self.config.vision_angles
         renderer = Renderer(self.client, self.gui_api, self.state)
@@ -318,33 +448,15 @@ class Generator:
         angle_images = renderer.render_angles(angles, angle_images_dir)
         return angle_images
 
-    def _score_animation(self, animation: Animation, image_dir: str) -> int:
+    def _settle(self) -> None:
+        """Give the client time to apply scene updates."""
+        with tracing.span("settle", "sleep"):
+            time.sleep(1)
+
+    def _render_for_scoring(self, animation: Animation, image_dir: str) -> list[str]:
         self.state.active_animation = animation
-        time.sleep(1)
+        self._settle()
         self.state.visible_frame = 0
-        time.sleep(1)
+        self._settle()
         renderer = Renderer(self.client, self.gui_api, self.state)
-        first_frames = renderer.render_first_frames(image_dir)
-        score = generate_animation_score(first_frames, animation.description)
-        return score
-
-    def _is_working_centers_code(self, centers_code: str) -> bool:
-        try:
-            self.state.active_animation = Animation(duration=self.config.animation_duration, centers_code=centers_code)
-        except Exception:
-            return False
-        return True
-
-    def _is_working_rgbs_code(self, rgbs_code: str) -> bool:
-        try:
-            self.state.active_animation = Animation(duration=self.config.animation_duration, rgbs_code=rgbs_code)
-        except Exception:
-            return False
-        return True
-
-    def _is_working_opacities_code(self, opacities_code: str) -> bool:
-        try:
-            self.state.active_animation = Animation(duration=self.config.animation_duration, opacities_code=opacities_code)
-        except Exception:
-            return False
-        return True
+        return renderer.render_first_frames(image_dir, SCORING_PROFILE)
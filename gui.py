@@ -1,5 +1,7 @@
 import time
+from typing import Callable
 
+import tracing
 from animation import Animation, VisionAngle
 from examples import EXAMPLE_ACCELERATION, EXAMPLE_BREATHING, EXAMPLE_COLOR_SHIFT, EXAMPLE_EXPLOSION, EXAMPLE_LAVA_MELTING, EXAMPLE_LSD
 from generator import Generator, GeneratorConfig
@@ -34,7 +36,11 @@ class Gui(Observer):
 
             self.duration_md = self.api.add_markdown("Duration: **N/A**")
 
-            self.generator_btn = self.api.add_button(label="♻ New Animation")
+            # Generating and rendering need the scene, which loads in the
+            # background; see `update()`.
+            self.generator_btn = self.api.add_button(
+                label="♻ New Animation", disabled=True
+            )
             self.generator_btn.on_click(lambda _: self._open_generator())
 
             self.improve_btn = self.api.add_button(
@@ -61,6 +67,11 @@ class Gui(Observer):
             )
             self.fps_btn_grp.on_click(lambda _: self._sync_fps())
 
+            self.quality_btn_grp = self.api.add_button_group(
+                f"Quality ({self.state.quality})", ["preview", "final"]
+            )
+            self.quality_btn_grp.on_click(lambda _: self._sync_quality())
+
             self.speed_btn_grp = self.api.add_button_group(
                 label=f"Speed ({self.state.speed})",
                 options=[".25x", ".5x", "1x", "2x"],
@@ -131,9 +142,17 @@ class Gui(Observer):
 
         ## Render Tab
         with self.tab_group.add_tab("Render"):
-            self.render_btn = self.api.add_button("Render", icon=viser.Icon.PHOTO)
+            self.render_btn = self.api.add_button(
+                "Render", icon=viser.Icon.PHOTO, disabled=True
+            )
             self.render_btn.on_click(lambda event: self._render(event))
 
+        ## Trace Tab
+        self.trace_md = None
+        if tracing.enabled():
+            with self.tab_group.add_tab("Trace"):
+                self.trace_md = self.api.add_markdown("*No traced jobs yet.*")
+
     def update(self, changed_attribute_name: str):
         match changed_attribute_name:
             case "animation":
@@ -151,6 +170,13 @@ class Gui(Observer):
             case "speed":
                 speed = self.state.speed
                 self.speed_btn_grp.label = f"Speed ({speed})"
+            case "quality":
+                quality = self.state.quality
+                self.quality_btn_grp.label = f"Quality ({quality})"
+            case "scene":
+                scene_ready = self.state.scene_ready.is_set()
+                self.generator_btn.disabled = not scene_ready
+                self.render_btn.disabled = not scene_ready
 
     def _open_generator(self):
         with self.api.add_modal(title="♻ New Animation") as popout:
@@ -195,6 +221,8 @@ class Gui(Observer):
                 client = event.client
                 assert client is not None
 
+                if not self._scene_is_ready(client):
+                    return
                 if not description_txt.value:
                     client.add_notification("⚠", "Empty Description", auto_close=True, color="yellow")
                     return
@@ -212,7 +240,7 @@ class Gui(Observer):
                     n_samples=auto_sample_number.value,
                 )
                 generator = Generator(generator_config, client, self.api, self.state)
-                generator.auto_sample()
+                self._traced("auto_sample", generator.auto_sample)
 
                 self.generator = generator
                 self.state.animation_evolution = generator.output
@@ -231,7 +259,7 @@ class Gui(Observer):
             def _(_) -> None:
                 popout.close()
                 assert self.generator is not None
-                self.generator.auto_improve()
+                self._traced("auto_improve", self.generator.auto_improve)
                 self.state.active_animation = self.generator.output.final_animation
 
             feedback_btn = self.api.add_button("Feedback Improve", icon=viser.Icon.WRITING)
@@ -256,7 +284,11 @@ class Gui(Observer):
                     return
                 assert self.generator is not None
                 popout.close()
-                self.generator.feedback_improve(input_txt.value)
+                generator = self.generator
+                feedback = input_txt.value
+                self._traced(
+                    "feedback_improve", lambda: generator.feedback_improve(feedback)
+                )
                 self.state.active_animation = self.generator.output.final_animation
 
             self._add_close_popout_btn(popout)
@@ -367,6 +399,11 @@ class Gui(Observer):
         self._stop_playback()
         self.state.fps = int(self.fps_btn_grp.value)
 
+    def _sync_quality(self):
+        self.state.quality = (
+            "preview" if self.quality_btn_grp.value == "preview" else "final"
+        )
+
     def _sync_speed(self):
         self.state.speed = float(self.speed_btn_grp.value[:-1])
 
@@ -399,8 +436,28 @@ class Gui(Observer):
     def _render(self, event: viser.GuiEvent):
         client = event.client
         assert client is not None
+        if not self._scene_is_ready(client):
+            return
         renderer = Renderer(client, self.api, self.state)
-        renderer.render_animation()
+        self._traced("render_animation", renderer.render_animation)
+
+    def _scene_is_ready(self, client: viser.ClientHandle) -> bool:
+        """Buttons are disabled until the scene is loaded, but clicks can still
+        arrive from clients that haven't seen that yet."""
+        if self.state.scene_ready.is_set():
+            return True
+        client.add_notification(
+            "⚠", "The scene is still loading", auto_close=True, color="yellow"
+        )
+        return False
+
+    def _traced(self, job_name: str, job: Callable[[], None]) -> None:
+        """Run a job, tracing it if enabled, and show where its time went. Preview
+        frames aren't refined while it runs."""
+        with self.state.interaction(), tracing.trace_job(job_name) as trace:
+            job()
+        if trace is not None and self.trace_md is not None:
+            self.trace_md.content = trace.summary_markdown()
 
     def _open_active_functions(self):
         centers_code = self.state.active_animation.centers_code
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import base64
+import math
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import imageio.v3 as iio
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ImageProfile:
+    """Resolution and JPEG quality of the images sent with one type of LLM call."""
+
+    width: int
+    height: int
+    quality: int
+    frames_per_sheet: int = 1
+    """Frames tiled into one contact sheet. 1 sends every frame as its own image."""
+
+
+# The object only covers part of the frame, so full-HD renders mostly cost tokens.
+VISION_ANGLES_PROFILE = ImageProfile(width=1024, height=576, quality=85)
+IMPROVEMENT_PROFILE = ImageProfile(width=768, height=432, quality=80)
+SCORING_PROFILE = ImageProfile(width=512, height=288, quality=75, frames_per_sheet=4)
+
+# Disk writes are only for inspection, so they never block rendering.
+_write_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image_write")
+
+
+def encode_jpeg(image: np.ndarray, quality: int) -> bytes:
+    return iio.imwrite("<bytes>", image[..., :3], extension=".jpeg", quality=quality)
+
+
+def contact_sheet(images: list[np.ndarray]) -> np.ndarray:
+    """Tile equally sized images into a near-square grid, in reading order."""
+    columns = math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    height, width = images[0].shape[:2]
+    sheet = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        row, column = divmod(i, columns)
+        sheet[
+            row * height : (row + 1) * height, column * width : (column + 1) * width
+        ] = image[..., :3]
+    return sheet
+
+
+def write_bytes_async(path: str, data: bytes) -> Future[None]:
+    def write() -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+    return _write_executor.submit(write)
+
+
+def encode_for_prompt(
+    jpegs: list[bytes],
+    names: list[str],
+    profile: ImageProfile,
+    output_dir: str | None = None,
+) -> list[str]:
+    """Prepare client-encoded renders for a prompt. Returns base64 JPEGs.
+
+    Renders are used as-is, without transcoding, unless the profile tiles
+    consecutive frames into contact sheets. If `output_dir` is set, the same JPEG
+    bytes are also written there in the background.
+    """
+    if profile.frames_per_sheet > 1:
+        n = profile.frames_per_sheet
+        images = [iio.imread(jpeg, extension=".jpeg") for jpeg in jpegs]
+        jpegs = [
+            encode_jpeg(contact_sheet(images[i : i + n]), profile.quality)
+            for i in range(0, len(images), n)
+        ]
+        names = [f"sheet_{i}" for i in range(len(jpegs))]
+
+    base64_images = []
+    for jpeg, name in zip(jpegs, names):
+        if output_dir is not None:
+            write_bytes_async(f"{output_dir}/{name}.jpg", jpeg)
+        base64_images.append(base64.b64encode(jpeg).decode("utf-8"))
+    return base64_images
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Literal
+
+CacheMode = Literal["off", "readwrite", "offline"]
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in offline mode when a response is not in the cache."""
+
+
+class ResponseCache:
+    """Content-addressed, size-bounded on-disk cache of LLM responses.
+
+    Responses are keyed by a hash of everything that determines the request. The
+    n-th identical request made by this process maps to the n-th cached response,
+    so repeated samples and retries of the same prompt still get distinct
+    responses, and a whole run replays deterministically.
+
+    Modes:
+        - "off": never read or write the cache.
+        - "readwrite": serve hits from the cache, store misses.
+        - "offline": serve hits from the cache, raise `LLMCacheMiss` on misses.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, mode: CacheMode) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._occurrences: Counter[str] = Counter()
+        self._total_bytes = sum(
+            path.stat().st_size for path in self.cache_dir.glob("*/*.json")
+        )
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == "offline"
+
+    def next_key(
+        self,
+        model: str,
+        system_message: str,
+        prompt: str,
+        base64_images: list[str],
+        temperature: float,
+        response_schema: dict | None,
+    ) -> str:
+        """Key for the next occurrence of a request."""
+        request = json.dumps(
+            {
+                "model": model,
+                "system_message": system_message,
+                "prompt": prompt,
+                "image_digests": [
+                    hashlib.sha256(image.encode()).hexdigest()
+                    for image in base64_images
+                ],
+                "temperature": temperature,
+                "response_schema": response_schema,
+            },
+            sort_keys=True,
+        )
+        request_digest = hashlib.sha256(request.encode()).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences[request_digest]
+            self._occurrences[request_digest] += 1
+        return hashlib.sha256(f"{request_digest}:{occurrence}".encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        if self.mode == "off":
+            return None
+        path = self._path(key)
+        try:
+            content = json.loads(path.read_text())["content"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+        # Reads count as uses for least-recently-used eviction.
+        os.utime(path)
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        if self.mode != "readwrite":
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"content": content})
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += path.stat().st_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        paths = sorted(
+            self.cache_dir.glob("*/*.json"), key=lambda path: path.stat().st_mtime
+        )
+        self._total_bytes = sum(path.stat().st_size for path in paths)
+        for path in paths:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._total_bytes -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
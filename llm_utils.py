@@ -1,17 +1,96 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Coroutine, TypeVar, cast, get_args
 
+import httpx
 from dotenv import load_dotenv
-from openai import NotGiven, OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, NotGiven
 from pydantic import BaseModel
 
 import prompts
+import tracing
+from llm_cache import CacheMode, LLMCacheMiss, ResponseCache
 from text_utils import extract_code
 
 load_dotenv(override=True)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+T = TypeVar("T")
+
+MODEL = "gpt-4o-mini"
+
+# Upper bound on in-flight requests. Also sizes the shared connection pool, so
+# concurrent requests reuse warm connections instead of opening new ones.
+MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "8"))
+
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENT_REQUESTS,
+            max_keepalive_connections=MAX_CONCURRENT_REQUESTS,
+        )
+    ),
+)
+
+# All requests run on one long-lived event loop, which owns the connection pool.
+_event_loop = asyncio.new_event_loop()
+threading.Thread(
+    target=_event_loop.run_forever, name="llm_event_loop", daemon=True
+).start()
+
+
+async def _create_request_semaphore() -> asyncio.Semaphore:
+    return asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+
+# Created on the loop that uses it, since before Python 3.10 asyncio primitives
+# bind to the event loop that is current when they're created.
+_request_semaphore = asyncio.run_coroutine_threadsafe(
+    _create_request_semaphore(), _event_loop
+).result()
+
+
+def _cache_mode_from_env() -> CacheMode:
+    mode = os.getenv("LLM_CACHE_MODE", "readwrite")
+    if mode not in get_args(CacheMode):
+        raise ValueError(
+            f"LLM_CACHE_MODE should be one of {', '.join(get_args(CacheMode))},"
+            f" not {mode!r}"
+        )
+    return cast(CacheMode, mode)
+
+
+# Identical requests are served from disk. Set LLM_CACHE_MODE=offline to never
+# hit the API, e.g. for deterministic test and benchmark runs of the Generator.
+response_cache = ResponseCache(
+    cache_dir=Path(os.getenv("LLM_CACHE_DIR", ".llm_cache")),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024**2))),
+    mode=_cache_mode_from_env(),
+)
+
+
+def submit_llm(coroutine: Coroutine[Any, Any, T]) -> Future[T]:
+    """Schedule an LLM coroutine on the shared event loop without blocking."""
+    return asyncio.run_coroutine_threadsafe(coroutine, _event_loop)
+
+
+def run_llm(coroutine: Coroutine[Any, Any, T]) -> T:
+    """Run an LLM coroutine on the shared event loop and block until it's done."""
+    return submit_llm(coroutine).result()
+
+
+def gather_llm(*coroutines: Coroutine[Any, Any, T]) -> list[T]:
+    """Run independent LLM coroutines concurrently. Results keep argument order."""
+
+    async def gather() -> list[T]:
+        return list(await asyncio.gather(*coroutines))
+
+    return run_llm(gather())
 
 
 class Step(BaseModel):
@@ -28,119 +107,156 @@ class AnimationScore(BaseModel):
     similary_score: int
 
 
-def _prompt_llm(
+async def _prompt_llm(
     prompt: str,
     system_message: str,
     temperature: float = 1.0,
     base64_images: list[str] = [],
     response_format=None,
 ) -> str:
-    completion = client.beta.chat.completions.parse(
-        model="gpt-4o-mini",
+    cache_key = response_cache.next_key(
+        model=MODEL,
+        system_message=system_message,
+        prompt=prompt,
+        base64_images=base64_images,
         temperature=temperature,
-        messages=[
-            {"role": "system", "content": system_message},
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    },
-                ]
-                + [
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
-                    }
-                    for base64_image in base64_images
-                ],
-            },  # type: ignore
-        ],
-        response_format=response_format or NotGiven(),  # type: ignore
+        response_schema=response_format.model_json_schema()
+        if response_format
+        else None,
     )
+    content = response_cache.get(cache_key)
+    if content is None:
+        if response_cache.offline:
+            raise LLMCacheMiss(f"No cached response for request {cache_key}.")
+        with tracing.span(
+            "completion", "llm", key=cache_key, images=len(base64_images)
+        ):
+            content = await _request_completion(
+                prompt, system_message, temperature, base64_images, response_format
+            )
+        if content:
+            response_cache.put(cache_key, content)
+
     if response_format:
-        return completion.choices[0].message.parsed or ""
+        return response_format.model_validate_json(content)
 
+    return content
+
+
+async def _request_completion(
+    prompt: str,
+    system_message: str,
+    temperature: float,
+    base64_images: list[str],
+    response_format,
+) -> str:
+    async with _request_semaphore:
+        completion = await client.beta.chat.completions.parse(
+            model=MODEL,
+            temperature=temperature,
+            messages=[
+                {"role": "system", "content": system_message},
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": prompt,
+                        },
+                    ]
+                    + [
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{base64_image}"
+                            },
+                        }
+                        for base64_image in base64_images
+                    ],
+                },  # type: ignore
+            ],
+            response_format=response_format or NotGiven(),  # type: ignore
+        )
+    # Structured outputs are cached as their raw JSON and parsed on the way out.
     return completion.choices[0].message.content or ""
 
 
 # Design Phase Related
 
 
-def generate_abstract_summary(
+async def generate_abstract_summary(
     description: str, duration: int, temperature: float, images: list[str]
 ) -> str:
     system_message = prompts.ABSTRACT_SUMMARY_SYSTEM_MESSAGE_TEMPLATE
     system_message = system_message.format(duration=float(duration))
     prompt = description
-    return _prompt_llm(prompt, system_message, temperature, images)
+    return await _prompt_llm(prompt, system_message, temperature, images)
 
 
-def generate_centers_behavior(
+async def generate_centers_behavior(
     abstract_summary: str, temperature: float, images: list[str]
 ) -> str:
     system_message = prompts.CENTERS_BEHAVIOR_SYSTEM_MESSAGE
     prompt = abstract_summary
-    return _prompt_llm(prompt, system_message, temperature, images)
+    return await _prompt_llm(prompt, system_message, temperature, images)
 
 
-def generate_rgbs_behavior(
+async def generate_rgbs_behavior(
     abstract_summary: str, temperature: float, images: list[str]
 ) -> str:
     system_message = prompts.RGBS_BEHAVIOR_SYSTEM_MESSAGE
     prompt = abstract_summary
-    return _prompt_llm(prompt, system_message, temperature, images)
+    return await _prompt_llm(prompt, system_message, temperature, images)
 
 
-def generate_opacities_behavior(
+async def generate_opacities_behavior(
     abstract_summary: str, temperature: float, images: list[str]
 ) -> str:
     system_message = prompts.OPACITIES_BEHAVIOR_SYSTEM_MESSAGE
     prompt = abstract_summary
-    return _prompt_llm(prompt, system_message, temperature, images)
+    return await _prompt_llm(prompt, system_message, temperature, images)
 
 
 # Code Phase Related
 
 
-def generate_centers_code(
+async def generate_centers_code(
     centers_behavior: str, duration: int, temperature: float, images: list[str]
 ) -> str:
     system_message = prompts.CENTERS_CODE_SYSTEM_MESSAGE
     system_message = system_message.format(duration=float(duration))
     prompt = centers_behavior
-    centers_code_md = _prompt_llm(prompt, system_message, temperature, images)
+    centers_code_md = await _prompt_llm(prompt, system_message, temperature, images)
     return extract_code(centers_code_md)
 
 
-def generate_rgbs_code(
+async def generate_rgbs_code(
     rgbs_behavior: str, duration: int, temperature: float, images: list[str]
 ) -> str:
     system_message = prompts.RGBS_CODE_SYSTEM_MESSAGE
     system_message = system_message.format(duration=float(duration))
     prompt = rgbs_behavior
-    rgbs_code_md = _prompt_llm(prompt, system_message, temperature, images)
+    rgbs_code_md = await _prompt_llm(prompt, system_message, temperature, images)
     return extract_code(rgbs_code_md)
 
 
-def generate_opacities_code(
+async def generate_opacities_code(
     opacities_behavior: str, duration: int, temperature: float, images: list[str]
 ) -> str:
     system_message = prompts.OPACITIES_CODE_SYSTEM_MESSAGE
     system_message = system_message.format(duration=float(duration))
     prompt = opacities_behavior
-    opacities_code_md = _prompt_llm(prompt, system_message, temperature, images)
+    opacities_code_md = await _prompt_llm(prompt, system_message, temperature, images)
     return extract_code(opacities_code_md)
 
 
 # Auto Sample Related
 
 
-def generate_animation_score(first_frames: list[str], description: str) -> int:
+async def generate_animation_score(first_frames: list[str], description: str) -> int:
     system_message = prompts.SCORE_ANIMATION_SYSTEM_MESSAGE
     prompt = f'**Animation Description**: "{description}"'
-    animation_score: AnimationScore = _prompt_llm(
+    animation_score: AnimationScore = await _prompt_llm(
         prompt,
         system_message,
         base64_images=first_frames,
@@ -152,13 +268,13 @@ def generate_animation_score(first_frames: list[str], description: str) -> int:
 # Auto Improve Related
 
 
-def generate_auto_improved_centers_code(
+async def generate_auto_improved_centers_code(
     centers_code: str, first_frames: list[str], description: str, temperature: float
 ) -> str:
     system_message = prompts.AUTO_IMPROVE_CENTERS_CODE_SYSTEM_MESSAGE
     prompt = prompts.AUTO_IMPROVE_USER_TEMPLATE
     prompt = prompt.format(description=description, function_code=centers_code)
-    code_revision: CodeRevision = _prompt_llm(
+    code_revision: CodeRevision = await _prompt_llm(
         prompt,
         system_message,
         base64_images=first_frames,
@@ -167,13 +283,13 @@ def generate_auto_improved_centers_code(
     return extract_code(code_revision.revised_code)
 
 
-def generate_auto_improved_rgbs_code(
+async def generate_auto_improved_rgbs_code(
     rgbs_code: str, first_frames: list[str], description: str, temperature: float
 ) -> str:
     system_message = prompts.AUTO_IMPROVE_RGBS_CODE_SYSTEM_MESSAGE
     prompt = prompts.AUTO_IMPROVE_USER_TEMPLATE
     prompt = prompt.format(description=description, function_code=rgbs_code)
-    code_revision: CodeRevision = _prompt_llm(
+    code_revision: CodeRevision = await _prompt_llm(
         prompt,
         system_message,
         base64_images=first_frames,
@@ -182,13 +298,13 @@ def generate_auto_improved_rgbs_code(
     return extract_code(code_revision.revised_code)
 
 
-def generate_auto_improved_opacities_code(
+async def generate_auto_improved_opacities_code(
     opacities_code: str, first_frames: list[str], description: str, temperature: float
 ) -> str:
     system_message = prompts.AUTO_IMPROVE_OPACITIES_CODE_SYSTEM_MESSAGE
     prompt = prompts.AUTO_IMPROVE_USER_TEMPLATE
     prompt = prompt.format(description=description, function_code=opacities_code)
-    code_revision: CodeRevision = _prompt_llm(
+    code_revision: CodeRevision = await _prompt_llm(
         prompt,
         system_message,
         base64_images=first_frames,
@@ -200,7 +316,7 @@ def generate_auto_improved_opacities_code(
 # Feedback Loop Related
 
 
-def generate_feedback_improved_centers_code(
+async def generate_feedback_improved_centers_code(
     feedback: str,
     centers_code: str,
     first_frames: list[str],
@@ -212,7 +328,7 @@ def generate_feedback_improved_centers_code(
     prompt = prompt.format(
         description=description, function_code=centers_code, feedback=feedback
     )
-    code_revision: CodeRevision = _prompt_llm(
+    code_revision: CodeRevision = await _prompt_llm(
         prompt,
         system_message,
         base64_images=first_frames,
@@ -222,7 +338,7 @@ def generate_feedback_improved_centers_code(
     return extract_code(code_revision.revised_code)
 
 
-def generate_feedback_improved_rgbs_code(
+async def generate_feedback_improved_rgbs_code(
     feedback: str,
     rgbs_code: str,
     first_frames: list[str],
@@ -234,7 +350,7 @@ def generate_feedback_improved_rgbs_code(
     prompt = prompt.format(
         description=description, function_code=rgbs_code, feedback=feedback
     )
-    code_revision: CodeRevision = _prompt_llm(
+    code_revision: CodeRevision = await _prompt_llm(
         prompt,
         system_message,
         base64_images=first_frames,
@@ -244,7 +360,7 @@ def generate_feedback_improved_rgbs_code(
     return extract_code(code_revision.revised_code)
 
 
-def generate_feedback_improved_opacities_code(
+async def generate_feedback_improved_opacities_code(
     feedback: str,
     opacities_code: str,
     first_frames: list[str],
@@ -256,7 +372,7 @@ def generate_feedback_improved_opacities_code(
     prompt = prompt.format(
         description=description, function_code=opacities_code, feedback=feedback
     )
-    code_revision: CodeRevision = _prompt_llm(
+    code_revision: CodeRevision = await _prompt_llm(
         prompt,
         system_message,
         base64_images=first_frames,
@@ -10,15 +10,18 @@ from animation import write_animation_functions
 from gui import Gui
 from scene import Scene
 from src import viser
-from state import State
+from state import State, preload_example_scenes
 
 
 def main() -> None:
+    preload_example_scenes()
     server = viser.ViserServer()
     scene = Scene(server.scene)
     state = State(scene, server.gui)
     gui = Gui(server, state, scene)
     state.attach(gui)
+    # The default scene may have loaded before the GUI was attached.
+    gui.update("scene")
 
     try:
         while True:
@@ -505,4 +505,5 @@ Provide an integer similarity score between 0 and 100.
 - Consider minor deviations in style that do not affect the overall narrative as acceptable.
 - Drastic differences in key elements should significantly impact the score.
 - Ensure that both visual elements and thematic content are considered in the scoring.
+- Snapshots may be tiled into contact sheets. Read each sheet left to right, top to bottom; sheets are in chronological order.
 """.strip()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from frame_writer import FrameWriter
+from timing_utils import StageTimings
+from viser import ClientHandle
+
+
+class RenderScheduler:
+    """Pipelines captures of a sequence of render steps.
+
+    The caller dispatches the camera and frame updates of a step, then calls
+    `capture()`. That requests the render without waiting for it, so the updates
+    of the next step are dispatched while the current image is still in flight.
+    The client holds messages that arrive during a render, so updates never leak
+    into the previous image, and waits for splats to be sorted for the step's
+    view before taking it. Images are handed to the `FrameWriter` in order.
+    """
+
+    def __init__(
+        self,
+        client: ClientHandle,
+        writer: FrameWriter,
+        timings: StageTimings,
+        height: int,
+        width: int,
+        quality: int,
+        settle_seconds: float,
+        step_settle_seconds: float | None = None,
+    ) -> None:
+        self.client = client
+        self.writer = writer
+        self.timings = timings
+        self.height = height
+        self.width = width
+        self.quality = quality
+        self.settle_seconds = settle_seconds
+        """Time the client gets to apply the updates of the first step before
+        its render is requested, which lets it finish uploading and sorting
+        splats."""
+        self.step_settle_seconds = (
+            settle_seconds if step_settle_seconds is None else step_settle_seconds
+        )
+        """Settle time of the steps after the first, whose frames are already
+        uploaded."""
+        self._requested_first = False
+        self._in_flight: Future[bytes] | None = None
+        self._last_capture_time = time.perf_counter()
+
+    def __enter__(self) -> RenderScheduler:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self._collect()
+
+    def capture(self, wxyz: np.ndarray, position: np.ndarray) -> None:
+        """Capture the step that was just dispatched, from the camera pose it
+        set. The pose is part of the request, so the image doesn't depend on
+        when the camera update reaches the client."""
+        dispatch_time = self._last_capture_time
+        self.timings.add("dispatch", time.perf_counter() - dispatch_time)
+        if self.writer.next_frame_exists():
+            self._collect()
+            self.writer.reuse_next_frame()
+        else:
+            with self.timings.measure("settle"):
+                self._settle(dispatch_time)
+            request_time = time.perf_counter()
+            render = self.client.request_render_encoded(
+                height=self.height,
+                width=self.width,
+                wxyz=wxyz,
+                position=position,
+                quality=self.quality,
+            )
+            render.add_done_callback(
+                lambda _: self.timings.add("render", time.perf_counter() - request_time)
+            )
+            self._collect()
+            self._in_flight = render
+            self._requested_first = True
+        self._last_capture_time = time.perf_counter()
+
+    def _settle(self, dispatch_time: float) -> None:
+        """Sleep until the settle time has passed since the step started being
+        dispatched. Dispatching, and the render in flight meanwhile, count
+        toward it instead of adding to it."""
+        settle_seconds = (
+            self.step_settle_seconds if self._requested_first else self.settle_seconds
+        )
+        remaining = dispatch_time + settle_seconds - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def _collect(self) -> None:
+        """Wait for the render in flight and hand it to the writer."""
+        if self._in_flight is None:
+            return
+        with self.timings.measure("wait"):
+            jpeg = self._in_flight.result()
+        self._in_flight = None
+        self.writer.write(jpeg)
@@ -1,10 +1,13 @@
 import uuid
+from typing import Literal
 
 import numpy as np
 
+from asset_store import SharedSplat, asset_store
 from splat_utils import SplatFile
 from viser._scene_api import SceneApi
 from viser._scene_handles import GaussianSplatHandle
+from viser._splat_quantization import DecomposedCovariances, quantize_gaussian_splats
 
 
 class Scene:
@@ -22,7 +25,28 @@ class Scene:
         name: str,
         splat: SplatFile,
         position: tuple[float, float, float] = (0, 0, 0),
+        exclusive_group: str | None = None,
+        encoding: Literal["float", "quantized"] = "float",
+        decomposed_covariances: DecomposedCovariances | None = None,
     ) -> GaussianSplatHandle:
+        """Add a splat. `decomposed_covariances` is
+        `decompose_covariances(splat["covariances"])`; passing it saves most of
+        the cost of quantizing splats that share covariances."""
+        if encoding == "quantized" and decomposed_covariances is not None:
+            buffer, quantization = quantize_gaussian_splats(
+                splat["centers"],
+                splat["covariances"],
+                splat["rgbs"],
+                splat["opacities"],
+                decomposed=decomposed_covariances,
+            )
+            return self.api.add_packed_gaussian_splats(
+                name=name + "_" + str(uuid.uuid4()),
+                buffer=buffer,
+                position=position,
+                exclusive_group=exclusive_group,
+                quantization=quantization,
+            )
         return self.api.add_gaussian_splats(
             name=name + "_" + str(uuid.uuid4()),
             centers=splat["centers"],
@@ -30,6 +54,21 @@ class Scene:
             opacities=splat["opacities"],
             covariances=splat["covariances"],
             position=position,
+            exclusive_group=exclusive_group,
+            encoding=encoding,
+        )
+
+    def add_shared_splat(
+        self,
+        name: str,
+        asset: SharedSplat,
+        position: tuple[float, float, float] = (0, 0, 0),
+    ) -> GaussianSplatHandle:
+        """Add a splat from the asset store, reusing its packed buffer."""
+        return self.api.add_packed_gaussian_splats(
+            name=name + "_" + str(uuid.uuid4()),
+            buffer=asset_store.packed(asset),
+            position=position,
         )
 
     def _add_black_box(self) -> None:
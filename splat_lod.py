@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from splat_utils import SplatFile
+
+PREVIEW_FRACTION = 0.15
+"""Share of Gaussians kept by the coarsest level of `build_lod()`."""
+
+
+@dataclass(frozen=True)
+class SplatLod:
+    """Nested levels of detail of a splat. Level `i` holds the first `counts[i]`
+    Gaussians of `order`, so each level contains all coarser ones. The last
+    level is the full splat."""
+
+    order: npt.NDArray[np.intp]
+    """Gaussian indices, most important first."""
+    counts: tuple[int, ...]
+    """Number of Gaussians in each level, coarsest first."""
+    covariance_scales: tuple[float, ...]
+    """Factor for the covariances of each level, so that its Gaussians cover
+    about the same opacity-weighted volume as the full splat."""
+
+    def level(self, splat: SplatFile, level: int) -> SplatFile:
+        """Gaussians of one level, in their original order."""
+        indices = np.sort(self.order[: self.counts[level]])
+        return {
+            "centers": splat["centers"][indices],
+            "rgbs": splat["rgbs"][indices],
+            "opacities": splat["opacities"][indices],
+            "covariances": splat["covariances"][indices]
+            * self.covariance_scales[level],
+        }
+
+
+def build_lod(
+    splat: SplatFile,
+    fractions: tuple[float, ...] = (PREVIEW_FRACTION,),
+    seed: int = 0,
+) -> SplatLod:
+    """Importance-sample nested subsets of a splat, each keeping a fraction of
+    its Gaussians. Gaussians are drawn without replacement, with weights
+    proportional to opacity times covariance volume."""
+    num_gaussians = splat["centers"].shape[0]
+    volumes = np.sqrt(np.maximum(np.linalg.det(splat["covariances"]), 0.0))
+    weights = splat["opacities"][:, 0] * volumes
+
+    # Efraimidis-Spirakis: ranking by `log(u) / weight` gives the order in which
+    # weighted sampling without replacement draws the Gaussians. Every level is
+    # a prefix of that ranking, so one sort builds all of them. Zero weights
+    # rank last.
+    uniforms = np.random.default_rng(seed).uniform(size=num_gaussians)
+    with np.errstate(divide="ignore"):
+        keys = np.log(uniforms) / weights
+    order = np.argsort(-keys, kind="stable")
+
+    counts = tuple(
+        min(num_gaussians, max(1, round(fraction * num_gaussians)))
+        for fraction in sorted(fractions)
+    ) + (num_gaussians,)
+
+    # Covariance volume grows with the cube of the scale, and covariances with
+    # its square.
+    sorted_weights = np.cumsum(weights[order])
+    total_weight = sorted_weights[-1] if num_gaussians > 0 else 0.0
+    covariance_scales = tuple(
+        float((total_weight / sorted_weights[count - 1]) ** (2.0 / 3.0))
+        if count > 0 and sorted_weights[count - 1] > 0.0
+        else 1.0
+        for count in counts
+    )
+    return SplatLod(order, counts, covariance_scales)
@@ -0,0 +1,356 @@
+"""Compressed sequences of animation frames.
+
+Frames of an animation share their Gaussians, and consecutive frames only move
+and recolor them a little. Each frame's centers and colors are quantized, then
+stored as residuals from the previous frame, with a keyframe every
+`keyframe_interval` frames for random access. Residuals are zigzag-encoded,
+byte-shuffled so that their mostly-zero high bytes are contiguous, and
+compressed with zlib. Covariances are the same in every frame, so they aren't
+stored.
+
+Centers are quantized on a grid with a step of 1/65535 of the first frame's
+extent, so decoded centers are off by at most half a step on each axis. Colors
+and opacities are stored as the 8-bit values that are sent to clients, so they
+decode to the same values.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from animation import Animation
+from splat_utils import SplatFile
+from viser._scene_handles import colors_to_uint8
+
+KEYFRAME_INTERVAL = 32
+"""Frames between keyframes. Decoding a frame reads at most this many chunks."""
+
+_CENTER_STEPS = 65535
+_MAGIC = b"SPSQ1"
+
+
+@dataclass(frozen=True)
+class EncodedSequence:
+    """Frames encoded by `SequenceEncoder`. Decode them with `SequenceDecoder`."""
+
+    num_gaussians: int
+    origin: tuple[float, float, float]
+    """Center that quantizes to zero."""
+    step: float
+    """Spacing of the grid centers are quantized on."""
+    keyframe_interval: int
+    chunks: tuple[bytes, ...]
+    """One compressed chunk per frame: a keyframe, or residuals from the
+    previous frame."""
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps(
+            {
+                "num_gaussians": self.num_gaussians,
+                "origin": self.origin,
+                "step": self.step,
+                "keyframe_interval": self.keyframe_interval,
+                "chunk_sizes": [len(chunk) for chunk in self.chunks],
+            }
+        ).encode()
+        return b"".join([_MAGIC, struct.pack("<I", len(header)), header, *self.chunks])
+
+    @staticmethod
+    def from_bytes(data: bytes) -> EncodedSequence:
+        if not data.startswith(_MAGIC):
+            raise ValueError("Not an encoded splat sequence")
+        offset = len(_MAGIC)
+        (header_size,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        header = json.loads(data[offset : offset + header_size])
+        offset += header_size
+        chunks = []
+        for chunk_size in header["chunk_sizes"]:
+            chunks.append(data[offset : offset + chunk_size])
+            offset += chunk_size
+        if offset != len(data):
+            raise ValueError("Truncated splat sequence")
+        return EncodedSequence(
+            num_gaussians=header["num_gaussians"],
+            origin=tuple(header["origin"]),  # type: ignore
+            step=header["step"],
+            keyframe_interval=header["keyframe_interval"],
+            chunks=tuple(chunks),
+        )
+
+
+class SequenceEncoder:
+    """Encodes frames one at a time, as they're computed. Quantizing and residuals
+    are computed on the calling thread; compression runs in the background."""
+
+    def __init__(
+        self,
+        keyframe_interval: int = KEYFRAME_INTERVAL,
+        compression_level: int = 1,
+        max_workers: int = 4,
+    ) -> None:
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sequence_encoder"
+        )
+        self._chunks: list[Future[bytes]] = []
+        self._origin: npt.NDArray[np.float64] | None = None
+        self._step: float = 1.0
+        self._previous: tuple[np.ndarray, np.ndarray] | None = None
+
+    def add(self, splat: SplatFile) -> None:
+        """Encode the next frame. All frames need the same number of Gaussians."""
+        centers = np.asarray(splat["centers"], dtype=np.float64)
+        origin = self._origin
+        if origin is None:
+            if centers.shape[0] > 0:
+                origin = centers.min(axis=0)
+                extent = float(np.max(centers.max(axis=0) - origin))
+            else:
+                origin = np.zeros(3)
+                extent = 0.0
+            self._origin = origin
+            self._step = max(extent, 1e-6) / _CENTER_STEPS
+        quantized = _quantize_frame(splat, origin, self._step)
+
+        keyframe = len(self._chunks) % self.keyframe_interval == 0
+        if keyframe:
+            assert self._previous is None or (
+                self._previous[0].shape == quantized[0].shape
+            ), "All frames need the same number of Gaussians"
+            residuals = quantized
+        else:
+            assert self._previous is not None
+            residuals = (
+                quantized[0] - self._previous[0],
+                quantized[1] - self._previous[1],
+            )
+        self._previous = quantized
+        payload = _shuffle(_zigzag(residuals[0])) + _shuffle(_zigzag(residuals[1]))
+        self._chunks.append(
+            self._executor.submit(zlib.compress, payload, self.compression_level)
+        )
+
+    def finish(self) -> EncodedSequence:
+        """Wait for compression to finish, and return the encoded frames."""
+        try:
+            chunks = tuple(chunk.result() for chunk in self._chunks)
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        assert self._origin is not None and self._previous is not None
+        return EncodedSequence(
+            num_gaussians=self._previous[0].shape[1],
+            origin=tuple(float(x) for x in self._origin),  # type: ignore
+            step=self._step,
+            keyframe_interval=self.keyframe_interval,
+            chunks=chunks,
+        )
+
+    def close(self) -> None:
+        """Stop encoding, dropping frames that haven't been compressed."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SequenceDecoder:
+    """Decodes frames of an `EncodedSequence`. Decoding frames in order only
+    reads one chunk per frame; other frames start from the nearest keyframe."""
+
+    def __init__(self, sequence: EncodedSequence, covariances: np.ndarray) -> None:
+        assert covariances.shape == (sequence.num_gaussians, 3, 3)
+        self.sequence = sequence
+        self._covariances = covariances
+        self._origin = np.array(sequence.origin, dtype=np.float64)
+        self._frame = -1
+        self._quantized: tuple[np.ndarray, np.ndarray] | None = None
+
+    def frame(self, index: int) -> SplatFile:
+        interval = self.sequence.keyframe_interval
+        keyframe = index - index % interval
+        if not (keyframe <= self._frame <= index):
+            self._frame = keyframe - 1
+        while self._frame < index:
+            self._frame += 1
+            residuals = self._read_chunk(self._frame)
+            if self._frame % interval == 0:
+                self._quantized = residuals
+            else:
+                assert self._quantized is not None
+                self._quantized = (
+                    self._quantized[0] + residuals[0],
+                    self._quantized[1] + residuals[1],
+                )
+        assert self._quantized is not None
+
+        quantized_centers, rgba = self._quantized
+        centers = (self._origin[:, None] + quantized_centers * self.sequence.step).T
+        # Colors decode to the middle of their 8-bit bin, so that they convert
+        # back to the same 8-bit values.
+        rgba_float = np.ascontiguousarray(
+            (rgba.view(np.uint8).T.astype(np.float32) + 0.5) / 255.0
+        )
+        return {
+            "centers": np.ascontiguousarray(centers, dtype=np.float32),
+            "rgbs": rgba_float[:, :3],
+            "opacities": rgba_float[:, 3:],
+            "covariances": self._covariances,
+        }
+
+    def _read_chunk(self, index: int) -> tuple[np.ndarray, np.ndarray]:
+        num_gaussians = self.sequence.num_gaussians
+        payload = zlib.decompress(self.sequence.chunks[index])
+        centers_size = 3 * num_gaussians * 4
+        return (
+            _unzigzag(
+                _unshuffle(payload[:centers_size], np.uint32, (3, num_gaussians))
+            ),
+            _unzigzag(_unshuffle(payload[centers_size:], np.uint8, (4, num_gaussians))),
+        )
+
+
+def _quantize_frame(
+    splat: SplatFile, origin: np.ndarray, step: float
+) -> tuple[npt.NDArray[np.int32], npt.NDArray[np.int8]]:
+    """Quantized centers (3, N) and rgba (4, N). Axes come first, so that each
+    one is contiguous."""
+    centers = np.asarray(splat["centers"], dtype=np.float64)
+    quantized_centers = np.clip(
+        np.round((centers - origin) / step), -(2**30), 2**30
+    ).astype(np.int32)
+    rgba = np.concatenate(
+        [colors_to_uint8(splat["rgbs"]), colors_to_uint8(splat["opacities"])],
+        axis=-1,
+    )
+    # Residuals of 8-bit values wrap around, so they're kept as int8.
+    return np.ascontiguousarray(quantized_centers.T), np.ascontiguousarray(rgba.T).view(
+        np.int8
+    )
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    """Map signed integers to unsigned ones, with small magnitudes staying small:
+    0, -1, 1, -2, ... become 0, 1, 2, 3, ..."""
+    bits = values.dtype.itemsize * 8
+    unsigned = np.dtype(f"u{values.dtype.itemsize}")
+    return ((values << 1) ^ (values >> (bits - 1))).view(unsigned)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    signed = np.dtype(f"i{values.dtype.itemsize}")
+    return ((values >> 1).view(signed)) ^ -((values & 1).view(signed))
+
+
+def _shuffle(values: np.ndarray) -> bytes:
+    """Bytes of `values`, grouped by their position within each value."""
+    return values.view(np.uint8).reshape((-1, values.dtype.itemsize)).T.tobytes()
+
+
+def _unshuffle(
+    data: bytes, dtype: type[np.unsignedinteger], shape: tuple[int, ...]
+) -> np.ndarray:
+    itemsize = np.dtype(dtype).itemsize
+    planes = np.frombuffer(data, dtype=np.uint8).reshape((itemsize, -1))
+    return np.ascontiguousarray(planes.T).view(dtype).reshape(shape)
+
+
+def sequence_key(
+    splat: SplatFile, animation: Animation, fps: int, total_frames: int
+) -> str:
+    """Key for the frames of an animation of a splat."""
+    digest = hashlib.sha256()
+    for name in ("centers", "rgbs", "opacities", "covariances"):
+        array = np.ascontiguousarray(splat[name])
+        digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+        digest.update(array.data)
+    digest.update(
+        json.dumps(
+            {
+                "centers_code": animation.centers_code,
+                "rgbs_code": animation.rgbs_code,
+                "opacities_code": animation.opacities_code,
+                "fps": fps,
+                "total_frames": total_frames,
+            },
+            sort_keys=True,
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+class SequenceCache:
+    """Size-bounded on-disk cache of encoded animation frames, keyed by
+    `sequence_key()`. Least recently used sequences are evicted first."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = sum(
+            path.stat().st_size for path in self.cache_dir.glob("*/*.splatseq")
+        )
+
+    def get(self, key: str) -> EncodedSequence | None:
+        if self.max_bytes <= 0:
+            return None
+        path = self._path(key)
+        try:
+            sequence = EncodedSequence.from_bytes(path.read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+        # Reads count as uses for least-recently-used eviction.
+        os.utime(path)
+        return sequence
+
+    def put(self, key: str, sequence: EncodedSequence) -> None:
+        if self.max_bytes <= 0:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(sequence.to_bytes())
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += path.stat().st_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        paths = sorted(
+            self.cache_dir.glob("*/*.splatseq"), key=lambda path: path.stat().st_mtime
+        )
+        self._total_bytes = sum(path.stat().st_size for path in paths)
+        for path in paths:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._total_bytes -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.splatseq"
+
+
+# Set FRAME_CACHE_MAX_BYTES=0 to disable the cache.
+sequence_cache = SequenceCache(
+    cache_dir=Path(os.getenv("FRAME_CACHE_DIR", ".frame_cache")),
+    max_bytes=int(os.getenv("FRAME_CACHE_MAX_BYTES", str(2 * 1024**3))),
+)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import time
 from copy import deepcopy
+from dataclasses import dataclass
 from pathlib import Path
 from types import ModuleType
 from typing import TypedDict
@@ -12,6 +13,10 @@ from plyfile import PlyData
 
 from src.viser import transforms as tf
 
+OPACITY_EPSILON = 1.0 / 255.0
+"""Opacities below this are sent to clients as zero alpha, so Gaussians with
+them can be culled without changing what's rendered."""
+
 
 class SplatFile(TypedDict):
     """Data loaded from an antimatter15-style splat file."""
@@ -115,11 +120,56 @@ def load_splat(path: Path) -> SplatFile:
 def compute_splat_at_t(
     t: float, splat: SplatFile, animation_functions: ModuleType
 ) -> SplatFile:
-    tmp_splat = deepcopy(splat)
-
     return {
-        "centers": animation_functions.compute_centers(t, tmp_splat["centers"]),
-        "rgbs": animation_functions.compute_rgbs(t, tmp_splat["rgbs"]),
-        "opacities": animation_functions.compute_opacities(t, tmp_splat["opacities"]),
-        "covariances": tmp_splat["covariances"],
+        "centers": animation_functions.compute_centers(t, deepcopy(splat["centers"])),
+        "rgbs": animation_functions.compute_rgbs(t, deepcopy(splat["rgbs"])),
+        "opacities": animation_functions.compute_opacities(
+            t, deepcopy(splat["opacities"])
+        ),
+        # Animations don't change covariances, so they aren't copied.
+        "covariances": splat["covariances"],
     }
+
+
+@dataclass(frozen=True)
+class CullStats:
+    """How many Gaussians of a splat were culled."""
+
+    total: int
+    kept: int
+
+    @property
+    def culled(self) -> int:
+        return self.total - self.kept
+
+    @property
+    def culled_fraction(self) -> float:
+        return self.culled / self.total if self.total > 0 else 0.0
+
+
+def opaque_indices(
+    splat: SplatFile, epsilon: float = OPACITY_EPSILON
+) -> npt.NDArray[np.intp]:
+    """Indices of the Gaussians with opacities of at least `epsilon`."""
+    return np.flatnonzero(splat["opacities"][:, 0] >= epsilon)
+
+
+def cull_transparent(
+    splat: SplatFile,
+    epsilon: float = OPACITY_EPSILON,
+    keep: npt.NDArray[np.intp] | None = None,
+) -> tuple[SplatFile, CullStats]:
+    """Drop Gaussians with opacities below `epsilon`. Only the kept Gaussians are
+    copied, and the splat is returned as is if none are dropped. `keep` is
+    `opaque_indices(splat, epsilon)`, if it was computed already."""
+    if keep is None:
+        keep = opaque_indices(splat, epsilon)
+    stats = CullStats(total=splat["opacities"].shape[0], kept=keep.shape[0])
+    if stats.culled == 0:
+        return splat, stats
+    return {
+        "centers": np.take(splat["centers"], keep, axis=0),
+        "rgbs": np.take(splat["rgbs"], keep, axis=0),
+        "opacities": np.take(splat["opacities"], keep, axis=0),
+        "covariances": np.take(splat["covariances"], keep, axis=0),
+    }, stats
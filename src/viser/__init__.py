@@ -17,6 +17,7 @@ from ._gui_handles import GuiTabGroupHandle as GuiTabGroupHandle
 from ._gui_handles import GuiTabHandle as GuiTabHandle
 from ._gui_handles import GuiTextHandle as GuiTextHandle
 from ._gui_handles import GuiUploadButtonHandle as GuiUploadButtonHandle
+from ._gui_handles import GuiUploadProgressEvent as GuiUploadProgressEvent
 from ._gui_handles import GuiVector2Handle as GuiVector2Handle
 from ._gui_handles import GuiVector3Handle as GuiVector3Handle
 from ._gui_handles import UploadedFile as UploadedFile
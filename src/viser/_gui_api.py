@@ -5,12 +5,15 @@ import builtins
 import colorsys
 import dataclasses
 import functools
+import mmap
+import tempfile
 import threading
 import time
 from asyncio import AbstractEventLoop
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import (
+    IO,
     TYPE_CHECKING,
     Any,
     Protocol,
@@ -53,6 +56,7 @@ from ._gui_handles import (
     GuiTabGroupHandle,
     GuiTextHandle,
     GuiUploadButtonHandle,
+    GuiUploadProgressEvent,
     GuiVector2Handle,
     GuiVector3Handle,
     SupportsRemoveProtocol,
@@ -163,10 +167,14 @@ def get_type_hints_cached(cls: type[Any]) -> dict[str, Any]:
 
 
 class _FileUploadState(TypedDict):
+    client_id: ClientId
+    source_component_uuid: str
     filename: str
     mime_type: str
     part_count: int
     parts: dict[int, bytes]
+    spool_file: IO[bytes] | None
+    """Temporary file that parts are written to, instead of `parts`."""
     total_bytes: int
     transferred_bytes: int
     lock: threading.Lock
@@ -288,13 +296,29 @@ class GuiApi:
     def _handle_file_transfer_start(
         self, client_id: ClientId, message: _messages.FileTransferStart
     ) -> None:
-        if message.source_component_uuid not in self._gui_input_handle_from_uuid:
+        handle = self._gui_input_handle_from_uuid.get(
+            message.source_component_uuid or "", None
+        )
+        if handle is None:
             return
+
+        spool_file = None
+        if handle._impl.spool_uploads:
+            spool_file = tempfile.NamedTemporaryFile(
+                prefix="viser-upload-",
+                suffix=Path(message.filename).suffix,
+                delete=False,
+            )
+            spool_file.truncate(message.size_bytes)
+
         self._current_file_upload_states[message.transfer_uuid] = {
+            "client_id": client_id,
+            "source_component_uuid": handle._impl.uuid,
             "filename": message.filename,
             "mime_type": message.mime_type,
             "part_count": message.part_count,
             "parts": {},
+            "spool_file": spool_file,
             "total_bytes": message.size_bytes,
             "transferred_bytes": 0,
             "lock": threading.Lock(),
@@ -308,11 +332,26 @@ class GuiApi:
         assert message.source_component_uuid in self._gui_input_handle_from_uuid
 
         state = self._current_file_upload_states[message.transfer_uuid]
-        state["parts"][message.part] = message.content
         total_bytes = state["total_bytes"]
 
         with state["lock"]:
+            spool_file = state["spool_file"]
+            if spool_file is not None and spool_file.closed:
+                # The upload was aborted.
+                return
+            if spool_file is None:
+                state["parts"][message.part] = message.content
+            else:
+                # The client splits files into equal parts, except for a
+                # shorter last part.
+                if message.part == state["part_count"] - 1:
+                    offset = total_bytes - len(message.content)
+                else:
+                    offset = message.part * len(message.content)
+                spool_file.seek(offset)
+                spool_file.write(message.content)
             state["transferred_bytes"] += len(message.content)
+            transferred_bytes = state["transferred_bytes"]
 
             # Send ack to the server.
             self._websock_interface.queue_message(
@@ -324,49 +363,118 @@ class GuiApi:
                 )
             )
 
-            if state["transferred_bytes"] < total_bytes:
-                return
+        handle = self._gui_input_handle_from_uuid.get(
+            message.source_component_uuid, None
+        )
+        client = self._get_client(client_id)
+        if handle is not None and client is not None:
+            for progress_cb in handle._impl.upload_progress_cb:
+                event = GuiUploadProgressEvent(
+                    client,
+                    client_id,
+                    cast(GuiUploadButtonHandle, handle),
+                    filename=state["filename"],
+                    transferred_bytes=transferred_bytes,
+                    total_bytes=total_bytes,
+                )
+                if asyncio.iscoroutinefunction(progress_cb):
+                    self._event_loop.create_task(progress_cb(event))
+                else:
+                    self._thread_executor.submit(progress_cb, event)
+
+        if transferred_bytes < total_bytes:
+            return
 
         # Finish the upload.
-        assert state["transferred_bytes"] == total_bytes
+        assert transferred_bytes == total_bytes
         state = self._current_file_upload_states.pop(message.transfer_uuid)
 
-        handle = self._gui_input_handle_from_uuid.get(
-            message.source_component_uuid, None
-        )
+        spool_file = state["spool_file"]
+        if spool_file is None:
+            value = UploadedFile(
+                name=state["filename"],
+                content=b"".join(state["parts"][i] for i in range(state["part_count"])),
+            )
+        else:
+            spool_file.close()
+            path = Path(spool_file.name)
+            if total_bytes == 0:
+                view = memoryview(b"")
+            else:
+                with open(path, "rb") as file:
+                    view = memoryview(
+                        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                    )
+            value = UploadedFile(
+                name=state["filename"], content=b"", path=path, view=view
+            )
+
         if handle is None:
+            value._delete_spooled_file()
             return
 
         handle_state = handle._impl
 
-        value = UploadedFile(
-            name=state["filename"],
-            content=b"".join(state["parts"][i] for i in range(state["part_count"])),
-        )
-
         # Update state.
+        handle_state.value._delete_spooled_file()
         handle_state.value = value
         handle_state.update_timestamp = time.time()
 
         # Trigger callbacks.
+        if client is None:
+            return
         for cb in handle_state.update_cb:
-            from ._viser import ClientHandle, ViserServer
-
-            # Get the handle of the client that triggered this event.
-            if isinstance(self._owner, ClientHandle):
-                client = self._owner
-            elif isinstance(self._owner, ViserServer):
-                client = self._owner._connected_clients.get(client_id, None)
-                if client is None:
-                    return
-            else:
-                assert False
-
             if asyncio.iscoroutinefunction(cb):
                 self._event_loop.create_task(cb(GuiEvent(client, client_id, handle)))
             else:
                 self._thread_executor.submit(cb, GuiEvent(client, client_id, handle))
 
+    def _abort_file_uploads(
+        self,
+        client_id: ClientId | None = None,
+        source_component_uuid: str | None = None,
+    ) -> None:
+        """Drop unfinished uploads from a client, or to a GUI element, or all of
+        them if neither is set. Their spooled files are deleted."""
+        for transfer_uuid, state in tuple(self._current_file_upload_states.items()):
+            if client_id is not None and state["client_id"] != client_id:
+                continue
+            if (
+                source_component_uuid is not None
+                and state["source_component_uuid"] != source_component_uuid
+            ):
+                continue
+            self._current_file_upload_states.pop(transfer_uuid, None)
+            spool_file = state["spool_file"]
+            if spool_file is None:
+                continue
+            with state["lock"]:
+                spool_file.close()
+            try:
+                Path(spool_file.name).unlink()
+            except OSError:
+                pass
+
+    def _delete_spooled_files(self) -> None:
+        """Delete the files of all uploads spooled to disk, including finished
+        ones. For when the server stops."""
+        self._abort_file_uploads()
+        for handle in tuple(self._gui_input_handle_from_uuid.values()):
+            if isinstance(handle._impl.value, UploadedFile):
+                handle._impl.value._delete_spooled_file()
+
+    def _get_client(self, client_id: ClientId) -> ClientHandle | None:
+        """Get the handle of a client that sent a message, or None if it has
+        disconnected."""
+        from ._viser import ClientHandle, ViserServer
+
+        if isinstance(self._owner, ClientHandle):
+            return self._owner
+        elif isinstance(self._owner, ViserServer):
+            return self._owner._connected_clients.get(client_id, None)
+        else:
+            assert False
+
     def _get_container_uuid(self) -> str:
         """Get container ID associated with the current thread."""
         return self._target_container_from_thread_id.get(threading.get_ident(), "root")
@@ -758,6 +866,7 @@ class GuiApi:
         icon: IconName | None = None,
         mime_type: str = "*/*",
         order: float | None = None,
+        spool_to_disk: bool = False,
     ) -> GuiUploadButtonHandle:
         """Add a button to the GUI. The value of this input is set to `True` every time
         it is clicked; to detect clicks, we can manually set it back to `False`.
@@ -771,6 +880,10 @@ class GuiApi:
             icon: Optional icon to display on the button.
             mime_type: Optional MIME type to filter the files that can be uploaded.
             order: Optional ordering, smallest values will be displayed first.
+            spool_to_disk: Write uploaded files to temporary files as their parts
+                arrive, instead of holding them in memory. The value's `path` and
+                `view` are then set, instead of its `content`. Useful for large
+                files.
 
         Returns:
             A handle that can be used to interact with the GUI element.
@@ -779,26 +892,26 @@ class GuiApi:
         # Re-wrap the GUI handle with a button interface.
         uuid = _make_uuid()
         order = _apply_default_order(order)
-        return GuiUploadButtonHandle(
-            self._create_gui_input(
-                value=UploadedFile("", b""),
-                message=_messages.GuiUploadButtonMessage(
-                    uuid=uuid,
-                    container_uuid=self._get_container_uuid(),
-                    props=_messages.GuiUploadButtonProps(
-                        disabled=disabled,
-                        visible=visible,
-                        order=order,
-                        label=label,
-                        hint=hint,
-                        color=color,
-                        mime_type=mime_type,
-                        _icon_html=None if icon is None else svg_from_icon(icon),
-                    ),
+        handle_state = self._create_gui_input(
+            value=UploadedFile("", b""),
+            message=_messages.GuiUploadButtonMessage(
+                uuid=uuid,
+                container_uuid=self._get_container_uuid(),
+                props=_messages.GuiUploadButtonProps(
+                    disabled=disabled,
+                    visible=visible,
+                    order=order,
+                    label=label,
+                    hint=hint,
+                    color=color,
+                    mime_type=mime_type,
+                    _icon_html=None if icon is None else svg_from_icon(icon),
                 ),
-                is_button=True,
-            )
+            ),
+            is_button=True,
         )
+        handle_state.spool_uploads = spool_to_disk
+        return GuiUploadButtonHandle(handle_state)
 
     def add_button_group(
         self,
@@ -109,6 +109,16 @@ class _GuiHandleState(Generic[T]):
     sync_cb: Callable[[ClientId, dict[str, Any]], None] | None = None
     """Callback for synchronizing inputs across clients."""
 
+    upload_progress_cb: list[Callable[[GuiUploadProgressEvent], None | Coroutine]] = (
+        dataclasses.field(default_factory=list)
+    )
+    """Registered functions to call as parts of a file are uploaded. Only used
+    by upload buttons."""
+
+    spool_uploads: bool = False
+    """Write uploaded files to temporary files instead of memory. Only used by
+    upload buttons."""
+
     removed: bool = False
 
 
@@ -192,6 +202,9 @@ class _GuiHandle(
 
         if isinstance(self, _GuiInputHandle):
             gui_api._gui_input_handle_from_uuid.pop(self._impl.uuid)
+        if isinstance(self._impl.value, UploadedFile):
+            gui_api._abort_file_uploads(source_component_uuid=self._impl.uuid)
+            self._impl.value._delete_spooled_file()
 
 
 class _GuiInputHandle(
@@ -427,7 +440,37 @@ class UploadedFile:
     name: str
     """Name of the file."""
     content: bytes
-    """Contents of the file."""
+    """Contents of the file. Empty for files spooled to disk; read `view` or
+    `path` instead."""
+    path: Path | None = None
+    """Path to the file on the server, if it was spooled to disk. It's deleted
+    when the next file is uploaded to the same button, or when the button is
+    removed."""
+    view: memoryview | None = None
+    """Read-only view of the memory-mapped file, if it was spooled to disk. Its
+    pages are only read as they're accessed."""
+
+    def _delete_spooled_file(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.unlink()
+        except OSError:
+            # The file might still be mapped, which prevents deleting it on
+            # Windows.
+            pass
+
+
+@dataclasses.dataclass(frozen=True)
+class GuiUploadProgressEvent(GuiEvent["GuiUploadButtonHandle"]):
+    """Progress of a file upload. Passed as input to upload progress callbacks."""
+
+    filename: str
+    """Name of the file being uploaded."""
+    transferred_bytes: int
+    """Number of bytes received so far."""
+    total_bytes: int
+    """Size of the file."""
 
 
 class GuiUploadButtonHandle(_GuiInputHandle[UploadedFile]):
@@ -455,6 +498,19 @@ class GuiUploadButtonHandle(_GuiInputHandle[UploadedFile]):
         self._impl.update_cb.append(func)
         return func
 
+    def on_upload_progress(
+        self,
+        func: Callable[[GuiUploadProgressEvent], NoneOrCoroutine],
+    ) -> Callable[[GuiUploadProgressEvent], NoneOrCoroutine]:
+        """Attach a function to call each time a part of a file is received.
+
+        Note:
+        - If `func` is a regular function (defined with `def`), it will be executed in a thread pool.
+        - If `func` is an async function (defined with `async def`), it will be executed in the event loop.
+        """
+        self._impl.upload_progress_cb.append(func)
+        return func
+
 
 class GuiButtonGroupHandle(_GuiInputHandle[str], GuiButtonGroupProps):
     """Handle for a button group input in our visualizer.
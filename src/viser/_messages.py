@@ -698,6 +698,25 @@ class SetPositionMessage(Message):
     position: Tuple[float, float, float]
 
 
+@dataclasses.dataclass
+class SetTransformsMessage(Message):
+    """Server -> client message to set the orientations and positions of many
+    scene nodes at once.
+
+    As with all other messages, transforms take the `T_parent_local` convention."""
+
+    names: Tuple[str, ...]
+    wxyzs: npt.NDArray[np.float32]
+    """Float array of shape (N, 4), with the orientation of each node."""
+    positions: npt.NDArray[np.float32]
+    """Float array of shape (N, 3), with the position of each node."""
+
+    @override
+    def redundancy_key(self) -> str:
+        # Updates of the same set of nodes replace each other.
+        return type(self).__name__ + "_" + "\n".join(self.names)
+
+
 @dataclasses.dataclass
 class TransformControlsUpdateMessage(Message):
     """Client -> server message when a transform control is updated.
@@ -1279,7 +1298,21 @@ class GaussianSplatsProps:
     - cov5 (f16), cov6 (f16)
     - rgba (int32)
 
-    Where cov1-6 are the upper-triangular terms of covariance matrices."""
+    Where cov1-6 are the upper-triangular terms of covariance matrices.
+
+    If `quantization` is set, the buffer instead holds 4 words per Gaussian, in
+    the layout of `_splat_quantization.py`."""
+    quantization: Optional[
+        Tuple[float, float, float, float, float, float, float, float]
+    ]
+    """Bounds of the quantized layout: min x, y, z and max x, y, z of centers,
+    then min and max log-scale. None for the unquantized layout."""
+    exclusive_group: Optional[str]
+    """Splat nodes that share an exclusive group are alternatives to each other,
+    like the frames of an animation, and at most one of them should be visible
+    at a time. When a member is shown, clients keep drawing the member it
+    replaces until the new one is sorted. Synchronized automatically when
+    assigned."""
 
 
 @dataclasses.dataclass
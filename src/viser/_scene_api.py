@@ -4,7 +4,7 @@ import asyncio
 import io
 import time
 import warnings
-from collections.abc import Coroutine
+from collections.abc import Coroutine, Sequence
 from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Callable, Tuple, TypeVar, Union, cast, get_args
 
@@ -46,6 +46,7 @@ from ._scene_handles import (
     _TransformControlsState,
     colors_to_uint8,
 )
+from ._splat_quantization import QuantizationBounds, quantize_gaussian_splats
 
 if TYPE_CHECKING:
     import trimesh
@@ -111,6 +112,41 @@ def cast_vector(vector: TVector | np.ndarray, length: int) -> TVector:
     return cast(TVector, tuple(map(float, vector)))
 
 
+def pack_gaussian_splats(
+    centers: np.ndarray,
+    covariances: np.ndarray,
+    rgbs: np.ndarray,
+    opacities: np.ndarray,
+) -> np.ndarray:
+    """Pack Gaussians into the (N, 8) uint32 layout sent to the client."""
+    num_gaussians = centers.shape[0]
+    assert centers.shape == (num_gaussians, 3)
+    assert rgbs.shape == (num_gaussians, 3)
+    assert opacities.shape == (num_gaussians, 1)
+    assert covariances.shape == (num_gaussians, 3, 3)
+
+    # Get upper-triangular terms of covariance matrix.
+    cov_triu = covariances.reshape((-1, 9))[:, np.array([0, 1, 2, 4, 5, 8])]
+    buffer = np.concatenate(
+        [
+            # First texelFetch.
+            # - xyz (96 bits): centers.
+            centers.astype(np.float32).view(np.uint8),
+            # - w (32 bits): this is reserved for use by the renderer.
+            np.zeros((num_gaussians, 4), dtype=np.uint8),
+            # Second texelFetch.
+            # - xyz (96 bits): upper-triangular terms of covariance.
+            cov_triu.astype(np.float16).copy().view(np.uint8),
+            # - w (32 bits): rgba.
+            colors_to_uint8(rgbs),
+            colors_to_uint8(opacities),
+        ],
+        axis=-1,
+    ).view(np.uint32)
+    assert buffer.shape == (num_gaussians, 8)
+    return buffer
+
+
 class SceneApi:
     """Interface for adding 3D primitives to the scene.
 
@@ -261,6 +297,50 @@ class SceneApi:
             _messages.SetSceneNodeVisibilityMessage("", visible)
         )
 
+    def set_transforms(
+        self,
+        names: Sequence[str],
+        wxyzs: np.ndarray,
+        positions: np.ndarray,
+    ) -> None:
+        """Set the orientations and positions of many scene nodes at once.
+
+        Assigning `SceneNodeHandle.wxyz` and `SceneNodeHandle.position` sends a
+        message per node and attribute. This sends a single message for all of
+        the nodes, which is much cheaper for posing many nodes per update, like
+        the links of a URDF.
+
+        Args:
+            names: Names of the scene nodes. (N,)
+            wxyzs: R_parent_local orientation of each node, as quaternions.
+                (N, 4).
+            positions: t_parent_local translation of each node. (N, 3).
+        """
+        num_nodes = len(names)
+        assert wxyzs.shape == (
+            num_nodes,
+            4,
+        ), f"Expected orientations of shape {(num_nodes, 4)}, but got {wxyzs.shape}"
+        assert positions.shape == (
+            num_nodes,
+            3,
+        ), f"Expected positions of shape {(num_nodes, 3)}, but got {positions.shape}"
+
+        # Keep handles in sync with what clients will show.
+        for name, wxyz, position in zip(names, wxyzs, positions):
+            handle = self._handle_from_node_name.get(name, None)
+            if handle is not None:
+                handle._impl.wxyz[:] = wxyz
+                handle._impl.position[:] = position
+
+        self._websock_interface.queue_message(
+            _messages.SetTransformsMessage(
+                names=tuple(names),
+                wxyzs=wxyzs.astype(np.float32),
+                positions=positions.astype(np.float32),
+            )
+        )
+
     def add_light_directional(
         self,
         name: str,
@@ -1293,6 +1373,8 @@ class SceneApi:
         wxyz: Tuple[float, float, float, float] | np.ndarray = (1.0, 0.0, 0.0, 0.0),
         position: Tuple[float, float, float] | np.ndarray = (0.0, 0.0, 0.0),
         visible: bool = True,
+        exclusive_group: str | None = None,
+        encoding: Literal["float", "quantized"] = "float",
     ) -> GaussianSplatHandle:
         """Add a model to render using Gaussian Splatting.
 
@@ -1308,40 +1390,69 @@ class SceneApi:
             wxyz: R_parent_local transformation.
             position: t_parent_local transformation.
             visible: Initial visibility of scene node.
+            exclusive_group: Name shared by splat nodes that are never visible
+                at the same time, like animation frames. Clients only sort and
+                draw the visible member.
+            encoding: Layout used to send the Gaussians. "quantized" takes half
+                the bytes of "float", with small errors in centers, scales,
+                and rotations; see `_splat_quantization.py` for the bounds.
 
         Returns:
             Scene node handle.
         """
-        num_gaussians = centers.shape[0]
-        assert centers.shape == (num_gaussians, 3)
-        assert rgbs.shape == (num_gaussians, 3)
-        assert opacities.shape == (num_gaussians, 1)
-        assert covariances.shape == (num_gaussians, 3, 3)
-
-        # Get upper-triangular terms of covariance matrix.
-        cov_triu = covariances.reshape((-1, 9))[:, np.array([0, 1, 2, 4, 5, 8])]
-        buffer = np.concatenate(
-            [
-                # First texelFetch.
-                # - xyz (96 bits): centers.
-                centers.astype(np.float32).view(np.uint8),
-                # - w (32 bits): this is reserved for use by the renderer.
-                np.zeros((num_gaussians, 4), dtype=np.uint8),
-                # Second texelFetch.
-                # - xyz (96 bits): upper-triangular terms of covariance.
-                cov_triu.astype(np.float16).copy().view(np.uint8),
-                # - w (32 bits): rgba.
-                colors_to_uint8(rgbs),
-                colors_to_uint8(opacities),
-            ],
-            axis=-1,
-        ).view(np.uint32)
-        assert buffer.shape == (num_gaussians, 8)
+        if encoding == "quantized":
+            buffer, quantization = quantize_gaussian_splats(
+                centers, covariances, rgbs, opacities
+            )
+        else:
+            buffer = pack_gaussian_splats(centers, covariances, rgbs, opacities)
+            quantization = None
+        return self.add_packed_gaussian_splats(
+            name, buffer, wxyz, position, visible, exclusive_group, quantization
+        )
 
+    def add_packed_gaussian_splats(
+        self,
+        name: str,
+        buffer: np.ndarray,
+        wxyz: Tuple[float, float, float, float] | np.ndarray = (1.0, 0.0, 0.0, 0.0),
+        position: Tuple[float, float, float] | np.ndarray = (0.0, 0.0, 0.0),
+        visible: bool = True,
+        exclusive_group: str | None = None,
+        quantization: QuantizationBounds | None = None,
+    ) -> GaussianSplatHandle:
+        """Add Gaussians that were already packed with `pack_gaussian_splats()`,
+        or with `quantize_gaussian_splats()`.
+        Useful for sending the same Gaussians many times without packing them
+        again. Read-only buffers are shared with the scene node, not copied.
+
+        **Experimental.** This feature is experimental and still under
+        development. It may be changed or removed.
+
+        Arguments:
+            name: Scene node name.
+            buffer: Packed Gaussians. (N, 8), uint32, or (N, 4) if quantized.
+            wxyz: R_parent_local transformation.
+            position: t_parent_local transformation.
+            visible: Initial visibility of scene node.
+            exclusive_group: Name shared by splat nodes that are never visible
+                at the same time, like animation frames. Clients only sort and
+                draw the visible member.
+            quantization: Bounds returned by `quantize_gaussian_splats()`, if
+                the buffer is quantized.
+
+        Returns:
+            Scene node handle.
+        """
+        words_per_gaussian = 8 if quantization is None else 4
+        assert buffer.dtype == np.uint32
+        assert buffer.shape[1:] == (words_per_gaussian,)
         message = _messages.GaussianSplatsMessage(
             name=name,
             props=_messages.GaussianSplatsProps(
                 buffer=buffer,
+                quantization=quantization,
+                exclusive_group=exclusive_group,
             ),
         )
         node_handle = GaussianSplatHandle._make(
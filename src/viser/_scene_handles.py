@@ -181,7 +181,13 @@ class SceneNodeHandle:
         assert isinstance(message, _messages.Message)
         api._websock_interface.queue_message(message)
 
-        out = cls(_SceneNodeHandleState(name, copy.deepcopy(message.props), api))
+        # Read-only arrays can't change under us, so they're shared instead of copied.
+        memo = {
+            id(value): value
+            for value in vars(message.props).values()
+            if isinstance(value, np.ndarray) and not value.flags.writeable
+        }
+        out = cls(_SceneNodeHandleState(name, copy.deepcopy(message.props, memo), api))
         api._handle_from_node_name[name] = out
 
         out.wxyz = wxyz
@@ -0,0 +1,286 @@
+"""Quantized layout for Gaussian splats. It takes 16 bytes per Gaussian, instead
+of the 32 bytes of `pack_gaussian_splats()`.
+
+Each Gaussian is stored as four little-endian uint32 words:
+
+- word 0: x (16 bits), y (16 bits).
+- word 1: z (16 bits), log-scale 0 (8 bits), log-scale 1 (8 bits).
+- word 2: log-scale 2 (8 bits), rotation (23 bits), unused (1 bit).
+- word 3: rgba (4 x 8 bits), as in the unquantized layout.
+
+Centers are stored relative to the bounding box of the node's Gaussians. Log
+scales are stored relative to their range. Both ranges are sent in
+`GaussianSplatsProps.quantization`. Rotations use the "smallest three"
+quaternion encoding. It stores the index of the largest component in 2 bits,
+then each of the other three in 7 bits over [-1/sqrt(2), 1/sqrt(2)].
+
+Error bounds of a round trip:
+
+- Centers are off by at most (max - min) / 65535 / 2 on each axis.
+- Scales are off by a factor of at most exp((max_log - min_log) / 255 / 2).
+  Scales below 1e-6 of the largest one are first raised to it.
+- Rotations are off by at most 2.5 degrees. Each stored quaternion component
+  is off by at most sqrt(2) / 254, and the largest component is recovered
+  from the other three.
+- Colors and opacities are the same as in the unquantized layout.
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from . import transforms as tf
+from ._scene_handles import colors_to_uint8
+
+QuantizationBounds = Tuple[float, float, float, float, float, float, float, float]
+"""Min x, y, z and max x, y, z of centers, then min and max log-scale."""
+
+_MIN_RELATIVE_SCALE = 1e-6
+"""Scales are stored at least this fraction of the largest scale."""
+
+_MAX_COMPONENT = 1.0 / np.sqrt(2.0)
+"""Bound on the three smallest components of a unit quaternion."""
+
+
+DecomposedCovariances = Tuple[npt.NDArray[np.float64], npt.NDArray[np.uint32]]
+"""Scales (N, 3) and encoded rotations (N,), see `decompose_covariances()`."""
+
+
+def decompose_covariances(covariances: np.ndarray) -> DecomposedCovariances:
+    """Scales and encoded rotations of covariances (N, 3, 3), as used by
+    `quantize_gaussian_splats()`. This is most of the cost of quantizing, so
+    covariances shared by many splats, like the frames of an animation, can be
+    decomposed once. Rows can be selected from the result like from
+    `covariances`."""
+    scales, Rs = _decompose_covariances(covariances)
+    return scales, _encode_rotations(tf.SO3.from_matrix(Rs).wxyz)
+
+
+def quantize_gaussian_splats(
+    centers: np.ndarray,
+    covariances: np.ndarray,
+    rgbs: np.ndarray,
+    opacities: np.ndarray,
+    decomposed: DecomposedCovariances | None = None,
+) -> tuple[npt.NDArray[np.uint32], QuantizationBounds]:
+    """Pack Gaussians into the quantized (N, 4) uint32 layout. Returns the
+    buffer and the bounds needed to decode it. `decomposed` is
+    `decompose_covariances(covariances)`, if it was computed already."""
+    num_gaussians = centers.shape[0]
+    assert centers.shape == (num_gaussians, 3)
+    assert rgbs.shape == (num_gaussians, 3)
+    assert opacities.shape == (num_gaussians, 1)
+    assert covariances.shape == (num_gaussians, 3, 3)
+
+    if decomposed is None:
+        decomposed = decompose_covariances(covariances)
+    scales, rotations = decomposed
+    assert scales.shape == (num_gaussians, 3)
+    assert rotations.shape == (num_gaussians,)
+    # Flat Gaussians would otherwise stretch the log-scale range, and with it the
+    # error of every other scale.
+    min_scale = max(float(scales.max(initial=0.0)) * _MIN_RELATIVE_SCALE, 1e-30)
+    log_scales = np.log(np.maximum(scales, min_scale))
+    if num_gaussians > 0:
+        center_min = centers.min(axis=0).astype(np.float64)
+        center_max = centers.max(axis=0).astype(np.float64)
+        log_scale_min = float(log_scales.min())
+        log_scale_max = float(log_scales.max())
+    else:
+        center_min = center_max = np.zeros(3)
+        log_scale_min = log_scale_max = 0.0
+
+    quantized_centers = _quantize(centers, center_min, center_max, 16)
+    quantized_log_scales = _quantize(log_scales, log_scale_min, log_scale_max, 8)
+    rgba = np.concatenate(
+        [colors_to_uint8(rgbs), colors_to_uint8(opacities)], axis=-1
+    ).view(np.uint32)[:, 0]
+
+    buffer = np.empty((num_gaussians, 4), dtype=np.uint32)
+    buffer[:, 0] = quantized_centers[:, 0] | (quantized_centers[:, 1] << 16)
+    buffer[:, 1] = (
+        quantized_centers[:, 2]
+        | (quantized_log_scales[:, 0] << 16)
+        | (quantized_log_scales[:, 1] << 24)
+    )
+    buffer[:, 2] = quantized_log_scales[:, 2] | (rotations << 8)
+    buffer[:, 3] = rgba
+    bounds: QuantizationBounds = (
+        *(float(x) for x in center_min),
+        *(float(x) for x in center_max),
+        log_scale_min,
+        log_scale_max,
+    )  # type: ignore
+    return buffer, bounds
+
+
+def dequantize_gaussian_splats(
+    buffer: npt.NDArray[np.uint32], bounds: QuantizationBounds
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Decode the quantized layout. Returns centers (N, 3), covariances
+    (N, 3, 3), rgbs (N, 3), and opacities (N, 1)."""
+    assert buffer.dtype == np.uint32 and buffer.shape[1:] == (4,)
+    center_min = np.array(bounds[0:3])
+    center_max = np.array(bounds[3:6])
+    log_scale_min, log_scale_max = bounds[6], bounds[7]
+
+    quantized_centers = np.stack(
+        [buffer[:, 0] & 0xFFFF, buffer[:, 0] >> 16, buffer[:, 1] & 0xFFFF], axis=-1
+    )
+    quantized_log_scales = np.stack(
+        [(buffer[:, 1] >> 16) & 0xFF, buffer[:, 1] >> 24, buffer[:, 2] & 0xFF],
+        axis=-1,
+    )
+    centers = _dequantize(quantized_centers, center_min, center_max, 16)
+    scales = np.exp(_dequantize(quantized_log_scales, log_scale_min, log_scale_max, 8))
+    Rs = tf.SO3(_decode_rotations((buffer[:, 2] >> 8).astype(np.uint32))).as_matrix()
+    covariances = np.einsum("nij,nj,nkj->nik", Rs, scales**2, Rs)
+    rgba = buffer[:, 3:4].view(np.uint8) / 255.0
+    return centers, covariances, rgba[:, :3], rgba[:, 3:]
+
+
+def _quantize(
+    values: np.ndarray,
+    low: np.ndarray | float,
+    high: np.ndarray | float,
+    bits: int,
+) -> npt.NDArray[np.uint32]:
+    levels = (1 << bits) - 1
+    span = np.maximum(np.asarray(high) - np.asarray(low), 1e-30)
+    return np.clip(np.round((values - low) / span * levels), 0, levels).astype(
+        np.uint32
+    )
+
+
+def _dequantize(
+    quantized: np.ndarray,
+    low: np.ndarray | float,
+    high: np.ndarray | float,
+    bits: int,
+) -> np.ndarray:
+    levels = (1 << bits) - 1
+    return low + quantized / levels * (np.asarray(high) - np.asarray(low))
+
+
+def _encode_rotations(wxyzs: np.ndarray) -> npt.NDArray[np.uint32]:
+    """Smallest three encoding of quaternions, in 23 bits."""
+    largest = np.argmax(np.abs(wxyzs), axis=-1)
+    # q and -q are the same rotation; make the dropped component positive.
+    signs = np.sign(np.take_along_axis(wxyzs, largest[:, None], axis=-1))
+    wxyzs = wxyzs * np.where(signs == 0.0, 1.0, signs)
+    encoded = largest.astype(np.uint32)
+    for slot in range(3):
+        # Components other than the largest, in order.
+        component_index = slot + (slot >= largest)
+        component = np.take_along_axis(wxyzs, component_index[:, None], axis=-1)
+        quantized = _quantize(component[:, 0], -_MAX_COMPONENT, _MAX_COMPONENT, 7)
+        encoded |= quantized << (2 + 7 * slot)
+    return encoded
+
+
+def _decode_rotations(encoded: npt.NDArray[np.uint32]) -> np.ndarray:
+    largest = (encoded & 0b11).astype(np.intp)
+    wxyzs = np.zeros((encoded.shape[0], 4))
+    rows = np.arange(encoded.shape[0])
+    for slot in range(3):
+        component_index = slot + (slot >= largest)
+        quantized = (encoded >> (2 + 7 * slot)) & 0x7F
+        wxyzs[rows, component_index] = _dequantize(
+            quantized, -_MAX_COMPONENT, _MAX_COMPONENT, 7
+        )
+    wxyzs[rows, largest] = np.sqrt(np.maximum(1.0 - np.sum(wxyzs**2, axis=-1), 0.0))
+    return wxyzs / np.linalg.norm(wxyzs, axis=-1, keepdims=True)
+
+
+def _decompose_covariances(
+    covariances: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Scales (N, 3) and rotation matrices (N, 3, 3), such that each covariance
+    is `R @ diag(scales**2) @ R.T`.
+
+    Uses closed-form eigenvalues, which are much faster than `np.linalg.eigh()`
+    for many 3x3 matrices. Eigenvectors come from cross products of rows of
+    `cov - eigenvalue * I`. Matrices with repeated eigenvalues fall back to
+    `np.linalg.eigh()`."""
+    cov = covariances.astype(np.float64)
+    num_gaussians = cov.shape[0]
+    # Contiguous copies of the entries make the elementwise math below fast.
+    a00, a11, a22, a01, a02, a12 = np.ascontiguousarray(
+        cov.reshape((num_gaussians, 9))[:, [0, 4, 8, 1, 2, 5]].T
+    )
+
+    # Eigenvalues of symmetric 3x3 matrices, via the trigonometric solution.
+    mean = (a00 + a11 + a22) / 3.0
+    p = np.sqrt(
+        ((a00 - mean) ** 2 + (a11 - mean) ** 2 + (a22 - mean) ** 2)
+        + 2.0 * (a01**2 + a02**2 + a12**2)
+    ) / np.sqrt(6.0)
+    safe_p = np.where(p > 0.0, p, 1.0)
+    b00, b11, b22 = (a00 - mean) / safe_p, (a11 - mean) / safe_p, (a22 - mean) / safe_p
+    b01, b02, b12 = a01 / safe_p, a02 / safe_p, a12 / safe_p
+    half_det = (
+        b00 * (b11 * b22 - b12 * b12)
+        - b01 * (b01 * b22 - b12 * b02)
+        + b02 * (b01 * b12 - b11 * b02)
+    ) / 2.0
+    phi = np.arccos(np.clip(half_det, -1.0, 1.0)) / 3.0
+    eig_max = mean + 2.0 * p * np.cos(phi)
+    eig_min = mean + 2.0 * p * np.cos(phi + 2.0 * np.pi / 3.0)
+    eig_mid = 3.0 * mean - eig_max - eig_min
+
+    entries = (a00, a11, a22, a01, a02, a12)
+    v_max = _null_vectors(*entries, eig_max)
+    v_min = _null_vectors(*entries, eig_min)
+    v_min = v_min - np.sum(v_min * v_max, axis=-1, keepdims=True) * v_max
+    v_min /= np.maximum(np.linalg.norm(v_min, axis=-1, keepdims=True), 1e-30)
+    Rs = np.stack([v_max, np.cross(v_min, v_max), v_min], axis=-1)
+    eigenvalues = np.stack([eig_max, eig_mid, eig_min], axis=-1)
+
+    # Eigenvectors are ill-defined for repeated eigenvalues.
+    gap = np.minimum(eig_max - eig_mid, eig_mid - eig_min)
+    isotropic = p <= 1e-9 * np.abs(mean)
+    Rs[isotropic] = np.eye(3)
+    eigenvalues[isotropic] = mean[isotropic, None]
+    fallback = ~isotropic & ~(gap > 1e-4 * p)
+    if np.any(fallback):
+        fallback_eigenvalues, fallback_Rs = np.linalg.eigh(cov[fallback])
+        # Make rotations proper.
+        fallback_Rs[np.linalg.det(fallback_Rs) < 0, :, 0] *= -1.0
+        eigenvalues[fallback] = fallback_eigenvalues
+        Rs[fallback] = fallback_Rs
+
+    assert Rs.shape == (num_gaussians, 3, 3)
+    return np.sqrt(np.maximum(eigenvalues, 0.0)), Rs
+
+
+def _null_vectors(
+    a00: np.ndarray,
+    a11: np.ndarray,
+    a22: np.ndarray,
+    a01: np.ndarray,
+    a02: np.ndarray,
+    a12: np.ndarray,
+    eigenvalues: np.ndarray,
+) -> np.ndarray:
+    """Unit eigenvectors for simple eigenvalues: the largest cross product of
+    two rows of `cov - eigenvalue * I`. Computed on entries, which is much
+    faster than on stacked (N, 3) rows."""
+    d0, d1, d2 = a00 - eigenvalues, a11 - eigenvalues, a22 - eigenvalues
+    candidates = (
+        # row 0 x row 1.
+        (a01 * a12 - a02 * d1, a02 * a01 - d0 * a12, d0 * d1 - a01 * a01),
+        # row 0 x row 2.
+        (a01 * d2 - a02 * a12, a02 * a02 - d0 * d2, d0 * a12 - a01 * a02),
+        # row 1 x row 2.
+        (d1 * d2 - a12 * a12, a12 * a02 - a01 * d2, a01 * a12 - d1 * a02),
+    )
+    norms_sq = [x * x + y * y + z * z for x, y, z in candidates]
+    best = np.argmax(np.stack(norms_sq, axis=-1), axis=-1)
+    vectors = np.stack(
+        [np.choose(best, [c[i] for c in candidates]) for i in range(3)], axis=-1
+    )
+    norms = np.sqrt(np.choose(best, norms_sq))
+    return vectors / np.maximum(norms, 1e-30)[:, None]
@@ -7,8 +7,9 @@ import mimetypes
 import threading
 import time
 import warnings
+from collections import deque
 from collections.abc import Coroutine
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Callable, ContextManager, TypeVar, cast, overload
 
@@ -28,6 +29,7 @@ from ._notification_handle import NotificationHandle, _NotificationHandleState
 from ._scene_api import SceneApi, cast_vector
 from ._tunnel import ViserTunnel
 from .infra._infra import RecordHandle
+from .infra._metrics import ServerMetrics
 
 
 class _BackwardsCompatibilityShim:
@@ -285,6 +287,27 @@ class CameraHandle:
             height, width, transport_format=transport_format
         )
 
+    def get_render_encoded(
+        self,
+        height: int,
+        width: int,
+        transport_format: Literal["png", "jpeg"] = "jpeg",
+        quality: int = 80,
+    ) -> bytes:
+        """Request a render from a client, block until it's done and received, then
+        return the image bytes as encoded by the client. This is an alias for
+        :meth:`ClientHandle.get_render_encoded()`.
+
+        Args:
+            height: Height of rendered image. Should be <= the browser height.
+            width: Width of rendered image. Should be <= the browser width.
+            transport_format: Image transport format.
+            quality: JPEG quality, from 0 to 100. Ignored for PNG.
+        """
+        return self._state.client.get_render_encoded(
+            height, width, transport_format=transport_format, quality=quality
+        )
+
 
 NoneOrCoroutine = TypeVar("NoneOrCoroutine", None, Coroutine)
 
@@ -310,6 +333,11 @@ class ClientHandle(_BackwardsCompatibilityShim if not TYPE_CHECKING else object)
         # Private attributes.
         self._websock_connection = conn
         self._viser_server = server
+        self._render_futures: deque[Future[bytes]] = deque()
+        self._render_futures_lock = threading.Lock()
+        conn.register_handler(
+            _messages.GetRenderResponseMessage, self._handle_render_response
+        )
 
         # Public attributes.
         self.scene: SceneApi = SceneApi(
@@ -475,48 +503,128 @@ class ClientHandle(_BackwardsCompatibilityShim if not TYPE_CHECKING else object)
                 return a lossless (H, W, 4) RGBA array, but can cause memory issues on the frontend if called
                 too quickly for higher-resolution images.
         """
+        payload = self.get_render_encoded(
+            height,
+            width,
+            wxyz=wxyz,  # type: ignore
+            position=position,  # type: ignore
+            fov=fov,  # type: ignore
+            transport_format=transport_format,
+        )
+        return iio.imread(io.BytesIO(payload), extension=f".{transport_format}")
 
-        # Listen for a render reseponse message, which should contain the rendered
-        # image.
-        render_ready_event = threading.Event()
-        out: np.ndarray | None = None
+    @overload
+    def get_render_encoded(
+        self,
+        height: int,
+        width: int,
+        *,
+        wxyz: tuple[float, float, float, float] | np.ndarray,
+        position: tuple[float, float, float] | np.ndarray,
+        fov: float,
+        transport_format: Literal["png", "jpeg"] = "jpeg",
+        quality: int = 80,
+    ) -> bytes: ...
 
-        connection = self._websock_connection
+    @overload
+    def get_render_encoded(
+        self,
+        height: int,
+        width: int,
+        *,
+        transport_format: Literal["png", "jpeg"] = "jpeg",
+        quality: int = 80,
+    ) -> bytes: ...
 
-        def got_render_cb(
-            client_id: int, message: _messages.GetRenderResponseMessage
-        ) -> None:
-            del client_id
-            connection.unregister_handler(
-                _messages.GetRenderResponseMessage, got_render_cb
-            )
-            nonlocal out
-            out = iio.imread(
-                io.BytesIO(message.payload),
-                extension=f".{transport_format}",
-            )
-            render_ready_event.set()
+    def get_render_encoded(
+        self,
+        height: int,
+        width: int,
+        *,
+        wxyz: tuple[float, float, float, float] | np.ndarray | None = None,
+        position: tuple[float, float, float] | np.ndarray | None = None,
+        fov: float | None = None,
+        transport_format: Literal["png", "jpeg"] = "jpeg",
+        quality: int = 80,
+    ) -> bytes:
+        """Request a render from a client, block until it's done and received, then
+        return the image bytes exactly as encoded by the client. Unlike
+        :meth:`get_render()`, this skips decoding, which is useful when the image is
+        only going to be written to disk or sent elsewhere.
 
-        connection.register_handler(_messages.GetRenderResponseMessage, got_render_cb)
-        self._websock_connection.queue_message(
-            _messages.GetRenderRequestMessage(
-                "image/jpeg" if transport_format == "jpeg" else "image/png",
-                height=height,
-                width=width,
-                # Only used for JPEG. The main reason to use a lower quality version
-                # value is (unfortunately) to make life easier for the Javascript
-                # garbage collector.
-                quality=80,
-                position=cast_vector(
-                    position if position is not None else self.camera.position, 3
-                ),
-                wxyz=cast_vector(wxyz if wxyz is not None else self.camera.wxyz, 4),
-                fov=fov if fov is not None else self.camera.fov,
+        Args:
+            height: Height of rendered image. Should be <= the browser height.
+            width: Width of rendered image. Should be <= the browser width.
+            wxyz: Camera orientation as a quaternion. If not provided, the current camera
+                position will be used.
+            position: Camera position. If not provided, the current camera position will
+                be used.
+            fov: Vertical field of view of the camera, in radians. If not provided, the
+                current camera position will be used.
+            transport_format: Image transport format.
+            quality: JPEG quality, from 0 to 100. Ignored for PNG. The main reason to
+                use a lower value is (unfortunately) to make life easier for the
+                Javascript garbage collector.
+        """
+        return self.request_render_encoded(
+            height,
+            width,
+            wxyz=wxyz,
+            position=position,
+            fov=fov,
+            transport_format=transport_format,
+            quality=quality,
+        ).result()
+
+    def request_render_encoded(
+        self,
+        height: int,
+        width: int,
+        *,
+        wxyz: tuple[float, float, float, float] | np.ndarray | None = None,
+        position: tuple[float, float, float] | np.ndarray | None = None,
+        fov: float | None = None,
+        transport_format: Literal["png", "jpeg"] = "jpeg",
+        quality: int = 80,
+    ) -> Future[bytes]:
+        """Non-blocking version of :meth:`get_render_encoded()`. Returns a future
+        for the encoded image.
+
+        Several renders can be in flight at once; the client renders them in
+        order. Messages sent after a request, like camera or scene updates, are
+        only applied by the client once that render is done, so the next frame
+        can be set up while the current one is still rendering.
+        """
+        render_future: Future[bytes] = Future()
+        # Requests and responses are matched by order, so the request is queued
+        # while holding the lock.
+        with self._render_futures_lock:
+            self._render_futures.append(render_future)
+            self._websock_connection.queue_message(
+                _messages.GetRenderRequestMessage(
+                    "image/jpeg" if transport_format == "jpeg" else "image/png",
+                    height=height,
+                    width=width,
+                    quality=quality,
+                    position=cast_vector(
+                        position if position is not None else self.camera.position, 3
+                    ),
+                    wxyz=cast_vector(wxyz if wxyz is not None else self.camera.wxyz, 4),
+                    fov=fov if fov is not None else self.camera.fov,
+                )
             )
-        )
-        render_ready_event.wait()
-        assert out is not None
-        return out
+        return render_future
+
+    def _handle_render_response(
+        self, client_id: int, message: _messages.GetRenderResponseMessage
+    ) -> None:
+        del client_id
+        with self._render_futures_lock:
+            if len(self._render_futures) == 0:
+                # Late or unsolicited response; there's nothing waiting for it.
+                return
+            render_future = self._render_futures.popleft()
+        render_future.set_result(message.payload)
 
 
 class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
@@ -623,11 +731,13 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         # Remove clients when they disconnect.
         @server.on_client_disconnect
         async def _(conn: infra.WebsockClientConnection) -> None:
+            self.gui._abort_file_uploads(client_id=infra.ClientId(conn.client_id))
             with self._client_lock:
                 if conn.client_id not in self._connected_clients:
                     return
 
                 handle = self._connected_clients.pop(conn.client_id)
+                handle.gui._abort_file_uploads()
                 for cb in self._client_disconnect_cb:
                     if asyncio.iscoroutinefunction(cb):
                         await cb(handle)
@@ -783,6 +893,10 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
     def stop(self) -> None:
         """Stop the Viser server and associated threads and tunnels."""
         self._websock_server.stop()
+        self.gui._delete_spooled_files()
+        with self._client_lock:
+            for client in self._connected_clients.values():
+                client.gui._delete_spooled_files()
         if self._share_tunnel is not None:
             self._share_tunnel.close()
 
@@ -877,15 +991,23 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         can be useful for safe concurrent operations."""
         return self._event_loop
 
-    def _start_scene_recording(self) -> RecordHandle:
+    def get_metrics(self) -> ServerMetrics:
+        """Get metrics for the websocket layer, like messages and bytes sent per
+        message type and client, buffer depths, and encode times. The same values
+        are served in the Prometheus text format at `/metrics`."""
+        return self._websock_server.get_metrics()
+
+    def _start_scene_recording(self, path: str | Path | None = None) -> RecordHandle:
         """Start recording outgoing messages for playback or embedding.
-        Includes only the scene.
+        Includes only the scene. If `path` is set, the recording is written to
+        it incrementally; otherwise use `end_and_serialize()` to get the bytes.
 
         **Work-in-progress.** This API may be changed or removed.
         """
         recorder = self._websock_server.start_recording(
             # Don't record GUI messages. This feels brittle.
-            filter=lambda message: "Gui" not in type(message).__name__
+            filter=lambda message: "Gui" not in type(message).__name__,
+            path=path,
         )
         # Insert current scene state.
         for message in self._websock_server._broadcast_buffer.message_from_id.values():
@@ -88,6 +88,9 @@ export type ViewerContextContents = {
     "ready" | "triggered" | "pause" | "in_progress"
   >;
   getRenderRequest: React.MutableRefObject<null | GetRenderRequestMessage>;
+  // True while splats aren't sorted for the current view. Requested renders
+  // wait for it.
+  splatSortPendingRef: React.MutableRefObject<boolean>;
   // Track click drag events.
   scenePointerInfo: React.MutableRefObject<{
     enabled: false | "click" | "rect-select"; // Enable box events.
@@ -176,6 +179,7 @@ function ViewerRoot() {
     messageQueueRef: React.useRef([]),
     getRenderRequestState: React.useRef("ready"),
     getRenderRequest: React.useRef(null),
+    splatSortPendingRef: React.useRef(false),
     scenePointerInfo: React.useRef({
       enabled: false,
       dragStart: [0, 0],
@@ -471,7 +475,7 @@ function ViewerCanvas({ children }: { children: React.ReactNode }) {
         <AdaptiveDpr />
         <SceneContextSetter />
         {memoizedCameraControls}
-        <SplatRenderContext>
+        <SplatRenderContext sortPendingRef={viewer.splatSortPendingRef}>
           <SceneNodeThreeObject name="" parent={null} />
         </SplatRenderContext>
         <DefaultLights />
@@ -1,6 +1,6 @@
 import { decodeAsync, decode } from "@msgpack/msgpack";
 import { Message } from "./WebsocketMessages";
-import { decompress } from "fflate";
+import { decompress, gunzipSync } from "fflate";
 
 import { useCallback, useContext, useEffect, useRef, useState } from "react";
 import { ViewerContext } from "./App";
@@ -19,16 +19,13 @@ import {
   IconPlayerPlayFilled,
 } from "@tabler/icons-react";
 
-/** Download, decompress, and deserialize a file, which should be serialized
- * via msgpack and compressed via gzip. Also takes a hook for status updates. */
+/** Download, decompress, and deserialize a legacy recording, which should be
+ * serialized via msgpack and compressed via gzip. Also takes a hook for status
+ * updates. */
 async function deserializeGzippedMsgpackFile<T>(
-  fileUrl: string,
+  response: Response,
   setStatus: (status: { downloaded: number; total: number }) => void,
 ): Promise<T> {
-  const response = await fetch(fileUrl);
-  if (!response.ok) {
-    throw new Error(`Failed to fetch the file: ${response.statusText}`);
-  }
   return new Promise<T>((resolve) => {
     const gzipTotalLength = parseInt(response.headers.get("Content-Length")!);
     if (typeof DecompressionStream === "undefined") {
@@ -68,10 +65,138 @@ async function deserializeGzippedMsgpackFile<T>(
   });
 }
 
+const RECORDING_MAGIC = new TextEncoder().encode("VISERREC");
+const CHUNK_RECORD = 0;
+const INDEX_RECORD = 1;
+
+interface RecordingIndex {
+  loopStartIndex: number | null;
+  durationSeconds: number;
+  messageCount: number;
+}
+
+/** Stream a chunked recording, written by `viser/infra/_recording.py`. Each
+ * chunk is passed to `onMessages` as soon as it has been downloaded, and the
+ * index is passed to `onIndex` at the end. */
+async function streamChunkedRecording(
+  reader: ReadableStreamDefaultReader<Uint8Array>,
+  firstBytes: Uint8Array,
+  totalLength: number,
+  setStatus: (status: { downloaded: number; total: number }) => void,
+  onMessages: (messages: [number, Message][]) => void,
+  onIndex: (index: RecordingIndex) => void,
+) {
+  let pending = firstBytes;
+  let received = firstBytes.length;
+  // Skip the magic and version byte.
+  let offset = RECORDING_MAGIC.length + 1;
+  while (true) {
+    // Decode every record that has been completely downloaded.
+    while (pending.length - offset >= 5) {
+      const view = new DataView(pending.buffer, pending.byteOffset + offset, 5);
+      const kind = view.getUint8(0);
+      const length = view.getUint32(1, true);
+      if (pending.length - offset - 5 < length) break;
+      const payload = pending.subarray(offset + 5, offset + 5 + length);
+      offset += 5 + length;
+      if (kind === CHUNK_RECORD) {
+        onMessages(decode(gunzipSync(payload)) as [number, Message][]);
+      } else if (kind === INDEX_RECORD) {
+        onIndex(decode(payload) as RecordingIndex);
+        // Only the footer is left.
+        reader.cancel();
+        return;
+      }
+    }
+
+    const { done, value } = await reader.read();
+    if (done) throw new Error("Recording ended before its index.");
+    received += value.length;
+    setStatus({ downloaded: received, total: totalLength });
+    const merged = new Uint8Array(pending.length - offset + value.length);
+    merged.set(pending.subarray(offset));
+    merged.set(value, pending.length - offset);
+    pending = merged;
+    offset = 0;
+  }
+}
+
+/** Load a recording. Chunked recordings are played while they stream in, and
+ * legacy recordings (a single gzipped msgpack object) once fully downloaded. */
+async function loadRecording(
+  fileUrl: string,
+  setStatus: (status: { downloaded: number; total: number }) => void,
+  setRecording: (recording: SerializedMessages) => void,
+) {
+  const response = await fetch(fileUrl);
+  if (!response.ok) {
+    throw new Error(`Failed to fetch the file: ${response.statusText}`);
+  }
+  const totalLength = parseInt(response.headers.get("Content-Length")!);
+  const reader = response.body!.getReader();
+
+  // Read enough bytes to check the magic.
+  let firstBytes = new Uint8Array(0);
+  while (firstBytes.length < RECORDING_MAGIC.length + 1) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    const merged = new Uint8Array(firstBytes.length + value.length);
+    merged.set(firstBytes);
+    merged.set(value, firstBytes.length);
+    firstBytes = merged;
+  }
+  const isChunked = RECORDING_MAGIC.every((byte, i) => firstBytes[i] === byte);
+
+  if (!isChunked) {
+    // Put the bytes we've read back in front of the rest of the body.
+    const body = new ReadableStream<Uint8Array>({
+      start(controller) {
+        controller.enqueue(firstBytes);
+      },
+      async pull(controller) {
+        const { done, value } = await reader.read();
+        if (done) controller.close();
+        else controller.enqueue(value);
+      },
+    });
+    const recording = await deserializeGzippedMsgpackFile<
+      Omit<SerializedMessages, "complete">
+    >(new Response(body, { headers: response.headers }), setStatus);
+    setRecording({ ...recording, complete: true });
+    return;
+  }
+
+  const messages: [number, Message][] = [];
+  await streamChunkedRecording(
+    reader,
+    firstBytes,
+    totalLength,
+    setStatus,
+    (chunk) => {
+      messages.push(...chunk);
+      setRecording({
+        loopStartIndex: null,
+        durationSeconds: messages[messages.length - 1][0],
+        messages: messages,
+        complete: false,
+      });
+    },
+    (index) =>
+      setRecording({
+        loopStartIndex: index.loopStartIndex,
+        durationSeconds: index.durationSeconds,
+        messages: messages,
+        complete: true,
+      }),
+  );
+}
+
 interface SerializedMessages {
   loopStartIndex: number | null;
   durationSeconds: number;
   messages: [number, Message][];
+  /** False while the rest of the recording is still being downloaded. */
+  complete: boolean;
 }
 
 export function PlaybackFromFile({ fileUrl }: { fileUrl: string }) {
@@ -89,9 +214,7 @@ export function PlaybackFromFile({ fileUrl }: { fileUrl: string }) {
   const theme = useMantineTheme();
 
   useEffect(() => {
-    deserializeGzippedMsgpackFile<SerializedMessages>(fileUrl, setStatus).then(
-      setRecording,
-    );
+    loadRecording(fileUrl, setStatus, setRecording);
   }, []);
 
   const playbackMutable = useRef({ currentTime: 0.0, currentIndex: 0 });
@@ -132,11 +255,19 @@ export function PlaybackFromFile({ fileUrl }: { fileUrl: string }) {
         playbackMutable.current.currentTime +=
           ((now - lastUpdate) / 1000.0) * playbackMultiplier;
         lastUpdate = now;
+        if (!recording.complete) {
+          // Wait for more of the recording to download.
+          playbackMutable.current.currentTime = Math.min(
+            playbackMutable.current.currentTime,
+            recording.durationSeconds,
+          );
+        }
 
         updatePlayback();
         if (
           playbackMutable.current.currentIndex === recording.messages.length &&
-          recording.loopStartIndex === null
+          recording.loopStartIndex === null &&
+          recording.complete
         ) {
           clearInterval(interval);
         }
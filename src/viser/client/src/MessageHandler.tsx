@@ -310,6 +310,38 @@ function useMessageHandler() {
           attr[message.name]!.poseUpdateState = "needsUpdate";
         break;
       }
+      case "SetTransformsMessage": {
+        const attr = viewer.nodeAttributesFromName.current;
+        const wxyzs = new Float32Array(
+          message.wxyzs.buffer.slice(
+            message.wxyzs.byteOffset,
+            message.wxyzs.byteOffset + message.wxyzs.byteLength,
+          ),
+        );
+        const positions = new Float32Array(
+          message.positions.buffer.slice(
+            message.positions.byteOffset,
+            message.positions.byteOffset + message.positions.byteLength,
+          ),
+        );
+        message.names.forEach((name, i) => {
+          if (attr[name] === undefined) attr[name] = {};
+          attr[name]!.wxyz = [
+            wxyzs[4 * i],
+            wxyzs[4 * i + 1],
+            wxyzs[4 * i + 2],
+            wxyzs[4 * i + 3],
+          ];
+          attr[name]!.position = [
+            positions[3 * i],
+            positions[3 * i + 1],
+            positions[3 * i + 2],
+          ];
+          if (attr[name]!.poseUpdateState != "waitForMakeObject")
+            attr[name]!.poseUpdateState = "needsUpdate";
+        });
+        break;
+      }
       case "SetSceneNodeVisibilityMessage": {
         const attr = viewer.nodeAttributesFromName.current;
         if (attr[message.name] === undefined) attr[message.name] = {};
@@ -517,17 +549,31 @@ function useFileDownloadHandler() {
   };
 }
 
+// Longest time a requested render waits for splats to be sorted.
+const maxSplatSortWaitMs = 5000;
+
 export function FrameSynchronizedMessageHandler() {
   const handleMessage = useMessageHandler();
   const viewer = useContext(ViewerContext)!;
   const messageQueueRef = viewer.messageQueueRef;
+  const renderPauseStartRef = React.useRef(0);
 
   useFrame(
     () => {
       // Send a render along if it was requested!
       if (viewer.getRenderRequestState.current === "triggered") {
         viewer.getRenderRequestState.current = "pause";
+        renderPauseStartRef.current = performance.now();
       } else if (viewer.getRenderRequestState.current === "pause") {
+        // Updates sent before the request can move the camera or show another
+        // member of an exclusive group. Until splats are sorted again, they'd
+        // be drawn in a stale order or with the previous member standing in.
+        if (
+          viewer.splatSortPendingRef.current &&
+          performance.now() - renderPauseStartRef.current < maxSplatSortWaitMs
+        ) {
+          return;
+        }
         const cameraPosition = viewer.getRenderRequest.current!.position;
         const cameraWxyz = viewer.getRenderRequest.current!.wxyz;
         const cameraFov = viewer.getRenderRequest.current!.fov;
@@ -585,16 +631,21 @@ export function FrameSynchronizedMessageHandler() {
 
         // Get the rendered image.
         viewer.getRenderRequestState.current = "in_progress";
-        renderer.domElement.toBlob(async (blob) => {
-          renderer.dispose();
-          renderer.forceContextLoss();
-
-          viewer.sendMessageRef.current({
-            type: "GetRenderResponseMessage",
-            payload: new Uint8Array(await blob!.arrayBuffer()),
-          });
-          viewer.getRenderRequestState.current = "ready";
-        }, viewer.getRenderRequest.current!.format);
+        renderer.domElement.toBlob(
+          async (blob) => {
+            renderer.dispose();
+            renderer.forceContextLoss();
+
+            viewer.sendMessageRef.current({
+              type: "GetRenderResponseMessage",
+              payload: new Uint8Array(await blob!.arrayBuffer()),
+            });
+            viewer.getRenderRequestState.current = "ready";
+          },
+          viewer.getRenderRequest.current!.format,
+          // Only used for JPEG. The server sends quality in [0, 100].
+          viewer.getRenderRequest.current!.quality / 100.0,
+        );
       }
 
       // Handle messages, but only if we're not trying to render something.
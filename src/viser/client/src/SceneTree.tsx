@@ -33,6 +33,7 @@ import {
 import { opencvXyFromPointerXy } from "./ClickUtils";
 import { SceneNodeMessage } from "./WebsocketMessages";
 import { SplatObject } from "./Splatting/GaussianSplats";
+import { dequantizeGaussianSplats } from "./Splatting/SplatQuantization";
 import { Paper } from "@mantine/core";
 import GeneratedGuiContainer from "./ControlPanel/Generated";
 
@@ -513,15 +514,18 @@ function useObjectFactory(message: SceneNodeMessage | undefined): {
         makeObject: (ref) => (
           <SplatObject
             ref={ref}
-            buffer={
+            buffer={dequantizeGaussianSplats(
               new Uint32Array(
                 message.props.buffer.buffer.slice(
                   message.props.buffer.byteOffset,
                   message.props.buffer.byteOffset +
                     message.props.buffer.byteLength,
                 ),
-              )
-            }
+              ),
+              // Older recordings don't have the quantization prop.
+              message.props.quantization ?? null,
+            )}
+            exclusiveGroup={message.props.exclusive_group}
           />
         ),
       };
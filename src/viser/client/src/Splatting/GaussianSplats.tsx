@@ -35,10 +35,15 @@ import { v4 as uuidv4 } from "uuid";
 /**Global splat state.*/
 interface SplatState {
   groupBufferFromId: { [id: string]: Uint32Array };
+  exclusiveGroupFromId: { [id: string]: string | null };
   nodeRefFromId: React.MutableRefObject<{
     [name: string]: undefined | Object3D;
   }>;
-  setBuffer: (id: string, buffer: Uint32Array) => void;
+  setBuffer: (
+    id: string,
+    buffer: Uint32Array,
+    exclusiveGroup: string | null,
+  ) => void;
   removeBuffer: (id: string) => void;
 }
 
@@ -48,17 +53,27 @@ function useGaussianSplatStore() {
   return React.useState(() =>
     create<SplatState>((set) => ({
       groupBufferFromId: {},
+      exclusiveGroupFromId: {},
       nodeRefFromId: nodeRefFromId,
-      setBuffer: (id, buffer) => {
+      setBuffer: (id, buffer, exclusiveGroup) => {
         return set((state) => ({
           groupBufferFromId: { ...state.groupBufferFromId, [id]: buffer },
+          exclusiveGroupFromId: {
+            ...state.exclusiveGroupFromId,
+            [id]: exclusiveGroup,
+          },
         }));
       },
       removeBuffer: (id) => {
         return set((state) => {
           // eslint-disable-next-line @typescript-eslint/no-unused-vars
           const { [id]: _, ...buffers } = state.groupBufferFromId;
-          return { groupBufferFromId: buffers };
+          // eslint-disable-next-line @typescript-eslint/no-unused-vars
+          const { [id]: __, ...exclusiveGroups } = state.exclusiveGroupFromId;
+          return {
+            groupBufferFromId: buffers,
+            exclusiveGroupFromId: exclusiveGroups,
+          };
         });
       },
     })),
@@ -68,16 +83,20 @@ const GaussianSplatsContext = React.createContext<ReturnType<
   typeof useGaussianSplatStore
 > | null>(null);
 
-/**Provider for creating splat rendering context.*/
+/**Provider for creating splat rendering context. If `sortPendingRef` is set,
+ * it's kept true while the splats drawn aren't sorted for the current view and
+ * visible groups yet.*/
 export function SplatRenderContext({
   children,
+  sortPendingRef,
 }: {
   children: React.ReactNode;
+  sortPendingRef?: React.MutableRefObject<boolean>;
 }) {
   const store = useGaussianSplatStore();
   return (
     <GaussianSplatsContext.Provider value={store}>
-      <SplatRenderer />
+      <SplatRenderer sortPendingRef={sortPendingRef} />
       {children}
     </GaussianSplatsContext.Provider>
   );
@@ -248,8 +267,10 @@ export const SplatObject = React.forwardRef<
   THREE.Group,
   {
     buffer: Uint32Array;
+    /** Groups with the same name are never visible at the same time. */
+    exclusiveGroup: string | null;
   }
->(function SplatObject({ buffer }, ref) {
+>(function SplatObject({ buffer, exclusiveGroup }, ref) {
   const splatContext = React.useContext(GaussianSplatsContext)!;
   const setBuffer = splatContext((state) => state.setBuffer);
   const removeBuffer = splatContext((state) => state.removeBuffer);
@@ -260,7 +281,7 @@ export const SplatObject = React.forwardRef<
 
   React.useEffect(() => {
     if (obj === null) return;
-    setBuffer(name, buffer);
+    setBuffer(name, buffer, exclusiveGroup);
     if (ref !== null) {
       if ("current" in ref) {
         ref.current = obj;
@@ -279,26 +300,43 @@ export const SplatObject = React.forwardRef<
 });
 
 /** External interface. Component should be added to the root of canvas.  */
-function SplatRenderer() {
+function SplatRenderer({
+  sortPendingRef,
+}: {
+  sortPendingRef?: React.MutableRefObject<boolean>;
+}) {
   const splatContext = React.useContext(GaussianSplatsContext)!;
   const groupBufferFromId = splatContext((state) => state.groupBufferFromId);
+  const exclusiveGroupFromId = splatContext(
+    (state) => state.exclusiveGroupFromId,
+  );
   const nodeRefFromId = splatContext((state) => state.nodeRefFromId);
 
   // Consolidate Gaussian groups into a single buffer.
-  const merged = mergeGaussianGroups(groupBufferFromId);
+  const merged = mergeGaussianGroups(groupBufferFromId, exclusiveGroupFromId);
   const meshProps = useGaussianMeshProps(
     merged.gaussianBuffer,
     merged.numGroups,
   );
 
-  // Create sorting worker.
+  // Create sorting worker. It only sorts Gaussians of visible groups, which
+  // are also the only ones we draw.
   const sortWorker = new SplatSortWorker();
   let initializedBufferTexture = false;
+  let sortedGroups = new Set<number>();
+  let sortedGroupsChanged = false;
+  // Views the last sort was requested for, and the one it was done for.
+  let requestedTz_camera_groups: Float32Array | null = null;
+  let sortedTz_camera_groups: Float32Array | null = null;
   sortWorker.onmessage = (e) => {
     // Update rendering order.
     const sortedIndices = e.data.sortedIndices as Uint32Array;
     meshProps.sortedIndexAttribute.set(sortedIndices);
     meshProps.sortedIndexAttribute.needsUpdate = true;
+    meshProps.geometry.instanceCount = sortedIndices.length;
+    sortedGroups = new Set(e.data.sortedGroups as Uint32Array);
+    sortedGroupsChanged = true;
+    sortedTz_camera_groups = e.data.Tz_camera_groups as Float32Array;
 
     // Trigger initial render.
     if (!initializedBufferTexture) {
@@ -313,7 +351,7 @@ function SplatRenderer() {
 
   postToWorker({
     setBuffer: merged.gaussianBuffer,
-    setGroupIndices: merged.groupIndices,
+    setGroupOffsets: merged.groupOffsets,
   });
 
   // Cleanup.
@@ -337,6 +375,7 @@ function SplatRenderer() {
     .slice()
     .fill(0);
   const prevVisibles: boolean[] = [];
+  let prevVisibleGroups: number[] = [];
   useFrame((state, delta) => {
     const mesh = meshRef.current;
     if (mesh === null || sortWorker === null) return;
@@ -363,7 +402,7 @@ function SplatRenderer() {
 
     // Update group transforms.
     const T_camera_world = state.camera.matrixWorldInverse;
-    const groupVisibles: boolean[] = [];
+    const groupVisibles: boolean[] = new Array(merged.numGroups).fill(false);
     let visibilitiesChanged = false;
     for (const [groupIndex, name] of Object.keys(groupBufferFromId).entries()) {
       const node = nodeRefFromId.current[name];
@@ -395,7 +434,8 @@ function SplatRenderer() {
           visibleNow = visibleNow && ancestor.visible;
         });
       }
-      groupVisibles.push(visibleNow && prevVisibles[groupIndex] === true);
+      groupVisibles[groupIndex] =
+        visibleNow && prevVisibles[groupIndex] === true;
       if (prevVisibles[groupIndex] !== visibleNow) {
         prevVisibles[groupIndex] = visibleNow;
         visibilitiesChanged = true;
@@ -411,22 +451,67 @@ function SplatRenderer() {
       postToWorker({
         setTz_camera_groups: Tz_camera_groups,
       });
+      requestedTz_camera_groups = Tz_camera_groups.slice();
     }
-    if (groupsMovedWrtCam || visibilitiesChanged) {
+    const visibleGroups: number[] = [];
+    for (const [i, visible] of groupVisibles.entries()) {
+      if (visible) visibleGroups.push(i);
+    }
+    if (
+      visibleGroups.length !== prevVisibleGroups.length ||
+      !visibleGroups.every((v, i) => v === prevVisibleGroups[i])
+    ) {
+      // Hidden groups are left out of sorting, so sort cost scales with the
+      // number of visible Gaussians.
+      postToWorker({ setSortedGroups: new Uint32Array(visibleGroups) });
+      prevVisibleGroups = visibleGroups;
+    }
+
+    if (groupsMovedWrtCam || visibilitiesChanged || sortedGroupsChanged) {
+      sortedGroupsChanged = false;
+
+      // Compare against transforms before hiding, so hidden groups don't look
+      // like they moved and trigger a sort on every frame.
+      prevRowMajorT_camera_groups.set(meshProps.rowMajorT_camera_groups);
+
+      // A newly shown member of an exclusive group isn't drawn until the
+      // sorter has caught up with it. Until then, we keep drawing the member
+      // it replaces instead of flashing an empty frame.
+      const pendingExclusiveGroups = new Set<string>();
+      for (const [i, visible] of groupVisibles.entries()) {
+        const exclusiveGroup = merged.exclusiveGroups[i];
+        if (visible && !sortedGroups.has(i) && exclusiveGroup !== null) {
+          pendingExclusiveGroups.add(exclusiveGroup);
+        }
+      }
+
       // If a group is not visible, we'll throw it off the screen with some Big
-      // Numbers. It's important that this only impacts the coordinates used
-      // for the shader and not for the sorter; that way when we "show" a group
-      // of Gaussians the correct rendering order is immediately available.
+      // Numbers. Groups that were hidden since the last sort are still in the
+      // rendering order until the next one arrives.
       for (const [i, visible] of groupVisibles.entries()) {
-        if (!visible) {
+        const exclusiveGroup = merged.exclusiveGroups[i];
+        const standIn =
+          exclusiveGroup !== null && pendingExclusiveGroups.has(exclusiveGroup);
+        if (!visible && !standIn) {
           meshProps.rowMajorT_camera_groups[i * 12 + 3] = 1e10;
           meshProps.rowMajorT_camera_groups[i * 12 + 7] = 1e10;
           meshProps.rowMajorT_camera_groups[i * 12 + 11] = 1e10;
         }
       }
-      prevRowMajorT_camera_groups.set(meshProps.rowMajorT_camera_groups);
       meshProps.textureT_camera_groups.needsUpdate = true;
     }
+
+    // Sorting is pending while a group is being shown (visibility takes a
+    // frame to apply), a visible group isn't sorted yet, or the last sort was
+    // for an older view.
+    if (sortPendingRef !== undefined) {
+      sortPendingRef.current =
+        groupVisibles.some(
+          (visible, i) => visible !== (prevVisibles[i] === true),
+        ) ||
+        visibleGroups.some((i) => !sortedGroups.has(i)) ||
+        !sameView(requestedTz_camera_groups, sortedTz_camera_groups);
+    }
   }, -100 /* This should be called early to reduce group transform artifacts. */);
 
   return (
@@ -439,11 +524,19 @@ function SplatRenderer() {
   );
 }
 
+function sameView(a: Float32Array | null, b: Float32Array | null) {
+  if (a === null || b === null) return a === b;
+  return a.length === b.length && a.every((v, i) => v === b[i]);
+}
+
 /**Consolidate groups of Gaussians into a single buffer, to make it possible
  * for them to be sorted globally.*/
-function mergeGaussianGroups(groupBufferFromName: {
-  [name: string]: Uint32Array;
-}) {
+function mergeGaussianGroups(
+  groupBufferFromName: {
+    [name: string]: Uint32Array;
+  },
+  exclusiveGroupFromName: { [name: string]: string | null },
+) {
   // Create geometry. Each Gaussian will be rendered as a quad.
   let totalBufferLength = 0;
   for (const buffer of Object.values(groupBufferFromName)) {
@@ -451,17 +544,17 @@ function mergeGaussianGroups(groupBufferFromName: {
   }
   const numGaussians = totalBufferLength / 8;
   const gaussianBuffer = new Uint32Array(totalBufferLength);
-  const groupIndices = new Uint32Array(numGaussians);
+  const numGroups = Object.keys(groupBufferFromName).length;
+  // Index of the first Gaussian of each group, and the total at the end.
+  const groupOffsets = new Uint32Array(numGroups + 1);
+  const exclusiveGroups: (string | null)[] = [];
 
   let offset = 0;
-  for (const [groupIndex, groupBuffer] of Object.values(
+  for (const [groupIndex, [name, groupBuffer]] of Object.entries(
     groupBufferFromName,
   ).entries()) {
-    groupIndices.fill(
-      groupIndex,
-      offset / 8,
-      (offset + groupBuffer.length) / 8,
-    );
+    groupOffsets[groupIndex] = offset / 8;
+    exclusiveGroups.push(exclusiveGroupFromName[name] ?? null);
     gaussianBuffer.set(groupBuffer, offset);
 
     // Each Gaussian is allocated
@@ -475,9 +568,15 @@ function mergeGaussianGroups(groupBufferFromName: {
     }
     offset += groupBuffer.length;
   }
+  groupOffsets[numGroups] = numGaussians;
 
-  const numGroups = Object.keys(groupBufferFromName).length;
-  return { numGaussians, gaussianBuffer, numGroups, groupIndices };
+  return {
+    numGaussians,
+    gaussianBuffer,
+    numGroups,
+    groupOffsets,
+    exclusiveGroups,
+  };
 }
 
 /**Hook to generate properties for rendering Gaussians via a three.js mesh.*/
@@ -488,7 +587,9 @@ function useGaussianMeshProps(gaussianBuffer: Uint32Array, numGroups: number) {
 
   // Create instanced geometry.
   const geometry = new THREE.InstancedBufferGeometry();
-  geometry.instanceCount = numGaussians;
+  // Set from the length of each sorting result; nothing is drawn before the
+  // first one.
+  geometry.instanceCount = 0;
   geometry.setIndex(
     new THREE.BufferAttribute(new Uint32Array([0, 2, 1, 0, 3, 2]), 1),
   );
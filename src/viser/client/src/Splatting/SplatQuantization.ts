@@ -0,0 +1,97 @@
+/** Decoder for the quantized splat layout. See `_splat_quantization.py` on the
+ * server for the layout and its error bounds. */
+import { DataUtils } from "three";
+
+const MAX_COMPONENT = Math.SQRT1_2;
+
+/** Convert quantized Gaussians (4 words each) to the layout expected by
+ * `SplatObject` (8 words each). Buffers without quantization bounds are
+ * already in that layout, and returned as-is. */
+export function dequantizeGaussianSplats(
+  buffer: Uint32Array,
+  bounds:
+    | [number, number, number, number, number, number, number, number]
+    | null,
+): Uint32Array {
+  if (bounds === null) return buffer;
+
+  const numGaussians = buffer.length / 4;
+  const out = new Uint32Array(numGaussians * 8);
+  const outFloat = new Float32Array(out.buffer);
+  const [minX, minY, minZ, maxX, maxY, maxZ, minLogScale, maxLogScale] =
+    bounds;
+  const stepX = (maxX - minX) / 65535;
+  const stepY = (maxY - minY) / 65535;
+  const stepZ = (maxZ - minZ) / 65535;
+
+  // Squared scales only take 256 values.
+  const scaleSqFromQuantized = new Float64Array(256);
+  for (let i = 0; i < 256; i++) {
+    const scale = Math.exp(
+      minLogScale + ((maxLogScale - minLogScale) * i) / 255,
+    );
+    scaleSqFromQuantized[i] = scale * scale;
+  }
+
+  const wxyz = [0.0, 0.0, 0.0, 0.0];
+  for (let i = 0; i < numGaussians; i++) {
+    const word0 = buffer[i * 4 + 0];
+    const word1 = buffer[i * 4 + 1];
+    const word2 = buffer[i * 4 + 2];
+
+    // Centers. Word 3 of the output is reserved for the renderer.
+    outFloat[i * 8 + 0] = minX + (word0 & 0xffff) * stepX;
+    outFloat[i * 8 + 1] = minY + (word0 >>> 16) * stepY;
+    outFloat[i * 8 + 2] = minZ + (word1 & 0xffff) * stepZ;
+
+    // Rotation, from the "smallest three" encoding.
+    const rotation = word2 >>> 8;
+    const largest = rotation & 0b11;
+    let sumSq = 0.0;
+    let slot = 0;
+    for (let j = 0; j < 4; j++) {
+      if (j === largest) continue;
+      const quantized = (rotation >>> (2 + 7 * slot)) & 0x7f;
+      const component = ((quantized / 127) * 2.0 - 1.0) * MAX_COMPONENT;
+      wxyz[j] = component;
+      sumSq += component * component;
+      slot++;
+    }
+    wxyz[largest] = Math.sqrt(Math.max(1.0 - sumSq, 0.0));
+    const norm = Math.sqrt(sumSq + wxyz[largest] * wxyz[largest]);
+    const w = wxyz[0] / norm;
+    const x = wxyz[1] / norm;
+    const y = wxyz[2] / norm;
+    const z = wxyz[3] / norm;
+
+    // Covariance = R @ diag(scales ** 2) @ R.T.
+    const r00 = 1 - 2 * (y * y + z * z);
+    const r01 = 2 * (x * y - w * z);
+    const r02 = 2 * (x * z + w * y);
+    const r10 = 2 * (x * y + w * z);
+    const r11 = 1 - 2 * (x * x + z * z);
+    const r12 = 2 * (y * z - w * x);
+    const r20 = 2 * (x * z - w * y);
+    const r21 = 2 * (y * z + w * x);
+    const r22 = 1 - 2 * (x * x + y * y);
+    const s0 = scaleSqFromQuantized[(word1 >>> 16) & 0xff];
+    const s1 = scaleSqFromQuantized[word1 >>> 24];
+    const s2 = scaleSqFromQuantized[word2 & 0xff];
+    const cov00 = r00 * r00 * s0 + r01 * r01 * s1 + r02 * r02 * s2;
+    const cov01 = r00 * r10 * s0 + r01 * r11 * s1 + r02 * r12 * s2;
+    const cov02 = r00 * r20 * s0 + r01 * r21 * s1 + r02 * r22 * s2;
+    const cov11 = r10 * r10 * s0 + r11 * r11 * s1 + r12 * r12 * s2;
+    const cov12 = r10 * r20 * s0 + r11 * r21 * s1 + r12 * r22 * s2;
+    const cov22 = r20 * r20 * s0 + r21 * r21 * s1 + r22 * r22 * s2;
+    out[i * 8 + 4] =
+      DataUtils.toHalfFloat(cov00) | (DataUtils.toHalfFloat(cov01) << 16);
+    out[i * 8 + 5] =
+      DataUtils.toHalfFloat(cov02) | (DataUtils.toHalfFloat(cov11) << 16);
+    out[i * 8 + 6] =
+      DataUtils.toHalfFloat(cov12) | (DataUtils.toHalfFloat(cov22) << 16);
+
+    // Colors are stored as-is.
+    out[i * 8 + 7] = buffer[i * 4 + 3];
+  }
+  return out;
+}
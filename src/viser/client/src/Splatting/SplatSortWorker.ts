@@ -6,41 +6,105 @@ import MakeSorterModulePromise from "./WasmSorter/Sorter.mjs";
 export type SorterWorkerIncoming =
   | {
       setBuffer: Uint32Array;
-      setGroupIndices: Uint32Array;
+      setGroupOffsets: Uint32Array;
     }
   | {
       setTz_camera_groups: Float32Array;
     }
+  | {
+      setSortedGroups: Uint32Array;
+    }
   | { close: true };
 
 {
+  let SorterModule: any = null;
   let sorter: any = null;
+  let buffer: Uint32Array | null = null;
+  let groupOffsets: Uint32Array | null = null;
+  let sortedGroups: Uint32Array | null = null;
+  // Index in `buffer` of each Gaussian the sorter was built with.
+  let bufferIndices = new Uint32Array(0);
+  let sorterOutdated = true;
   let Tz_camera_groups: Float32Array | null = null;
   let sortRunning = false;
+
+  /** Build a sorter for the Gaussians of the groups in `sortedGroups`. Its
+   * cost, and that of every sort, scales with their number rather than with
+   * the number of Gaussians in the buffer. */
+  const updateSorter = () => {
+    const groups = sortedGroups as Uint32Array;
+    const offsets = groupOffsets as Uint32Array;
+    let numGaussians = 0;
+    for (const group of groups) {
+      numGaussians += offsets[group + 1] - offsets[group];
+    }
+
+    const groupBuffer = new Uint32Array(numGaussians * 8);
+    // The sorter reads group indices in blocks of 4, so we pad them.
+    const groupIndices = new Uint32Array(Math.ceil(numGaussians / 4) * 4);
+    bufferIndices = new Uint32Array(numGaussians);
+    let offset = 0;
+    for (const group of groups) {
+      const start = offsets[group];
+      const end = offsets[group + 1];
+      groupBuffer.set(
+        (buffer as Uint32Array).subarray(start * 8, end * 8),
+        offset * 8,
+      );
+      groupIndices.fill(group, offset, offset + end - start);
+      for (let i = start; i < end; i++) bufferIndices[offset++] = i;
+    }
+
+    if (sorter !== null) sorter.delete();
+    sorter =
+      numGaussians > 0
+        ? new SorterModule.Sorter(groupBuffer, groupIndices)
+        : null;
+    sorterOutdated = false;
+  };
+
   const throttledSort = () => {
-    if (sorter === null || Tz_camera_groups === null) {
+    if (
+      SorterModule === null ||
+      groupOffsets === null ||
+      sortedGroups === null ||
+      Tz_camera_groups === null
+    ) {
       setTimeout(throttledSort, 1);
       return;
     }
     if (sortRunning) return;
 
     sortRunning = true;
+    if (sorterOutdated) updateSorter();
     const lastView = Tz_camera_groups;
+    const lastSortedGroups = sortedGroups;
 
-    // Important: we clone the output so we can transfer the buffer to the main
-    // thread. Compared to relying on postMessage for copying, this reduces
-    // backlog artifacts.
-    const sortedIndices = (
-      sorter.sort(Tz_camera_groups) as Uint32Array
-    ).slice();
+    // Important: we write the output to a new array so we can transfer the
+    // buffer to the main thread. Compared to relying on postMessage for
+    // copying, this reduces backlog artifacts.
+    const sortedIndices = new Uint32Array(bufferIndices.length);
+    if (sorter !== null) {
+      const localIndices = sorter.sort(Tz_camera_groups) as Uint32Array;
+      for (let i = 0; i < sortedIndices.length; i++) {
+        sortedIndices[i] = bufferIndices[localIndices[i]];
+      }
+    }
 
+    const message = {
+      sortedIndices: sortedIndices,
+      sortedGroups: lastSortedGroups,
+      // Lets the main thread tell if the sort is for its latest view.
+      Tz_camera_groups: lastView,
+    };
     // @ts-ignore
-    self.postMessage({ sortedIndices: sortedIndices }, [sortedIndices.buffer]);
+    self.postMessage(message, [sortedIndices.buffer]);
 
     setTimeout(() => {
       sortRunning = false;
       if (Tz_camera_groups === null) return;
       if (
+        sorterOutdated ||
         !lastView.every(
           // Cast is needed because of closure...
           (val, i) => val === (Tz_camera_groups as Float32Array)[i],
@@ -56,15 +120,20 @@ export type SorterWorkerIncoming =
   self.onmessage = async (e) => {
     const data = e.data as SorterWorkerIncoming;
     if ("setBuffer" in data) {
-      // Instantiate sorter with buffers populated.
-      sorter = new (await SorterModulePromise).Sorter(
-        data.setBuffer,
-        data.setGroupIndices,
-      );
+      // Keep the buffers; sorters are built for the visible groups.
+      buffer = data.setBuffer;
+      groupOffsets = data.setGroupOffsets;
+      sorterOutdated = true;
+      SorterModule = await SorterModulePromise;
     } else if ("setTz_camera_groups" in data) {
       // Update object transforms.
       Tz_camera_groups = data.setTz_camera_groups;
       throttledSort();
+    } else if ("setSortedGroups" in data) {
+      // Update which groups are visible.
+      sortedGroups = data.setSortedGroups;
+      sorterOutdated = true;
+      throttledSort();
     } else if ("close" in data) {
       // Done!
       self.close();
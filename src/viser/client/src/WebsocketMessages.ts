@@ -455,6 +455,19 @@ export interface SetPositionMessage {
   name: string;
   position: [number, number, number];
 }
+/** Server -> client message to set the orientations and positions of many
+ * scene nodes at once.
+ *
+ * As with all other messages, transforms take the `T_parent_local` convention.
+ *
+ * (automatically generated)
+ */
+export interface SetTransformsMessage {
+  type: "SetTransformsMessage";
+  names: string[];
+  wxyzs: Uint8Array;
+  positions: Uint8Array;
+}
 /** Client -> server message when a transform control is updated.
  *
  * As with all other messages, transforms take the `T_parent_local` convention.
@@ -1044,7 +1057,13 @@ export interface CubicBezierSplineMessage {
 export interface GaussianSplatsMessage {
   type: "GaussianSplatsMessage";
   name: string;
-  props: { buffer: Uint8Array };
+  props: {
+    buffer: Uint8Array;
+    quantization:
+      | [number, number, number, number, number, number, number, number]
+      | null;
+    exclusive_group: string | null;
+  };
 }
 /** Message from server->client requesting a render from a specified camera
  * pose.
@@ -1169,6 +1188,7 @@ export type Message =
   | SetCameraFovMessage
   | SetOrientationMessage
   | SetPositionMessage
+  | SetTransformsMessage
   | TransformControlsUpdateMessage
   | BackgroundImageMessage
   | ImageMessage
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
+import hashlib
 import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple, cast
+from typing import Tuple
 
 import imageio.v3 as iio
 import liblzfse
@@ -14,16 +20,39 @@ from scipy.spatial.transform import Rotation
 
 
 class Record3dLoader:
-    """Helper for loading frames for Record3D captures."""
+    """Helper for loading frames for Record3D captures.
+
+    Decoded frames are kept in an LRU cache, and the frames after each requested
+    one are decoded ahead of time on a thread pool, so sequential playback
+    doesn't wait on decoding.
+
+    Args:
+        data_dir: Directory of the capture.
+        cache_size: Maximum number of decoded frames to keep, including the ones
+            being prefetched.
+        prefetch: Number of frames to decode ahead of the requested one.
+        max_workers: Number of threads that decode frames.
+        point_cloud_cache_dir: If set, point clouds from `get_point_cloud()`
+            are cached on disk in this directory.
+    """
 
     # NOTE(hangg): Consider moving this module into
     # `examples/7_record3d_visualizer.py` since it is usecase-specific.
 
-    def __init__(self, data_dir: Path):
+    def __init__(
+        self,
+        data_dir: Path,
+        cache_size: int = 32,
+        prefetch: int = 8,
+        max_workers: int = 4,
+        point_cloud_cache_dir: Path | None = None,
+    ):
+        assert cache_size > prefetch, "The cache must fit the prefetched frames"
         metadata_path = data_dir / "metadata"
 
         # Read metadata.
-        metadata = json.loads(metadata_path.read_text())
+        metadata_bytes = metadata_path.read_bytes()
+        metadata = json.loads(metadata_bytes)
 
         K: np.ndarray = np.array(metadata["K"], np.float32).reshape(3, 3).T
         fps = metadata["fps"]
@@ -49,10 +78,83 @@ class Record3dLoader:
         ]
         self.conf_paths = [rgb_path.with_suffix(".conf") for rgb_path in self.rgb_paths]
 
+        self._cache_size = cache_size
+        self._prefetch = prefetch
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="record3d_loader"
+        )
+        self._frames: OrderedDict[int, Future[Record3dFrame]] = OrderedDict()
+        """Decoded and in-flight frames, least recently requested first."""
+        self._lock = threading.Lock()
+
+        # Cached point clouds are kept per capture.
+        self._point_cloud_cache_dir = (
+            None
+            if point_cloud_cache_dir is None
+            else point_cloud_cache_dir
+            / hashlib.sha256(
+                str(data_dir.resolve()).encode() + metadata_bytes
+            ).hexdigest()[:16]
+        )
+
     def num_frames(self) -> int:
         return len(self.rgb_paths)
 
     def get_frame(self, index: int) -> Record3dFrame:
+        """Get a decoded frame, and start decoding the frames after it."""
+        with self._lock:
+            future = self._request_frame(index)
+            for next_index in range(
+                index + 1, min(index + 1 + self._prefetch, self.num_frames())
+            ):
+                self._request_frame(next_index)
+            while len(self._frames) > self._cache_size:
+                _, evicted = self._frames.popitem(last=False)
+                evicted.cancel()
+        return future.result()
+
+    def get_point_cloud(
+        self, index: int, downsample_factor: int = 1
+    ) -> Tuple[npt.NDArray[np.float32], npt.NDArray[np.uint8]]:
+        """Point cloud of a frame, as from `Record3dFrame.get_point_cloud()`.
+        Read from the on-disk cache, if enabled."""
+        if self._point_cloud_cache_dir is None:
+            return self.get_frame(index).get_point_cloud(downsample_factor)
+
+        path = self._point_cloud_cache_dir / f"{index}_{downsample_factor}.npz"
+        try:
+            with np.load(path) as cached:
+                return cached["points"], cached["colors"]
+        except FileNotFoundError:
+            pass
+
+        points, colors = self.get_frame(index).get_point_cloud(downsample_factor)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as file:
+            np.savez(file, points=points, colors=colors)
+        os.replace(tmp_path, path)
+        return points, colors
+
+    def close(self) -> None:
+        """Stop decoding frames in the background."""
+        with self._lock:
+            for future in self._frames.values():
+                future.cancel()
+            self._frames.clear()
+        self._executor.shutdown(wait=False)
+
+    def _request_frame(self, index: int) -> Future[Record3dFrame]:
+        """Get the future of a frame, and mark it as the most recently requested.
+        Should be called with the lock held."""
+        future = self._frames.get(index)
+        if future is None or future.cancelled():
+            future = self._executor.submit(self._decode_frame, index)
+            self._frames[index] = future
+        self._frames.move_to_end(index)
+        return future
+
+    def _decode_frame(self, index: int) -> Record3dFrame:
         # Read conf.
         conf: np.ndarray = np.frombuffer(
             liblzfse.decompress(self.conf_paths[index].read_bytes()), dtype=np.uint8
@@ -100,27 +202,59 @@ class Record3dFrame:
         self, downsample_factor: int = 1
     ) -> Tuple[npt.NDArray[np.float32], npt.NDArray[np.uint8]]:
         rgb = self.rgb[::downsample_factor, ::downsample_factor]
-        depth = skimage.transform.resize(self.depth, rgb.shape[:2], order=0)
-        mask = cast(
-            npt.NDArray[np.bool_],
-            skimage.transform.resize(self.mask, rgb.shape[:2], order=0),
-        )
+        height, width = rgb.shape[:2]
+
+        # Depth and confidence are resized to the RGB resolution by nearest
+        # neighbor sampling, with indices that only depend on the shapes.
+        nearest = _nearest_indices(self.depth.shape, (height, width))
+        depth = self.depth.reshape(-1)[nearest]
+        mask = self.mask.reshape(-1)[nearest]
         assert depth.shape == rgb.shape[:2]
 
-        K = self.K
+        rays = _camera_rays(
+            tuple(self.K.ravel().tolist()), height, width, downsample_factor
+        )
         T_world_camera = self.T_world_camera
+        dirs = rays[mask] @ T_world_camera[:3, :3].T
+        points = (T_world_camera[:, -1] + dirs * depth[mask][:, None]).astype(
+            np.float32
+        )
+        point_colors = rgb[mask]
+
+        return points, point_colors
 
-        img_wh = rgb.shape[:2][::-1]
 
-        grid = (
-            np.stack(np.meshgrid(np.arange(img_wh[0]), np.arange(img_wh[1])), 2) + 0.5
+@functools.lru_cache(maxsize=16)
+def _nearest_indices(
+    source_shape: Tuple[int, ...], target_shape: Tuple[int, int]
+) -> npt.NDArray[np.intp]:
+    """Flat indices into an image of `source_shape` that resize it to
+    `target_shape`, with the same sampling as `skimage.transform.resize()` with
+    `order=0`. No anti-aliasing is applied, so depths are never averaged across
+    edges."""
+    flat_indices = np.arange(np.prod(source_shape), dtype=np.float64).reshape(
+        source_shape
+    )
+    indices = np.asarray(
+        skimage.transform.resize(
+            flat_indices, target_shape, order=0, anti_aliasing=False
         )
-        grid = grid * downsample_factor
+    ).astype(np.intp)
+    indices.flags.writeable = False
+    return indices
 
-        homo_grid = np.pad(grid[mask], np.array([[0, 0], [0, 1]]), constant_values=1)
-        local_dirs = np.einsum("ij,bj->bi", np.linalg.inv(K), homo_grid)
-        dirs = np.einsum("ij,bj->bi", T_world_camera[:3, :3], local_dirs)
-        points = (T_world_camera[:, -1] + dirs * depth[mask, None]).astype(np.float32)
-        point_colors = rgb[mask]
 
-        return points, point_colors
+@functools.lru_cache(maxsize=16)
+def _camera_rays(
+    K: Tuple[float, ...], height: int, width: int, downsample_factor: int
+) -> npt.NDArray[np.float32]:
+    """Camera-frame direction through the center of each pixel, with unit depth.
+    (height, width, 3)."""
+    grid = (
+        np.stack(np.meshgrid(np.arange(width), np.arange(height)), 2) + 0.5
+    ) * downsample_factor
+    homo_grid = np.concatenate([grid, np.ones((height, width, 1))], axis=-1)
+    K_inv = np.linalg.inv(np.array(K).reshape((3, 3)))
+    rays = np.einsum("ij,hwj->hwi", K_inv, homo_grid).astype(np.float32)
+    rays.flags.writeable = False
+    return rays
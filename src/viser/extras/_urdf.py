@@ -106,13 +106,20 @@ class ViserUrdf:
     def update_cfg(self, configuration: np.ndarray) -> None:
         """Update the joint angles of the visualized URDF."""
         self._urdf.update_cfg(configuration)
-        for joint, frame_handle in zip(
-            self._urdf.joint_map.values(), self._joint_frames
-        ):
+        Ts_parent_child = []
+        for joint in self._urdf.joint_map.values():
             assert isinstance(joint, yourdfpy.Joint)
-            T_parent_child = self._urdf.get_transform(joint.child, joint.parent)
-            frame_handle.wxyz = tf.SO3.from_matrix(T_parent_child[:3, :3]).wxyz
-            frame_handle.position = T_parent_child[:3, 3] * self._scale
+            Ts_parent_child.append(self._urdf.get_transform(joint.child, joint.parent))
+        if len(Ts_parent_child) == 0:
+            return
+
+        # All joints are posed with a single message.
+        T_parent_child = np.stack(Ts_parent_child)
+        self._target.scene.set_transforms(
+            [frame_handle.name for frame_handle in self._joint_frames],
+            tf.SO3.from_matrix(T_parent_child[:, :3, :3]).wxyz,
+            T_parent_child[:, :3, 3] * self._scale,
+        )
 
     def get_actuated_joint_limits(
         self,
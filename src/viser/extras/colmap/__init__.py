@@ -1,8 +1,14 @@
 """Colmap utilities."""
 
+from ._colmap_utils import ImagesArrays as ImagesArrays
+from ._colmap_utils import Points3DArrays as Points3DArrays
 from ._colmap_utils import read_cameras_binary as read_cameras_binary
 from ._colmap_utils import read_cameras_text as read_cameras_text
 from ._colmap_utils import read_images_binary as read_images_binary
+from ._colmap_utils import read_images_binary_arrays as read_images_binary_arrays
 from ._colmap_utils import read_images_text as read_images_text
 from ._colmap_utils import read_points3d_binary as read_points3d_binary
+from ._colmap_utils import (
+    read_points3d_binary_arrays as read_points3d_binary_arrays,
+)
 from ._colmap_utils import read_points3D_text as read_points3D_text
@@ -31,10 +31,12 @@
 #
 # Modified 5/3/2023 to add type annotations.
 
+import mmap
 import struct
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Union
+from typing import Dict, Iterator, List, Union
 
 import numpy as np
 
@@ -81,6 +83,87 @@ class Image(BaseImage):
         return qvec2rotmat(self.qvec)
 
 
+@dataclass(frozen=True)
+class Points3DArrays:
+    """Columnar 3D points. The track of point `i` is
+    `image_ids[track_offsets[i] : track_offsets[i + 1]]`, and likewise for
+    `point2D_idxs`."""
+
+    ids: np.ndarray
+    """(N,) uint64."""
+    xyz: np.ndarray
+    """(N, 3) float64."""
+    rgb: np.ndarray
+    """(N, 3) uint8."""
+    error: np.ndarray
+    """(N,) float64."""
+    track_offsets: np.ndarray
+    """(N + 1,) int64."""
+    image_ids: np.ndarray
+    """(T,) int32. Tracks of all points, concatenated."""
+    point2D_idxs: np.ndarray
+    """(T,) int32. Tracks of all points, concatenated."""
+
+    def to_dict(self) -> Dict[int, Point3D]:
+        """Points in the format of `read_points3d_binary()`."""
+        splits = self.track_offsets[1:-1]
+        rgbs = self.rgb.astype(np.int64)
+        image_ids = np.split(self.image_ids.astype(np.int64), splits)
+        point2D_idxs = np.split(self.point2D_idxs.astype(np.int64), splits)
+        return {
+            point3D_id: Point3D(
+                id=point3D_id,
+                xyz=self.xyz[i],
+                rgb=rgbs[i],
+                error=self.error[i],
+                image_ids=image_ids[i],
+                point2D_idxs=point2D_idxs[i],
+            )
+            for i, point3D_id in enumerate(self.ids.tolist())
+        }
+
+
+@dataclass(frozen=True)
+class ImagesArrays:
+    """Columnar images. The 2D points of image `i` are
+    `xys[points2D_offsets[i] : points2D_offsets[i + 1]]`, and likewise for
+    `point3D_ids`."""
+
+    ids: np.ndarray
+    """(M,) int32."""
+    qvecs: np.ndarray
+    """(M, 4) float64."""
+    tvecs: np.ndarray
+    """(M, 3) float64."""
+    camera_ids: np.ndarray
+    """(M,) int32."""
+    names: List[str]
+    points2D_offsets: np.ndarray
+    """(M + 1,) int64."""
+    xys: np.ndarray
+    """(P, 2) float64. 2D points of all images, concatenated."""
+    point3D_ids: np.ndarray
+    """(P,) int64. 2D points of all images, concatenated."""
+
+    def to_dict(self) -> Dict[int, Image]:
+        """Images in the format of `read_images_binary()`."""
+        splits = self.points2D_offsets[1:-1]
+        xys = np.split(self.xys, splits)
+        point3D_ids = np.split(self.point3D_ids, splits)
+        return {
+            image_id: Image(
+                id=image_id,
+                qvec=self.qvecs[i],
+                tvec=self.tvecs[i],
+                camera_id=int(self.camera_ids[i]),
+                name=self.names[i],
+                xys=xys[i],
+                point3D_ids=point3D_ids[i],
+            )
+            for i, image_id in enumerate(self.ids.tolist())
+        }
+
+
 CAMERA_MODELS = {
     CameraModel(model_id=0, model_name="SIMPLE_PINHOLE", num_params=3),
     CameraModel(model_id=1, model_name="PINHOLE", num_params=4),
@@ -98,6 +181,27 @@ CAMERA_MODEL_IDS = dict(
     [(camera_model.model_id, camera_model) for camera_model in CAMERA_MODELS]
 )
 
+# Fixed-size parts of the records in binary models. Fields are packed, as
+# written by COLMAP.
+_POINT3D_HEADER_DTYPE = np.dtype(
+    [
+        ("id", "<u8"),
+        ("xyz", "<f8", (3,)),
+        ("rgb", "u1", (3,)),
+        ("error", "<f8"),
+        ("track_length", "<u8"),
+    ]
+)
+_IMAGE_HEADER_DTYPE = np.dtype(
+    [
+        ("id", "<i4"),
+        ("qvec", "<f8", (4,)),
+        ("tvec", "<f8", (3,)),
+        ("camera_id", "<i4"),
+    ]
+)
+_POINT2D_DTYPE = np.dtype([("xy", "<f8", (2,)), ("point3D_id", "<i8")])
+
 
 def read_next_bytes(fid, num_bytes, format_char_sequence, endian_character="<"):
     """Read and unpack the next bytes from a binary file.
@@ -111,6 +215,18 @@ def read_next_bytes(fid, num_bytes, format_char_sequence, endian_character="<"):
     return struct.unpack(endian_character + format_char_sequence, data)
 
 
+@contextmanager
+def _open_binary(path: Union[str, Path], use_mmap: bool) -> Iterator[bytes]:
+    """Contents of a file, memory-mapped or read into memory. Views into a
+    memory-mapped file have to be gone when the context exits."""
+    with open(path, "rb") as fid:
+        if not use_mmap:
+            yield fid.read()
+            return
+        with mmap.mmap(fid.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped  # type: ignore
+
+
 def read_cameras_text(path: Union[str, Path]) -> Dict[int, Camera]:
     """
     see: src/base/reconstruction.cc
@@ -213,44 +329,54 @@ def read_images_binary(path_to_model_file: Union[str, Path]) -> Dict[int, Image]
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
     """
-    images = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_reg_images = read_next_bytes(fid, 8, "Q")[0]
-        for image_index in range(num_reg_images):
-            binary_image_properties = read_next_bytes(
-                fid, num_bytes=64, format_char_sequence="idddddddi"
-            )
-            image_id = binary_image_properties[0]
-            qvec = np.array(binary_image_properties[1:5])
-            tvec = np.array(binary_image_properties[5:8])
-            camera_id = binary_image_properties[8]
-            image_name = ""
-            current_char = read_next_bytes(fid, 1, "c")[0]
-            while current_char != b"\x00":  # look for the ASCII 0 entry
-                image_name += current_char.decode("utf-8")
-                current_char = read_next_bytes(fid, 1, "c")[0]
-            num_points2D = read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[
-                0
-            ]
-            x_y_id_s = read_next_bytes(
-                fid,
-                num_bytes=24 * num_points2D,
-                format_char_sequence="ddq" * num_points2D,
-            )
-            xys = np.column_stack(
-                [tuple(map(float, x_y_id_s[0::3])), tuple(map(float, x_y_id_s[1::3]))]
+    return read_images_binary_arrays(path_to_model_file).to_dict()
+
+
+def read_images_binary_arrays(
+    path_to_model_file: Union[str, Path], use_mmap: bool = True
+) -> ImagesArrays:
+    """Read images from a binary model into columnar arrays. The 2D points of
+    each image are parsed in bulk. By default, the file is memory-mapped."""
+    headers = []
+    names = []
+    points2D = []
+    with _open_binary(path_to_model_file, use_mmap) as data:
+        (num_reg_images,) = struct.unpack_from("<Q", data, 0)
+        offset = 8
+        for _ in range(num_reg_images):
+            headers.append(
+                np.frombuffer(data, _IMAGE_HEADER_DTYPE, count=1, offset=offset)
             )
-            point3D_ids = np.array(tuple(map(int, x_y_id_s[2::3])))
-            images[image_id] = Image(
-                id=image_id,
-                qvec=qvec,
-                tvec=tvec,
-                camera_id=camera_id,
-                name=image_name,
-                xys=xys,
-                point3D_ids=point3D_ids,
+            offset += _IMAGE_HEADER_DTYPE.itemsize
+            name_end = data.find(b"\x00", offset)
+            names.append(data[offset:name_end].decode("utf-8"))
+            (num_points2D,) = struct.unpack_from("<Q", data, name_end + 1)
+            offset = name_end + 9
+            points2D.append(
+                np.frombuffer(
+                    data, _POINT2D_DTYPE, count=num_points2D, offset=offset
+                ).copy()
             )
-    return images
+            offset += num_points2D * _POINT2D_DTYPE.itemsize
+        header = (
+            np.concatenate(headers) if headers else np.empty(0, _IMAGE_HEADER_DTYPE)
+        )
+        # Release views into the file.
+        del headers
+
+    point2D = np.concatenate(points2D) if points2D else np.empty(0, _POINT2D_DTYPE)
+    points2D_offsets = np.zeros(num_reg_images + 1, dtype=np.int64)
+    np.cumsum([len(points) for points in points2D], out=points2D_offsets[1:])
+    return ImagesArrays(
+        ids=header["id"].copy(),
+        qvecs=header["qvec"].copy(),
+        tvecs=header["tvec"].copy(),
+        camera_ids=header["camera_id"].copy(),
+        names=names,
+        points2D_offsets=points2D_offsets,
+        xys=point2D["xy"].copy(),
+        point3D_ids=point2D["point3D_id"].copy(),
+    )
 
 
 def read_points3D_text(path: Union[str, Path]):
@@ -291,36 +417,74 @@ def read_points3d_binary(path_to_model_file: Union[str, Path]) -> Dict[int, Poin
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
-    points3D = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_points = read_next_bytes(fid, 8, "Q")[0]
-        for point_line_index in range(num_points):
-            binary_point_line_properties = read_next_bytes(
-                fid, num_bytes=43, format_char_sequence="QdddBBBd"
-            )
-            point3D_id = binary_point_line_properties[0]
-            xyz = np.array(binary_point_line_properties[1:4])
-            rgb = np.array(binary_point_line_properties[4:7])
-            error = np.array(binary_point_line_properties[7])
-            track_length = read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[
-                0
-            ]
-            track_elems = read_next_bytes(
-                fid,
-                num_bytes=8 * track_length,
-                format_char_sequence="ii" * track_length,
-            )
-            image_ids = np.array(tuple(map(int, track_elems[0::2])))
-            point2D_idxs = np.array(tuple(map(int, track_elems[1::2])))
-            points3D[point3D_id] = Point3D(
-                id=point3D_id,
-                xyz=xyz,
-                rgb=rgb,
-                error=error,
-                image_ids=image_ids,
-                point2D_idxs=point2D_idxs,
-            )
-    return points3D
+    return read_points3d_binary_arrays(path_to_model_file).to_dict()
+
+
+def read_points3d_binary_arrays(
+    path_to_model_file: Union[str, Path], use_mmap: bool = True
+) -> Points3DArrays:
+    """Read 3D points from a binary model into columnar arrays. By default, the
+    file is memory-mapped.
+
+    Records have variable lengths, so finding where each one starts takes a
+    pass over the track lengths. Headers and tracks are then gathered in bulk."""
+    header_size = _POINT3D_HEADER_DTYPE.itemsize
+    track_length_offset = header_size - 8
+    with _open_binary(path_to_model_file, use_mmap) as data:
+        (num_points,) = struct.unpack_from("<Q", data, 0)
+        unpack_track_length = struct.Struct("<Q").unpack_from
+        record_offsets = [8]
+        offset = 8
+        for _ in range(num_points):
+            (track_length,) = unpack_track_length(data, offset + track_length_offset)
+            offset += header_size + 8 * track_length
+            record_offsets.append(offset)
+        assert offset == len(data), "Unexpected size of points3D file"
+
+        file_bytes = np.frombuffer(data, dtype=np.uint8)
+        starts = np.array(record_offsets[:-1], dtype=np.int64)
+        header = _gather_bytes(file_bytes, starts, header_size).view(
+            _POINT3D_HEADER_DTYPE
+        )[:, 0]
+        track_lengths = header["track_length"].astype(np.int64)
+        track_offsets = np.zeros(num_points + 1, dtype=np.int64)
+        np.cumsum(track_lengths, out=track_offsets[1:])
+
+        # Each track element follows the header of its point, after the elements
+        # before it in the track.
+        element_offsets = np.repeat(
+            starts + header_size - 8 * track_offsets[:-1], track_lengths
+        )
+        element_offsets += 8 * np.arange(track_offsets[-1], dtype=np.int64)
+        tracks = _gather_bytes(file_bytes, element_offsets, 8).view("<i4")
+        del element_offsets
+        # Release views into the file.
+        del file_bytes
+
+    return Points3DArrays(
+        ids=header["id"].copy(),
+        xyz=header["xyz"].copy(),
+        rgb=header["rgb"].copy(),
+        error=header["error"].copy(),
+        track_offsets=track_offsets,
+        image_ids=tracks[:, 0].copy(),
+        point2D_idxs=tracks[:, 1].copy(),
+    )
+
+
+def _gather_bytes(file_bytes: np.ndarray, offsets: np.ndarray, size: int) -> np.ndarray:
+    """Copy the `size` bytes at each offset. Returns a (len(offsets), size) array,
+    without temporaries larger than that."""
+    if len(offsets) == 0:
+        return np.zeros((0, size), dtype=np.uint8)
+    # Overlapping windows of `size` bytes, starting at every byte of the file.
+    windows = np.lib.stride_tricks.as_strided(
+        file_bytes,
+        shape=(len(file_bytes) - size + 1, size),
+        strides=(1, 1),
+        writeable=False,
+    )
+    return windows[offsets]
 
 
 def qvec2rotmat(qvec):
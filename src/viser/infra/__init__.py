@@ -16,6 +16,7 @@ from ._infra import WebsockClientConnection as WebsockClientConnection
 from ._infra import WebsockMessageHandler as WebsockMessageHandler
 from ._infra import WebsockServer as WebsockServer
 from ._messages import Message as Message
+from ._metrics import ServerMetrics as ServerMetrics
 from ._typescript_interface_gen import (
     TypeScriptAnnotationOverride as TypeScriptAnnotationOverride,
 )
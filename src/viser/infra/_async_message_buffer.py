@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
 import dataclasses
 import threading
 from asyncio.events import AbstractEventLoop
@@ -23,6 +24,10 @@ class AsyncMessageBuffer:
     message_counter: int = 0
     message_from_id: Dict[int, Message] = dataclasses.field(default_factory=dict)
     id_from_redundancy_key: Dict[str, int] = dataclasses.field(default_factory=dict)
+    live_ids: List[int] = dataclasses.field(default_factory=list)
+    """Ids of buffered messages, in increasing order. Lets windows skip over the
+    ids of culled messages. Can also hold ids of removed messages, which are
+    compacted away once they outnumber the buffered ones."""
 
     buffer_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
     """Lock to prevent race conditions when pushing messages from different threads."""
@@ -37,12 +42,24 @@ class AsyncMessageBuffer:
 
         with self.buffer_lock:
             # Remove messages that match the condition.
-            for id, message in filter(
-                lambda kv_pair: match_fn(self.message_from_id[kv_pair[0]]),
-                tuple(self.message_from_id.items()),
-            ):
-                self.message_from_id.pop(id)
-                self.id_from_redundancy_key.pop(message.redundancy_key())
+            for id, message in tuple(self.message_from_id.items()):
+                if match_fn(message):
+                    self._remove(id, message)
+            self._compact_live_ids()
+
+    def _remove(self, id: int, message: Message) -> None:
+        """Remove a message. Should be called with the buffer lock held."""
+        self.message_from_id.pop(id)
+        redundancy_key = message.redundancy_key()
+        if self.id_from_redundancy_key.get(redundancy_key) == id:
+            self.id_from_redundancy_key.pop(redundancy_key)
+
+    def _compact_live_ids(self) -> None:
+        """Drop ids of removed messages, if there are enough of them. Should be
+        called with the buffer lock held."""
+        if len(self.live_ids) > 2 * len(self.message_from_id) + 64:
+            # Dictionaries preserve insertion order, which is also id order.
+            self.live_ids = list(self.message_from_id.keys())
 
     def push(self, message: Message) -> None:
         """Push a new message to our buffer, and remove old redundant ones."""
@@ -54,6 +71,9 @@ class AsyncMessageBuffer:
         with self.buffer_lock:
             new_message_id = self.message_counter
             self.message_from_id[new_message_id] = message
+            # Append before incrementing the counter: windows rely on every id up
+            # to `message_counter - 1` already being in `live_ids`.
+            self.live_ids.append(new_message_id)
             self.message_counter += 1
 
             # If an existing message with the same key already exists in our buffer, we
@@ -65,6 +85,7 @@ class AsyncMessageBuffer:
                 old_message_id = self.id_from_redundancy_key.pop(redundancy_key)
                 self.message_from_id.pop(old_message_id)
             self.id_from_redundancy_key[redundancy_key] = new_message_id
+            self._compact_live_ids()
 
         # Pulse message event to notify consumers that a new message is available.
         # But only do so if we're not in an atomic block.
@@ -106,25 +127,33 @@ class AsyncMessageBuffer:
         while not self.done:
             window: List[Message] = []
             most_recent_message_id = self.message_counter - 1
+            # Only visit ids of messages that are still buffered, starting after the
+            # last one we sent. New clients don't walk over culled history.
+            live_ids = self.live_ids
+            index = bisect.bisect_right(live_ids, last_sent_id)
             while (
-                last_sent_id < most_recent_message_id
+                index < len(live_ids)
                 and len(window) < self.max_window_size
                 # We should only be polling for new messages if we aren't in an atomic block.
                 and self.atomic_counter == 0
             ):
-                last_sent_id += 1
+                last_sent_id = live_ids[index]
+                index += 1
                 if self.persistent_messages:
                     message = self.message_from_id.get(last_sent_id, None)
                 else:
                     # If we're not persisting messages, remove them from the buffer.
                     with self.buffer_lock:
-                        message = self.message_from_id.pop(last_sent_id, None)
+                        message = self.message_from_id.get(last_sent_id, None)
                         if message is not None:
-                            redundancy_key = message.redundancy_key()
-                            self.id_from_redundancy_key.pop(redundancy_key, None)
+                            self._remove(last_sent_id, message)
+                            self._compact_live_ids()
 
                 if message is not None and message.excluded_self_client != client_id:
                     window.append(message)
+            if index == len(live_ids):
+                # Everything up to the most recent message is sent or culled.
+                last_sent_id = max(last_sent_id, most_recent_message_id)
 
             if len(window) > 0:
                 # Yield a window!
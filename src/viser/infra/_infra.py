@@ -4,12 +4,11 @@ import abc
 import asyncio
 import contextlib
 import dataclasses
-import gzip
 import http
 import logging
-import mimetypes
 import queue
 import threading
+import time
 from asyncio.events import AbstractEventLoop
 from collections.abc import Coroutine
 from pathlib import Path
@@ -27,6 +26,9 @@ from websockets.http11 import Request, Response
 
 from ._async_message_buffer import AsyncMessageBuffer
 from ._messages import Message
+from ._metrics import COUNT_BUCKETS, ServerMetrics
+from ._recording import RecordingWriter
+from ._static_files import StaticFileCache, etag_matches
 
 
 @dataclasses.dataclass
@@ -35,6 +37,7 @@ class _ClientHandleState:
     # message_buffer: asyncio.Queue
     message_buffer: AsyncMessageBuffer
     event_loop: AbstractEventLoop
+    metrics: ServerMetrics
 
 
 ClientId = NewType("ClientId", int)
@@ -47,13 +50,20 @@ class RecordHandle:
     Handle for recording outgoing messages. Useful for logging + debugging."""
 
     def __init__(
-        self, handler: WebsockMessageHandler, filter: Callable[[Message], bool]
+        self,
+        handler: WebsockMessageHandler,
+        filter: Callable[[Message], bool],
+        path: str | Path | None = None,
     ):
         self._handler = handler
         self._filter = filter
+        self._path = path
         self._loop_start_index: int | None = None
         self._time: float = 0.0
-        self._messages: list[tuple[float, dict[str, Any]]] = []
+        self._message_count = 0
+        self._lock = threading.Lock()
+        # Messages are compressed and written incrementally, in the background.
+        self._writer = RecordingWriter(path)
 
     def _insert_message(self, message: Message) -> None:
         """Insert a message into the recorded file."""
@@ -61,7 +71,10 @@ class RecordHandle:
         # Exclude GUI messages. This is hacky.
         if not self._filter(message):
             return
-        self._messages.append((self._time, message.as_serializable_dict()))
+        serializable = message.as_serializable_dict()
+        with self._lock:
+            self._writer.write(self._time, serializable)
+            self._message_count += 1
 
     def insert_sleep(self, duration: float) -> None:
         """Insert a sleep into the recorded file."""
@@ -71,27 +84,26 @@ class RecordHandle:
         """Mark the start of the loop. Messages sent after this point will be
         looped. Should only be called once."""
         assert self._loop_start_index is None, "Loop start already set."
-        self._loop_start_index = len(self._messages)
+        self._loop_start_index = self._message_count
+
+    def end(self) -> None:
+        """End the recording, and finish writing it."""
+        self._handler._record_handle = None
+        self._writer.close(self._loop_start_index, self._time)
 
     def end_and_serialize(self) -> bytes:
         """End the recording and serialize contents. Returns the recording as
-        bytes, which should generally be written to a file."""
-        packed_bytes = msgspec.msgpack.encode(
-            {
-                "loopStartIndex": self._loop_start_index,
-                "durationSeconds": self._time,
-                "messages": self._messages,
-            }
-        )
-        assert isinstance(packed_bytes, bytes)
-        self._handler._record_handle = None
-        return gzip.compress(packed_bytes, compresslevel=9)
+        bytes, which should generally be written to a file. Only for recordings
+        that were started without a path."""
+        assert self._path is None, "Recording was written to a file, use end()."
+        self.end()
+        return self._writer.getvalue()
 
 
 class WebsockMessageHandler:
     """Mix-in for adding message handling to a class."""
 
-    def __init__(self) -> None:
+    def __init__(self, metrics: ServerMetrics | None = None) -> None:
         self._incoming_handlers: dict[
             type[Message], list[Callable[[ClientId, Message], None | Coroutine]]
         ] = {}
@@ -101,11 +113,17 @@ class WebsockMessageHandler:
         # Set to None if not recording.
         self._record_handle: RecordHandle | None = None
 
-    def start_recording(self, filter: Callable[[Message], bool]) -> RecordHandle:
+        # Shared by a server and its client connections.
+        self._metrics = ServerMetrics() if metrics is None else metrics
+
+    def start_recording(
+        self, filter: Callable[[Message], bool], path: str | Path | None = None
+    ) -> RecordHandle:
         """Start recording messages that are sent. Sent messages will be
-        serialized and can be used for playback."""
+        serialized and can be used for playback. If `path` is set, the recording
+        is streamed to that file instead of kept in memory."""
         assert self._record_handle is None, "Already recording."
-        self._record_handle = RecordHandle(self, filter)
+        self._record_handle = RecordHandle(self, filter, path)
         return self._record_handle
 
     def register_handler(
@@ -137,11 +155,17 @@ class WebsockMessageHandler:
     ) -> None:
         """Handle incoming messages."""
         if type(message) in self._incoming_handlers:
+            start_time = time.perf_counter()
             for cb in self._incoming_handlers[type(message)]:
                 if asyncio.iscoroutinefunction(cb):
                     await cb(client_id, message)
                 else:
                     cb(client_id, message)
+            self._metrics.observe(
+                "viser_incoming_handler_seconds",
+                time.perf_counter() - start_time,
+                type=type(message).__name__,
+            )
 
     @abc.abstractmethod
     def get_message_buffer(self) -> AsyncMessageBuffer: ...
@@ -182,7 +206,7 @@ class WebsockClientConnection(WebsockMessageHandler):
     ) -> None:
         self.client_id = client_id
         self._state = client_state
-        super().__init__()
+        super().__init__(client_state.metrics)
 
     @override
     def get_message_buffer(self) -> AsyncMessageBuffer:
@@ -292,6 +316,32 @@ class WebsockServer(WebsockMessageHandler):
         messages will immediately be sent. (by default they are windowed)"""
         self._client_state_from_id[client_id].message_buffer.flush()
 
+    def get_metrics(self) -> ServerMetrics:
+        """Get counters, gauges, and histograms describing the websocket layer:
+        messages and bytes sent, encode times, window sizes, buffer depths, and
+        incoming handler latencies."""
+        # Series of disconnected clients are dropped when they disconnect, but
+        # a producer that was still sending can add them back after that.
+        live_clients = {str(client_id) for client_id in self._client_state_from_id}
+        self._metrics.remove_series(
+            lambda labels: _client_of_series(labels) not in live_clients | {None}
+        )
+        self._metrics.set_gauge(
+            "viser_connected_clients", len(self._client_state_from_id)
+        )
+        self._metrics.set_gauge(
+            "viser_buffer_depth",
+            len(self._broadcast_buffer.message_from_id),
+            buffer="broadcast",
+        )
+        for client_id, client_state in tuple(self._client_state_from_id.items()):
+            self._metrics.set_gauge(
+                "viser_buffer_depth",
+                len(client_state.message_buffer.message_from_id),
+                buffer=f"client_{client_id}",
+            )
+        return self._metrics
+
     def _background_worker(self, ready_sem: threading.Semaphore) -> None:
         host = self._host
         port = self._port
@@ -334,6 +384,7 @@ class WebsockServer(WebsockMessageHandler):
             client_state = _ClientHandleState(
                 AsyncMessageBuffer(event_loop, persistent_messages=False),
                 event_loop,
+                self._metrics,
             )
             client_connection = WebsockClientConnection(client_id, client_state)
             self._client_state_from_id[client_id] = client_state
@@ -362,12 +413,14 @@ class WebsockServer(WebsockMessageHandler):
                         client_state.message_buffer,
                         client_id,
                         self._client_api_version,
+                        self._metrics,
                     ),
                     _message_producer(
                         connection,
                         self._broadcast_buffer,
                         client_id,
                         self._client_api_version,
+                        self._metrics,
                     ),
                     _message_consumer(connection, handle_incoming, message_class),
                 )
@@ -392,6 +445,9 @@ class WebsockServer(WebsockMessageHandler):
 
                 # Cleanup.
                 self._client_state_from_id.pop(client_id)
+                self._metrics.remove_series(
+                    lambda labels: _client_of_series(labels) == str(client_id)
+                )
                 total_connections -= 1
                 if self._verbose:
                     rich.print(
@@ -399,9 +455,15 @@ class WebsockServer(WebsockMessageHandler):
                         f" {total_connections} total)"
                     )
 
-        # Host client on the same port as the websocket.
-        file_cache: dict[Path, bytes] = {}
-        file_cache_gzipped: dict[Path, bytes] = {}
+        # Host client on the same port as the websocket. Files are compressed in
+        # background threads; requests that arrive before a file is compressed
+        # are served uncompressed, so requests never compress on the event loop.
+        static_files = None
+        if http_server_root is not None:
+            static_files = StaticFileCache(http_server_root)
+            threading.Thread(
+                target=static_files.precompress, name="viser_static_files", daemon=True
+            ).start()
 
         filter_added = False
 
@@ -427,6 +489,17 @@ class WebsockServer(WebsockMessageHandler):
             if request.headers.get("Upgrade") == "websocket":
                 return None
 
+            if request.path.partition("?")[0] == "/metrics":
+                response_headers = Headers()
+                response_headers["Content-Type"] = "text/plain; version=0.0.4"
+                response_headers["Cache-Control"] = "no-store"
+                return Response(
+                    http.HTTPStatus.OK,
+                    "OK",
+                    response_headers,
+                    self.get_metrics().to_prometheus_text().encode(),
+                )
+
             # Strip out search params, get relative path.
             path = request.path
             path = path.partition("?")[0]
@@ -435,62 +508,36 @@ class WebsockServer(WebsockMessageHandler):
                 relpath = "index.html"
             assert http_server_root is not None
 
-            source_path = http_server_root / relpath
-            if not source_path.exists():
+            assert static_files is not None
+            static_file = static_files.get(http_server_root / relpath)
+            if static_file is None:
                 return Response(http.HTTPStatus.NOT_FOUND, "NOT FOUND", Headers())
 
-            use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
-
-            # First, try some known MIME types. Using guess_type() can cause
-            # problems for Javascript on some Windows machines.
-            #
-            # Some references:
-            #     https://github.com/nerfstudio-project/viser/issues/256#issuecomment-2369684252
-            #     https://bugs.python.org/issue43975
-            #     https://github.com/golang/go/issues/32350#issuecomment-525111557
-            #
-            # We're assuming UTF-8, this is mostly reasonable but might want to revisit.
-            mime_type = {
-                ".css": "text/css; charset=utf-8",
-                ".gif": "image/gif",
-                ".htm": "text/html; charset=utf-8",
-                ".html": "text/html; charset=utf-8",
-                ".jpg": "image/jpeg",
-                ".js": "application/javascript",
-                ".wasm": "application/wasm",
-                ".pdf": "application/pdf",
-                ".png": "image/png",
-                ".svg": "image/svg+xml",
-                ".xml": "text/xml; charset=utf-8",
-            }.get(Path(path).suffix.lower(), None)
-            if mime_type is None:
-                mime_type = mimetypes.guess_type(relpath)[0]
-            if mime_type is None:
-                mime_type = "application/octet-stream"
-
-            response_headers = {
-                "Content-Type": mime_type,
-            }
-            if source_path not in file_cache:
-                file_cache[source_path] = source_path.read_bytes()
-            if use_gzip:
-                response_headers["Content-Encoding"] = "gzip"
-                if source_path not in file_cache_gzipped:
-                    file_cache_gzipped[source_path] = gzip.compress(
-                        file_cache[source_path]
-                    )
-                response_payload = file_cache_gzipped[source_path]
+            encoding = static_file.select_encoding(
+                request.headers.get("Accept-Encoding", "")
+            )
+            etag = static_file.etag_for(encoding)
+            response_headers = Headers()
+            response_headers["ETag"] = etag
+            response_headers["Cache-Control"] = static_file.cache_control()
+            response_headers["Vary"] = "Accept-Encoding"
+
+            if etag_matches(request.headers.get("If-None-Match", ""), etag):
+                return Response(
+                    http.HTTPStatus.NOT_MODIFIED, "Not Modified", response_headers, b""
+                )
+
+            response_headers["Content-Type"] = static_file.mime_type
+            if encoding is None:
+                response_payload = static_file.content
             else:
-                response_payload = file_cache[source_path]
+                response_headers["Content-Encoding"] = encoding
+                response_payload = static_file.encoded_content[encoding]
 
             # Try to read + send over file.
             return Response(
-                http.HTTPStatus.OK,
-                "OK",
-                websockets.datastructures.Headers(**response_headers),
-                response_payload,
+                http.HTTPStatus.OK, "OK", response_headers, response_payload
             )
-            # return (http.HTTPStatus.OK, response_headers, response_payload)
 
         async def start_server() -> None:
             port_attempt = port
@@ -520,31 +567,70 @@ class WebsockServer(WebsockMessageHandler):
         rich.print("[bold](viser)[/bold] Server stopped")
 
 
+def _client_of_series(labels: dict[str, str]) -> str | None:
+    """ID of the client a metric series is about, or None for server-wide ones."""
+    if "client" in labels:
+        return labels["client"]
+    buffer = labels.get("buffer", "")
+    if buffer.startswith("client_"):
+        return buffer[len("client_") :]
+    return None
+
+
 async def _message_producer(
     websocket: ServerConnection,
     buffer: AsyncMessageBuffer,
     client_id: int,
     client_api_version: Literal[0, 1],
+    metrics: ServerMetrics,
 ) -> None:
     """Infinite loop to broadcast windows of messages from a buffer."""
     window_generator = buffer.window_generator(client_id)
+    encoder = msgspec.msgpack.Encoder()
     while not buffer.done:
         outgoing = await window_generator.__anext__()
-        if client_api_version == 1:
-            serialized = msgspec.msgpack.encode(
-                tuple(message.as_serializable_dict() for message in outgoing)
+
+        # Messages are encoded one at a time, so we can count bytes per type.
+        start_time = time.perf_counter()
+        serialized_messages = [
+            encoder.encode(message.as_serializable_dict()) for message in outgoing
+        ]
+        metrics.observe("viser_encode_seconds", time.perf_counter() - start_time)
+        metrics.observe("viser_window_size", len(outgoing), COUNT_BUCKETS)
+        metrics.increment("viser_windows_sent_total", client=client_id)
+        for message, serialized in zip(outgoing, serialized_messages):
+            message_type = type(message).__name__
+            metrics.increment(
+                "viser_messages_sent_total", type=message_type, client=client_id
             )
-            assert isinstance(serialized, bytes)
-            await websocket.send(serialized)
+            metrics.increment(
+                "viser_bytes_sent_total",
+                len(serialized),
+                type=message_type,
+                client=client_id,
+            )
+
+        if client_api_version == 1:
+            await websocket.send(_msgpack_array(serialized_messages))
         elif client_api_version == 0:
-            for msg in outgoing:
-                serialized = msgspec.msgpack.encode(msg.as_serializable_dict())
-                assert isinstance(serialized, bytes)
+            for serialized in serialized_messages:
                 await websocket.send(serialized)
         else:
             assert_never(client_api_version)
 
 
+def _msgpack_array(serialized_items: list[bytes]) -> bytes:
+    """Join msgpack-encoded items into an encoded array of those items."""
+    n = len(serialized_items)
+    if n < 16:
+        header = bytes([0x90 | n])
+    elif n < 2**16:
+        header = b"\xdc" + n.to_bytes(2, "big")
+    else:
+        header = b"\xdd" + n.to_bytes(4, "big")
+    return b"".join([header, *serialized_items])
+
+
 async def _message_consumer(
     websocket: ServerConnection,
     handle_message: Callable[[Message], None],
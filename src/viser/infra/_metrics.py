@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import bisect
+import dataclasses
+import threading
+from typing import Callable, Dict, Tuple, Union
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Upper bounds of histogram buckets, in the same units as observed values.
+SECONDS_BUCKETS = (1e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_DESCRIPTIONS = {
+    "viser_messages_sent_total": "Messages sent, by message type and client.",
+    "viser_bytes_sent_total": "Serialized bytes sent, by message type and client.",
+    "viser_windows_sent_total": "Message windows sent, by client.",
+    "viser_window_size": "Messages per sent window.",
+    "viser_encode_seconds": "Time spent serializing one message window.",
+    "viser_incoming_handler_seconds": "Time spent in handlers for incoming messages.",
+    "viser_buffer_depth": "Messages held in a message buffer.",
+    "viser_connected_clients": "Currently connected clients.",
+}
+
+
+@dataclasses.dataclass
+class Histogram:
+    bounds: tuple[float, ...]
+    bucket_counts: list[int]
+    """Observations per bucket, not cumulative. The last bucket is +Inf."""
+    count: int = 0
+    sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+MetricValue = Union[float, Histogram]
+
+
+class ServerMetrics:
+    """Thread-safe counters, gauges, and histograms for the websocket layer.
+
+    Recording a value is a dictionary update under a lock, so instrumentation is
+    cheap enough to leave on. Read values with `snapshot()`, or as Prometheus
+    text with `to_prometheus_text()`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[Labels, MetricValue]] = {}
+
+    def increment(self, name: str, value: float = 1.0, **labels: object) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            current = series.get(key, 0.0)
+            assert not isinstance(current, Histogram)
+            series[key] = current + value
+
+    def set_gauge(self, name: str, value: float, **labels: object) -> None:
+        with self._lock:
+            self._values.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        bounds: tuple[float, ...] = SECONDS_BUCKETS,
+        **labels: object,
+    ) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(bounds, [0] * (len(bounds) + 1))
+            assert isinstance(histogram, Histogram)
+            histogram.observe(value)
+
+    def remove_series(self, should_remove: Callable[[Dict[str, str]], bool]) -> None:
+        """Drop every series whose labels match, like the ones of a client that
+        disconnected."""
+        with self._lock:
+            for name, series in tuple(self._values.items()):
+                for labels in tuple(series.keys()):
+                    if should_remove(dict(labels)):
+                        del series[labels]
+                if len(series) == 0:
+                    del self._values[name]
+
+    def snapshot(self) -> Dict[str, Dict[Labels, MetricValue]]:
+        """Copy of all recorded values, keyed by metric name and then labels."""
+        with self._lock:
+            return {
+                name: {
+                    labels: dataclasses.replace(
+                        value, bucket_counts=list(value.bucket_counts)
+                    )
+                    if isinstance(value, Histogram)
+                    else value
+                    for labels, value in series.items()
+                }
+                for name, series in self._values.items()
+            }
+
+    def to_prometheus_text(self) -> str:
+        """Format values in the Prometheus text exposition format."""
+        lines = []
+        for name, series in sorted(self.snapshot().items()):
+            if name in _DESCRIPTIONS:
+                lines.append(f"# HELP {name} {_DESCRIPTIONS[name]}")
+            first_value = next(iter(series.values()))
+            if isinstance(first_value, Histogram):
+                metric_type = "histogram"
+            elif name.endswith("_total"):
+                metric_type = "counter"
+            else:
+                metric_type = "gauge"
+            lines.append(f"# TYPE {name} {metric_type}")
+
+            for labels, value in sorted(series.items()):
+                if not isinstance(value, Histogram):
+                    lines.append(
+                        f"{name}{_format_labels(labels)} {_format_number(value)}"
+                    )
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(
+                    value.bounds + (float("inf"),), value.bucket_counts
+                ):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    bucket_labels = _format_labels(labels + (("le", le),))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(
+                    f"{name}_sum{_format_labels(labels)} {_format_number(value.sum)}"
+                )
+                lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if len(labels) == 0:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
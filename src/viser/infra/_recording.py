@@ -0,0 +1,165 @@
+"""Chunked, seekable recording format for playback of sent messages.
+
+Layout of a recording file::
+
+    b"VISERREC" | version: u8
+    records:    kind: u8 | length: u32 | payload
+    footer:     index offset: u64 | b"VISERIDX"
+
+Integers are little-endian. Each chunk record (kind 0) is an independently
+gzipped msgpack array of `[time, message]` pairs, so a reader can decode chunks
+as they are downloaded. The index record (kind 1) is written last, and is an
+uncompressed msgpack map with the loop start, the duration, and the offset, time
+range, and message range of every chunk. The footer points at the index, so the
+recording can also be read by seeking from the end.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import queue
+import struct
+import threading
+from pathlib import Path
+from typing import IO, Any
+
+import msgspec
+
+MAGIC = b"VISERREC"
+INDEX_MAGIC = b"VISERIDX"
+VERSION = 1
+
+CHUNK_RECORD = 0
+INDEX_RECORD = 1
+
+_RECORD_HEADER = struct.Struct("<BI")
+_FOOTER = struct.Struct("<Q8s")
+# Header of a msgpack array32. Chunks are built by appending encoded messages
+# after it, then filling in the count.
+_ARRAY_HEADER = struct.Struct(">BI")
+
+
+class RecordingWriter:
+    """Encodes, compresses, and writes recorded messages on a background thread.
+
+    Messages are batched into chunks of roughly `chunk_bytes` encoded bytes.
+    At most `max_queued_messages` messages wait for the writer thread, so memory
+    use stays bounded even if compression falls behind.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None,
+        chunk_bytes: int = 1024**2,
+        max_queued_messages: int = 256,
+    ) -> None:
+        self._file: IO[bytes] = io.BytesIO() if path is None else open(path, "wb")
+        self._chunk_bytes = chunk_bytes
+        self._queue: queue.Queue[tuple[float, dict[str, Any]] | None] = queue.Queue(
+            maxsize=max_queued_messages
+        )
+        self._chunks: list[dict[str, Any]] = []
+        self._message_count = 0
+        self._error: BaseException | None = None
+
+        self._file.write(MAGIC + bytes([VERSION]))
+        self._thread = threading.Thread(
+            target=self._write_chunks, name="viser_recording", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, time: float, message: dict[str, Any]) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put((time, message))
+
+    def close(self, loop_start_index: int | None, duration_seconds: float) -> None:
+        """Flush remaining messages and write the index."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            self._file.close()
+            raise self._error
+        index_offset = self._file.tell()
+        self._write_record(
+            INDEX_RECORD,
+            msgspec.msgpack.encode(
+                {
+                    "loopStartIndex": loop_start_index,
+                    "durationSeconds": duration_seconds,
+                    "messageCount": self._message_count,
+                    "chunks": self._chunks,
+                }
+            ),
+        )
+        self._file.write(_FOOTER.pack(index_offset, INDEX_MAGIC))
+        if not isinstance(self._file, io.BytesIO):
+            self._file.close()
+
+    def getvalue(self) -> bytes:
+        """Contents of an in-memory recording."""
+        assert isinstance(self._file, io.BytesIO)
+        return self._file.getvalue()
+
+    def _write_chunks(self) -> None:
+        encoder = msgspec.msgpack.Encoder()
+        buffer = bytearray(_ARRAY_HEADER.size)
+        start_time = end_time = 0.0
+        start_index = self._message_count
+        try:
+            while (item := self._queue.get()) is not None:
+                if len(buffer) == _ARRAY_HEADER.size:
+                    start_time = item[0]
+                    start_index = self._message_count
+                encoder.encode_into(item, buffer, len(buffer))
+                end_time = item[0]
+                self._message_count += 1
+                if len(buffer) >= self._chunk_bytes:
+                    self._write_chunk(buffer, start_time, end_time, start_index)
+                    del buffer[_ARRAY_HEADER.size :]
+            if len(buffer) > _ARRAY_HEADER.size:
+                self._write_chunk(buffer, start_time, end_time, start_index)
+        except BaseException as e:
+            self._error = e
+            # Keep draining, so senders aren't blocked on a full queue.
+            while self._queue.get() is not None:
+                pass
+
+    def _write_chunk(
+        self, buffer: bytearray, start_time: float, end_time: float, start_index: int
+    ) -> None:
+        message_count = self._message_count - start_index
+        _ARRAY_HEADER.pack_into(buffer, 0, 0xDD, message_count)
+        self._chunks.append(
+            {
+                "offset": self._file.tell(),
+                "startTime": start_time,
+                "endTime": end_time,
+                "startIndex": start_index,
+                "messageCount": message_count,
+            }
+        )
+        self._write_record(CHUNK_RECORD, gzip.compress(buffer, compresslevel=6))
+
+    def _write_record(self, kind: int, payload: bytes) -> None:
+        self._file.write(_RECORD_HEADER.pack(kind, len(payload)))
+        self._file.write(payload)
+
+
+def read_recording_index(data: bytes) -> dict[str, Any]:
+    """Read the index of a recording, via the footer."""
+    index_offset, index_magic = _FOOTER.unpack_from(data, len(data) - _FOOTER.size)
+    assert index_magic == INDEX_MAGIC, "Not a complete recording."
+    kind, length = _RECORD_HEADER.unpack_from(data, index_offset)
+    assert kind == INDEX_RECORD
+    start = index_offset + _RECORD_HEADER.size
+    return msgspec.msgpack.decode(data[start : start + length])
+
+
+def read_recording_chunk(data: bytes, offset: int) -> list[Any]:
+    """Decode the `[time, message]` pairs of the chunk at `offset`."""
+    kind, length = _RECORD_HEADER.unpack_from(data, offset)
+    assert kind == CHUNK_RECORD
+    start = offset + _RECORD_HEADER.size
+    return msgspec.msgpack.decode(gzip.decompress(data[start : start + length]))
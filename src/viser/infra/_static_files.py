@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import dataclasses
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+# Vite emits content-hashed filenames for bundled assets, like
+# `assets/index-B1x2c3d4.js`. These never change, so they can be cached forever.
+_HASHED_ASSET_PATTERN = re.compile(r"(^|/)assets/.+-[A-Za-z0-9_-]{8,}\.[a-z0-9]+$")
+
+# Only keep compressed variants that are meaningfully smaller.
+_MIN_COMPRESSION_RATIO = 0.9
+
+
+@dataclasses.dataclass(frozen=True)
+class StaticFile:
+    """A file served by the HTTP server, with precompressed variants."""
+
+    mime_type: str
+    etag: str
+    content: bytes
+    encoded_content: dict[str, bytes]
+    """Maps content coding (`gzip`, `br`) to the compressed payload."""
+    immutable: bool
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.content) + sum(map(len, self.encoded_content.values()))
+
+    def select_encoding(self, accept_encoding: str) -> str | None:
+        """Choose the smallest variant that the client accepts."""
+        accepted = {
+            coding.split(";")[0].strip().lower()
+            for coding in accept_encoding.split(",")
+        }
+        for coding in ("br", "gzip"):
+            if coding in accepted and coding in self.encoded_content:
+                return coding
+        return None
+
+    def etag_for(self, encoding: str | None) -> str:
+        # Different representations of the same file need different strong ETags.
+        return self.etag if encoding is None else f'"{self.etag[1:-1]}-{encoding}"'
+
+    def cache_control(self) -> str:
+        if self.immutable:
+            return "public, max-age=31536000, immutable"
+        # Always revalidate, which is cheap thanks to ETags.
+        return "no-cache"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an `If-None-Match` header against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == etag
+        for candidate in candidates
+    )
+
+
+class StaticFileCache:
+    """Size-bounded LRU cache of static files, compressed ahead of time.
+
+    `precompress()` loads and compresses every file under the root in the
+    background. Requests never compress: a file that isn't cached yet, either
+    because precompression hasn't reached it or because it was evicted, is
+    served without compressed variants while it's compressed in the background.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 64 * 1024**2) -> None:
+        self._root = root.resolve()
+        self._max_bytes = max_bytes
+        self._nbytes = 0
+        self._files: OrderedDict[Path, StaticFile] = OrderedDict()
+        self._loading: dict[Path, Future[StaticFile | None]] = {}
+        """Files being compressed, so each one is only compressed once."""
+        self._lock = threading.Lock()
+
+    def precompress(self) -> None:
+        """Compress every file under the root. Safe to run in a background thread."""
+        for source_path in sorted(self._root.rglob("*")):
+            if not source_path.is_file():
+                continue
+            with self._lock:
+                if self._nbytes >= self._max_bytes:
+                    return
+            self.load(source_path)
+
+    def get(self, source_path: Path) -> StaticFile | None:
+        """Get a file without blocking on compression. Returns None for missing
+        files and paths outside of the root."""
+        source_path = source_path.resolve()
+        with self._lock:
+            static_file = self._files.get(source_path)
+            if static_file is not None:
+                self._files.move_to_end(source_path)
+                return static_file
+            loading = source_path in self._loading
+
+        if not self._is_servable(source_path):
+            return None
+        if not loading:
+            threading.Thread(
+                target=self._load_in_background,
+                args=(source_path,),
+                name="viser_static_files",
+                daemon=True,
+            ).start()
+        return _read_static_file(source_path, self._root, compress=False)
+
+    def load(self, source_path: Path) -> StaticFile | None:
+        """Get a file, compressing it first if needed. Blocks, so this shouldn't
+        be called from the event loop. Returns None for missing files and paths
+        outside of the root."""
+        source_path = source_path.resolve()
+        with self._lock:
+            static_file = self._files.get(source_path)
+            if static_file is not None:
+                self._files.move_to_end(source_path)
+                return static_file
+            future = self._loading.get(source_path)
+            is_loader = future is None
+            if future is None:
+                future = Future()
+                self._loading[source_path] = future
+
+        if not is_loader:
+            return future.result()
+        try:
+            static_file = (
+                _read_static_file(source_path, self._root, compress=True)
+                if self._is_servable(source_path)
+                else None
+            )
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(source_path)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._loading.pop(source_path)
+            if static_file is not None and source_path not in self._files:
+                self._files[source_path] = static_file
+                self._nbytes += static_file.nbytes
+            while self._nbytes > self._max_bytes and len(self._files) > 1:
+                _, evicted = self._files.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+        future.set_result(static_file)
+        return static_file
+
+    def _load_in_background(self, source_path: Path) -> None:
+        try:
+            self.load(source_path)
+        except OSError:
+            # The file was removed or became unreadable; the next request will
+            # see that.
+            pass
+
+    def _is_servable(self, source_path: Path) -> bool:
+        try:
+            source_path.relative_to(self._root)
+        except ValueError:
+            return False
+        return source_path.is_file()
+
+
+def _read_static_file(source_path: Path, root: Path, compress: bool) -> StaticFile:
+    content = source_path.read_bytes()
+    encoded_content: dict[str, bytes] = {}
+    for coding, compress_fn in (_compressors() if compress else {}).items():
+        compressed = compress_fn(content)
+        if len(compressed) < _MIN_COMPRESSION_RATIO * len(content):
+            encoded_content[coding] = compressed
+    relpath = source_path.relative_to(root).as_posix()
+    return StaticFile(
+        mime_type=guess_mime_type(relpath),
+        etag=f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+        content=content,
+        encoded_content=encoded_content,
+        immutable=_HASHED_ASSET_PATTERN.search(relpath) is not None,
+    )
+
+
+def _compressors() -> dict:
+    compressors = {"gzip": lambda data: gzip.compress(data, compresslevel=9)}
+    try:
+        import brotli  # type: ignore
+    except ImportError:
+        pass
+    else:
+        compressors["br"] = lambda data: brotli.compress(data, quality=11)
+    return compressors
+
+
+def guess_mime_type(relpath: str) -> str:
+    # First, try some known MIME types. Using guess_type() can cause
+    # problems for Javascript on some Windows machines.
+    #
+    # Some references:
+    #     https://github.com/nerfstudio-project/viser/issues/256#issuecomment-2369684252
+    #     https://bugs.python.org/issue43975
+    #     https://github.com/golang/go/issues/32350#issuecomment-525111557
+    #
+    # We're assuming UTF-8, this is mostly reasonable but might want to revisit.
+    mime_type = {
+        ".css": "text/css; charset=utf-8",
+        ".gif": "image/gif",
+        ".htm": "text/html; charset=utf-8",
+        ".html": "text/html; charset=utf-8",
+        ".jpg": "image/jpeg",
+        ".js": "application/javascript",
+        ".wasm": "application/wasm",
+        ".pdf": "application/pdf",
+        ".png": "image/png",
+        ".svg": "image/svg+xml",
+        ".xml": "text/xml; charset=utf-8",
+    }.get(Path(relpath).suffix.lower(), None)
+    if mime_type is None:
+        mime_type = mimetypes.guess_type(relpath)[0]
+    if mime_type is None:
+        mime_type = "application/octet-stream"
+    return mime_type
@@ -1,19 +1,90 @@
 from __future__ import annotations
 
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from types import ModuleType
+from typing import Iterator, Literal
 from weakref import WeakSet
 
+import numpy as np
+
+import tracing
 from animation import (
     Animation,
     AnimationEvolution,
     import_animation_functions,
     write_animation_functions,
 )
+from asset_store import SharedSplat, asset_preloader, asset_store
 from scene import Scene
-from splat_utils import SplatFile, compute_splat_at_t, load_splat
+from splat_lod import build_lod
+from splat_sequence import (
+    SequenceDecoder,
+    SequenceEncoder,
+    sequence_cache,
+    sequence_key,
+)
+from splat_utils import (
+    OPACITY_EPSILON,
+    CullStats,
+    SplatFile,
+    compute_splat_at_t,
+    cull_transparent,
+    opaque_indices,
+)
 from src.viser._scene_handles import GaussianSplatHandle
 from viser import GuiApi
+from viser._splat_quantization import decompose_covariances
+
+Quality = Literal["preview", "final"]
+
+REFINE_DELAY_SECONDS = 2.0
+"""Idle time before preview frames are refined to full resolution."""
+
+
+@dataclass(frozen=True)
+class ExampleScene:
+    object_path: Path
+    background_path: Path
+    background_position: tuple[float, float, float]
+
+
+EXAMPLE_SCENES: dict[str, ExampleScene] = {
+    "vase": ExampleScene(
+        Path("data/objects/vase.splat"),
+        Path("data/backgrounds/vase_bg.splat"),
+        (-0.39, 0.04, -1.33),
+    ),
+    "bulldozer": ExampleScene(
+        Path("data/objects/bulldozer.splat"),
+        Path("data/backgrounds/bulldozer_bg.splat"),
+        (-0.05, 0.3, -0.48),
+    ),
+    "bear": ExampleScene(
+        Path("data/objects/bear.splat"),
+        Path("data/backgrounds/bear_bg.splat"),
+        (-2.23, 0.36, -0.16),
+    ),
+    "horse": ExampleScene(
+        Path("data/objects/horse.splat"),
+        Path("data/backgrounds/horse_bg.splat"),
+        (-0.82, -2.375, 0.785),
+    ),
+}
+DEFAULT_SCENE = "vase"
+
+
+def preload_example_scenes() -> None:
+    """Start loading the example scenes in the background, the default one
+    first, so switching between them doesn't wait on disk."""
+    names = [DEFAULT_SCENE] + [name for name in EXAMPLE_SCENES if name != DEFAULT_SCENE]
+    for name in names:
+        example = EXAMPLE_SCENES[name]
+        asset_preloader.preload(example.background_path, pack=True)
+        asset_preloader.preload(example.object_path)
 
 
 class Observer(ABC):
@@ -49,11 +120,43 @@ class State(Subject):
         self._active_animation: Animation = Animation()
         self.animation_evolution = AnimationEvolution()
         self.frame_to_handle: dict[int, GaussianSplatHandle] = {}
+        self.frame_cull_stats: dict[int, CullStats] = {}
+        """How many Gaussians of each frame were culled before uploading."""
+        self.opacity_epsilon: float = OPACITY_EPSILON
+        """Gaussians with opacities below this aren't uploaded. Zero disables
+        culling."""
+        self.frame_encoding: Literal["float", "quantized"] = "quantized"
+        """Layout animation frames are sent in. Quantized frames take half the
+        bytes, see `viser._splat_quantization`."""
         self.background_handle: GaussianSplatHandle | None = None
+        self.object_asset: SharedSplat | None = None
+        self._background_asset: SharedSplat | None = None
         self.playing: bool = False
 
+        # Frames can be computed from a coarse level of detail while iterating,
+        # and are refined in the background once interaction stops.
+        self._quality: Quality = "final"
+        self._preview_data: SplatFile | None = None
+        self._frames_lock = threading.RLock()
+        self._frames_version: int = 0
+        self._frames_are_preview: bool = False
+        self._refine_timer: threading.Timer | None = None
+        self._interactions: int = 0
+        self._full_resolution_holds: int = 0
+        self._scene_lock = threading.Lock()
+        self.scene_ready = threading.Event()
+        """Set once an object is loaded. Until then, there's nothing to animate or
+        render, and observers are notified with "scene" when it's set."""
+        self.scene_load_error: BaseException | None = None
+        """Why the default scene failed to load, if it did."""
+
         write_animation_functions(self.active_animation)
-        self.load_vase()
+
+        # The default scene loads in the background, so the server can take
+        # connections meanwhile. Clients see the loading status until then.
+        threading.Thread(
+            target=self._load_default_scene, name="default_scene", daemon=True
+        ).start()
 
     @property
     def object_data(self) -> SplatFile:
@@ -62,8 +165,31 @@ class State(Subject):
     @object_data.setter
     def object_data(self, value: SplatFile) -> None:
         self._object_data = value
+        self._preview_data = None
+        self.scene_ready.set()
         self._reload_splats()
 
+    @property
+    def background_asset(self) -> SharedSplat | None:
+        return self._background_asset
+
+    @property
+    def preview_data(self) -> SplatFile:
+        """Importance-sampled subset of `object_data`, for previews."""
+        if self._preview_data is None:
+            self._preview_data = build_lod(self.object_data).level(self.object_data, 0)
+        return self._preview_data
+
+    @property
+    def quality(self) -> Quality:
+        return self._quality
+
+    @quality.setter
+    def quality(self, value: Quality) -> None:
+        self._quality = value
+        self._reload_splats()
+        self.notify("quality")
+
     @property
     def active_animation(self) -> Animation:
         return self._active_animation
@@ -80,10 +206,14 @@ class State(Subject):
 
     @visible_frame.setter
     def visible_frame(self, value: int) -> None:
-        wrapped_value = value % self.total_frames
-        self.frame_to_handle[self.visible_frame].visible = False
-        self.frame_to_handle[wrapped_value].visible = True
-        self._visible_frame = wrapped_value
+        with self._frames_lock:
+            if not self.frame_to_handle:
+                # No scene has been loaded yet.
+                return
+            wrapped_value = value % self.total_frames
+            self.frame_to_handle[self.visible_frame].visible = False
+            self.frame_to_handle[wrapped_value].visible = True
+            self._visible_frame = wrapped_value
 
     @property
     def fps(self) -> int:
@@ -131,80 +261,250 @@ class State(Subject):
         else:
             self.visible_frame = self.visible_frame + 1
 
-    def load_vase(self) -> None:
+    def load_example(self, name: str) -> None:
+        example = EXAMPLE_SCENES[name]
         self._load_scene(
-            Path("data/objects/vase.splat"),
-            Path("data/backgrounds/vase_bg.splat"),
-            (-0.39, 0.04, -1.33),
+            example.object_path,
+            example.background_path,
+            example.background_position,
         )
 
+    def _load_default_scene(self) -> None:
+        try:
+            self.load_example(DEFAULT_SCENE)
+        except BaseException as e:
+            self.scene_load_error = e
+            self.gui_api.add_markdown(f"*Failed to load the default scene: {e!r}*")
+            raise
+        finally:
+            self.notify("scene")
+
+    def load_vase(self) -> None:
+        self.load_example("vase")
+
     def load_bulldozer(self) -> None:
-        self._load_scene(
-            Path("data/objects/bulldozer.splat"),
-            Path("data/backgrounds/bulldozer_bg.splat"),
-            (-0.05, 0.3, -0.48),
-        )
+        self.load_example("bulldozer")
 
     def load_bear(self) -> None:
-        self._load_scene(
-            Path("data/objects/bear.splat"),
-            Path("data/backgrounds/bear_bg.splat"),
-            (-2.23, 0.36, -0.16),
-        )
+        self.load_example("bear")
 
     def load_horse(self) -> None:
-        self._load_scene(
-            Path("data/objects/horse.splat"),
-            Path("data/backgrounds/horse_bg.splat"),
-            (-0.82, -2.375, 0.785),
-        )
+        self.load_example("horse")
+
+    @contextmanager
+    def interaction(self) -> Iterator[None]:
+        """Hold off refining preview frames while the block runs, like during a
+        generation job."""
+        with self._frames_lock:
+            self._interactions += 1
+        try:
+            yield
+        finally:
+            with self._frames_lock:
+                self._interactions -= 1
+            self._schedule_refine()
+
+    @contextmanager
+    def full_resolution(self) -> Iterator[None]:
+        """Show full-resolution frames in the block, whatever the quality. For
+        final renders."""
+        with self._frames_lock:
+            self._full_resolution_holds += 1
+            if self._frames_are_preview:
+                self._reload_splats()
+        try:
+            yield
+        finally:
+            with self._frames_lock:
+                self._full_resolution_holds -= 1
 
     def _reload_splats(self) -> None:
-        self.remove_gs_handles()
-        write_animation_functions(self.active_animation)
-        self._add_animation_splats()
-        self.visible_frame = 0
-
-    def _add_animation_splats(self) -> None:
-        splat = self.object_data
-        assert splat is not None
-
-        loading_md = self.gui_api.add_markdown("*Loading Frames...*")
+        with self._frames_lock:
+            if not self.scene_ready.is_set():
+                # The default scene is still loading, and reloads the splats
+                # once it's done.
+                return
+            preview = self._quality == "preview" and self._full_resolution_holds == 0
+            self.remove_gs_handles()
+            write_animation_functions(self.active_animation)
+            self.frame_to_handle, self.frame_cull_stats = self._add_animation_splats(
+                self.preview_data if preview else self.object_data,
+                import_animation_functions(),
+                visible_frame=0,
+            )
+            self._visible_frame = 0
+            self._frames_are_preview = preview
+            self._frames_version += 1
+        self._schedule_refine()
+
+    def _schedule_refine(self) -> None:
+        """Refine preview frames to full resolution, once nothing has changed
+        them for `REFINE_DELAY_SECONDS`."""
+        with self._frames_lock:
+            if self._refine_timer is not None:
+                self._refine_timer.cancel()
+                self._refine_timer = None
+            if not self._frames_are_preview or self._interactions > 0:
+                return
+            self._refine_timer = threading.Timer(
+                REFINE_DELAY_SECONDS, self._refine, args=(self._frames_version,)
+            )
+            self._refine_timer.daemon = True
+            self._refine_timer.start()
+
+    def _refine(self, frames_version: int) -> None:
+        with self._frames_lock:
+            if frames_version != self._frames_version or self._interactions > 0:
+                return
+            animation_functions = import_animation_functions()
+
+        # Frames are built hidden and without holding the lock, so playback and
+        # edits continue on the preview meanwhile.
+        with tracing.span("refine_frames", "frames"):
+            frame_to_handle, frame_cull_stats = self._add_animation_splats(
+                self.object_data,
+                animation_functions,
+                visible_frame=None,
+                status="*Refining Frames...*",
+            )
+        with self._frames_lock:
+            if frames_version != self._frames_version:
+                # The frames changed while refining.
+                for gs_handle in frame_to_handle.values():
+                    gs_handle.remove()
+                return
+            frame_to_handle[self.visible_frame].visible = True
+            self.remove_gs_handles()
+            self.frame_to_handle = frame_to_handle
+            self.frame_cull_stats = frame_cull_stats
+            self._frames_are_preview = False
+            self._frames_version += 1
+
+    def _add_animation_splats(
+        self,
+        splat: SplatFile,
+        animation_functions: ModuleType,
+        visible_frame: int | None,
+        status: str = "*Loading Frames...*",
+    ) -> tuple[dict[int, GaussianSplatHandle], dict[int, CullStats]]:
+        """Compute and add the frames of the active animation. Only
+        `visible_frame` is shown. Gaussians too transparent to be seen are culled
+        from each frame before it's uploaded. Frames computed before are decoded
+        from the on-disk sequence cache instead."""
+        loading_md = self.gui_api.add_markdown(status)
         progress_bar = self.gui_api.add_progress_bar(0.0, animated=True)
 
-        animation_functions = import_animation_functions()
+        key = sequence_key(splat, self.active_animation, self.fps, self.total_frames)
+        cached_sequence = sequence_cache.get(key)
+        decoder = (
+            SequenceDecoder(cached_sequence, splat["covariances"])
+            if cached_sequence is not None
+            else None
+        )
+        encoder = SequenceEncoder() if decoder is None else None
+        # Frames share their covariances, so decomposing them for quantization
+        # is done once instead of for every frame.
+        decomposed = (
+            decompose_covariances(splat["covariances"])
+            if self.frame_encoding == "quantized"
+            else None
+        )
+
+        frame_to_handle: dict[int, GaussianSplatHandle] = {}
+        frame_cull_stats: dict[int, CullStats] = {}
         seconds_per_frame = 1.0 / self.fps
         try:
             for frame in range(self.total_frames):
                 t = frame * seconds_per_frame
-                splat_at_t = compute_splat_at_t(t, splat, animation_functions)
-                gs_handle = self.scene.add_splat(f"splat_at_{t}", splat_at_t)
-                gs_handle.visible = frame == self.visible_frame
-                self.frame_to_handle[frame] = gs_handle
+                with tracing.span(
+                    "compute_frame", "frames", frame=frame, cached=decoder is not None
+                ):
+                    if decoder is not None:
+                        splat_at_t = decoder.frame(frame)
+                    else:
+                        assert encoder is not None
+                        splat_at_t = compute_splat_at_t(t, splat, animation_functions)
+                        encoder.add(splat_at_t)
+                    keep = opaque_indices(splat_at_t, self.opacity_epsilon)
+                    splat_at_t, cull_stats = cull_transparent(
+                        splat_at_t, self.opacity_epsilon, keep
+                    )
+                    frame_decomposed = (
+                        decomposed
+                        if decomposed is None or cull_stats.culled == 0
+                        else (
+                            np.take(decomposed[0], keep, axis=0),
+                            np.take(decomposed[1], keep, axis=0),
+                        )
+                    )
+                frame_cull_stats[frame] = cull_stats
+                with tracing.span(
+                    "add_splat",
+                    "upload",
+                    frame=frame,
+                    gaussians=cull_stats.kept,
+                    culled=cull_stats.culled,
+                ):
+                    # Only one frame is visible at a time, so clients only
+                    # need to sort and draw that one.
+                    gs_handle = self.scene.add_splat(
+                        f"splat_at_{t}",
+                        splat_at_t,
+                        exclusive_group="animation",
+                        encoding=self.frame_encoding,
+                        decomposed_covariances=frame_decomposed,
+                    )
+                gs_handle.visible = frame == visible_frame
+                frame_to_handle[frame] = gs_handle
                 progress_bar.value = ((frame + 1) / self.fps) * 100
         except Exception:
             progress_bar.remove()
             loading_md.remove()
+            for gs_handle in frame_to_handle.values():
+                gs_handle.remove()
+            if encoder is not None:
+                encoder.close()
             raise
 
+        if encoder is not None:
+            with tracing.span("cache_frames", "frames"):
+                sequence_cache.put(key, encoder.finish())
+
         progress_bar.remove()
         loading_md.remove()
+        total = sum(stats.total for stats in frame_cull_stats.values())
+        culled = sum(stats.culled for stats in frame_cull_stats.values())
+        if culled > 0:
+            print(
+                f"Culled {culled} of {total} Gaussians ({culled / total:.1%})"
+                f" across {len(frame_cull_stats)} frames"
+            )
+        return frame_to_handle, frame_cull_stats
 
     def _load_scene(
         self, obj_path: Path, bg_path: Path, bg_position: tuple[float, float, float]
     ) -> None:
-        if self.background_handle:
-            self.background_handle.remove()
-
-        status = self.gui_api.add_markdown("*Loading Background...*")
-        progress = self.gui_api.add_progress_bar(33, animated=True)
-        bg_data = load_splat(bg_path)
-        progress.value = 66
-        self.background_handle = self.scene.add_splat(
-            "splat_background", bg_data, bg_position
-        )
-        self.background_handle.visible = self.background_visible
-        progress.remove()
-        status.remove()
-
-        self.object_data = load_splat(obj_path)
+        # Scenes can be picked while the default one is still loading.
+        with self._scene_lock:
+            if self.background_handle:
+                self.background_handle.remove()
+
+            status = self.gui_api.add_markdown("*Loading Background...*")
+            progress = self.gui_api.add_progress_bar(33, animated=True)
+            # Assets are shared with other sessions that show the same scene,
+            # and are usually preloaded already.
+            old_assets = (self._background_asset, self.object_asset)
+            self._background_asset = asset_store.acquire(bg_path)
+            progress.value = 66
+            self.background_handle = self.scene.add_shared_splat(
+                "splat_background", self._background_asset, bg_position
+            )
+            self.background_handle.visible = self.background_visible
+            progress.remove()
+            status.remove()
+
+            self.object_asset = asset_store.acquire(obj_path)
+            self.object_data = self.object_asset.splat
+            for asset in old_assets:
+                if asset is not None:
+                    asset_store.release(asset)
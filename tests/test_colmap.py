@@ -0,0 +1,89 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from viser.extras import colmap
+
+
+def _write_points3d_binary(path: Path, tracks: list) -> None:
+    """Write points like COLMAP's `WritePoints3DBinary()`."""
+    with open(path, "wb") as fid:
+        fid.write(struct.pack("<Q", len(tracks)))
+        for i, track in enumerate(tracks):
+            fid.write(
+                struct.pack(
+                    "<QdddBBBd", 100 + i, i, 2.0 * i, -i, i % 256, 1, 255, 0.5 * i
+                )
+            )
+            fid.write(struct.pack("<Q", len(track)))
+            for image_id, point2D_idx in track:
+                fid.write(struct.pack("<ii", image_id, point2D_idx))
+
+
+def _write_images_binary(path: Path, num_points2D: list) -> None:
+    """Write images like COLMAP's `WriteImagesBinary()`."""
+    with open(path, "wb") as fid:
+        fid.write(struct.pack("<Q", len(num_points2D)))
+        for i, num_points in enumerate(num_points2D):
+            fid.write(struct.pack("<idddddddi", 10 + i, 1, 0, 0, 0, i, 0, 0, 3))
+            fid.write(f"image_{i}.png".encode() + b"\x00")
+            fid.write(struct.pack("<Q", num_points))
+            for j in range(num_points):
+                fid.write(struct.pack("<ddq", j, -j, j - 1))
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_read_points3d_binary_arrays(tmp_path: Path, use_mmap: bool) -> None:
+    tracks = [[(1, 2), (3, 4)], [], [(5, 6)], [(7, 8), (9, 10), (11, 12)]]
+    path = tmp_path / "points3D.bin"
+    _write_points3d_binary(path, tracks)
+
+    points = colmap.read_points3d_binary_arrays(path, use_mmap=use_mmap)
+    np.testing.assert_equal(points.ids, [100, 101, 102, 103])
+    np.testing.assert_allclose(points.xyz[3], [3.0, 6.0, -3.0])
+    np.testing.assert_equal(points.rgb[2], [2, 1, 255])
+    np.testing.assert_allclose(points.error, [0.0, 0.5, 1.0, 1.5])
+    np.testing.assert_equal(points.track_offsets, [0, 2, 2, 3, 6])
+    np.testing.assert_equal(points.image_ids, [1, 3, 5, 7, 9, 11])
+    np.testing.assert_equal(points.point2D_idxs, [2, 4, 6, 8, 10, 12])
+
+    # The dict API returns the same points.
+    points_dict = colmap.read_points3d_binary(path)
+    assert list(points_dict.keys()) == [100, 101, 102, 103]
+    np.testing.assert_equal(points_dict[103].image_ids, [7, 9, 11])
+    np.testing.assert_equal(points_dict[103].point2D_idxs, [8, 10, 12])
+    assert points_dict[101].image_ids.shape == (0,)
+    np.testing.assert_equal(points_dict[102].rgb, [2, 1, 255])
+    assert points_dict[102].rgb.dtype == np.int64
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_read_images_binary_arrays(tmp_path: Path, use_mmap: bool) -> None:
+    path = tmp_path / "images.bin"
+    _write_images_binary(path, [3, 0, 2])
+
+    images = colmap.read_images_binary_arrays(path, use_mmap=use_mmap)
+    np.testing.assert_equal(images.ids, [10, 11, 12])
+    assert images.names == ["image_0.png", "image_1.png", "image_2.png"]
+    np.testing.assert_allclose(images.tvecs[2], [2.0, 0.0, 0.0])
+    np.testing.assert_equal(images.camera_ids, [3, 3, 3])
+    np.testing.assert_equal(images.points2D_offsets, [0, 3, 3, 5])
+    np.testing.assert_allclose(images.xys[4], [1.0, -1.0])
+    np.testing.assert_equal(images.point3D_ids, [-1, 0, 1, -1, 0])
+
+    images_dict = colmap.read_images_binary(path)
+    assert images_dict[12].name == "image_2.png"
+    np.testing.assert_allclose(images_dict[12].qvec, [1.0, 0.0, 0.0, 0.0])
+    np.testing.assert_equal(images_dict[10].point3D_ids, [-1, 0, 1])
+    assert images_dict[11].xys.shape == (0, 2)
+
+
+def test_read_empty_points3d_binary(tmp_path: Path) -> None:
+    path = tmp_path / "points3D.bin"
+    _write_points3d_binary(path, [])
+    points = colmap.read_points3d_binary_arrays(path)
+    assert points.xyz.shape == (0, 3)
+    np.testing.assert_equal(points.track_offsets, [0])
+    assert colmap.read_points3d_binary(path) == {}
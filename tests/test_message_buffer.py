@@ -0,0 +1,40 @@
+import asyncio
+import dataclasses
+
+from viser.infra._async_message_buffer import AsyncMessageBuffer
+from viser.infra._messages import Message
+
+
+@dataclasses.dataclass
+class _ValueMessage(Message):
+    key: str
+    value: int
+
+    def redundancy_key(self) -> str:
+        return self.key
+
+
+def test_window_generator_skips_culled_messages() -> None:
+    async def main() -> None:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(), persistent_messages=True
+        )
+        for i in range(10_000):
+            buffer.push(_ValueMessage(key=f"key_{i % 3}", value=i))
+        buffer.remove_from_buffer(lambda message: message.key == "key_1")  # type: ignore
+        assert len(buffer.message_from_id) == 2
+        assert len(buffer.live_ids) <= 2 * len(buffer.message_from_id) + 64
+
+        window = await buffer.window_generator(client_id=0).__anext__()
+        assert [message.value for message in window] == [9_998, 9_999]  # type: ignore
+
+        # Messages pushed later are still sent, in order.
+        generator = buffer.window_generator(client_id=1)
+        await generator.__anext__()
+        buffer.push(_ValueMessage(key="key_3", value=-1))
+        buffer.push(_ValueMessage(key="key_4", value=-2))
+        window = await generator.__anext__()
+        assert [message.value for message in window] == [-1, -2]  # type: ignore
+        buffer.set_done()
+
+    asyncio.run(main())
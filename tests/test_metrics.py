@@ -0,0 +1,70 @@
+import msgspec
+
+import viser
+import viser._client_autobuild
+from viser.infra._infra import _msgpack_array
+from viser.infra._metrics import COUNT_BUCKETS, Histogram, ServerMetrics
+
+
+def test_server_metrics() -> None:
+    metrics = ServerMetrics()
+    metrics.increment("viser_bytes_sent_total", 1_234_567, type="A", client=0)
+    metrics.increment("viser_bytes_sent_total", 3, type="A", client=0)
+    metrics.observe("viser_window_size", 3, COUNT_BUCKETS)
+    metrics.observe("viser_window_size", 1000, COUNT_BUCKETS)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["viser_bytes_sent_total"][(("client", "0"), ("type", "A"))] == (
+        1_234_570
+    )
+    histogram = snapshot["viser_window_size"][()]
+    assert isinstance(histogram, Histogram)
+    assert histogram.count == 2 and histogram.bucket_counts[-1] == 1
+
+    text = metrics.to_prometheus_text()
+    assert 'viser_bytes_sent_total{client="0",type="A"} 1234570' in text
+    assert 'viser_window_size_bucket{le="4"} 1' in text
+    assert 'viser_window_size_bucket{le="+Inf"} 2' in text
+
+
+def test_msgpack_array() -> None:
+    for n in (0, 3, 15, 16, 200, 70000):
+        items = [{"i": i} for i in range(n)]
+        joined = _msgpack_array([msgspec.msgpack.encode(item) for item in items])
+        assert msgspec.msgpack.decode(joined) == items
+
+
+def test_remove_series() -> None:
+    metrics = ServerMetrics()
+    metrics.increment("viser_windows_sent_total", client=0)
+    metrics.increment("viser_windows_sent_total", client=1)
+    metrics.set_gauge("viser_buffer_depth", 3, buffer="client_1")
+    metrics.set_gauge("viser_connected_clients", 1)
+
+    metrics.remove_series(
+        lambda labels: labels.get("client") == "1" or labels.get("buffer") == "client_1"
+    )
+    snapshot = metrics.snapshot()
+    assert list(snapshot["viser_windows_sent_total"].keys()) == [(("client", "0"),)]
+    assert "viser_buffer_depth" not in snapshot
+    assert snapshot["viser_connected_clients"][()] == 1
+    assert "client_1" not in metrics.to_prometheus_text()
+
+
+def test_get_metrics_drops_disconnected_clients() -> None:
+    # Mock the client autobuild to avoid building the client.
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+
+    server = viser.ViserServer()
+    try:
+        websock_server = server._websock_server
+        websock_server._metrics.increment("viser_windows_sent_total", client=7)
+        websock_server._metrics.set_gauge("viser_buffer_depth", 3, buffer="client_7")
+
+        snapshot = websock_server.get_metrics().snapshot()
+        assert "viser_windows_sent_total" not in snapshot
+        assert list(snapshot["viser_buffer_depth"].keys()) == [
+            (("buffer", "broadcast"),)
+        ]
+    finally:
+        server.stop()
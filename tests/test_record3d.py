@@ -0,0 +1,117 @@
+import json
+from pathlib import Path
+from typing import cast
+
+import imageio.v3 as iio
+import liblzfse
+import numpy as np
+import numpy.typing as npt
+import skimage.transform
+
+from viser.extras import Record3dFrame, Record3dLoader
+
+
+def _write_capture(data_dir: Path, num_frames: int) -> None:
+    """Write a synthetic Record3D capture with 192x256 depth."""
+    rng = np.random.default_rng(0)
+    (data_dir / "rgbd").mkdir(parents=True)
+    (data_dir / "metadata").write_text(
+        json.dumps(
+            {
+                "K": [700.0, 0.0, 0.0, 0.0, 700.0, 0.0, 360.0, 480.0, 1.0],
+                "fps": 30,
+                "poses": [
+                    [0.0, 0.0, 0.0, 1.0, 0.1 * i, 0.0, 0.0] for i in range(num_frames)
+                ],
+            }
+        )
+    )
+    for i in range(num_frames):
+        rgb = rng.integers(0, 256, size=(960, 720, 3), dtype=np.uint8)
+        iio.imwrite(data_dir / "rgbd" / f"{i}.jpg", rgb)
+        depth = rng.uniform(0.5, 3.0, size=(256, 192)).astype(np.float32)
+        (data_dir / "rgbd" / f"{i}.depth").write_bytes(
+            liblzfse.compress(depth.tobytes())
+        )
+        conf = rng.integers(0, 3, size=(256, 192), dtype=np.uint8)
+        (data_dir / "rgbd" / f"{i}.conf").write_bytes(liblzfse.compress(conf.tobytes()))
+
+
+def _reference_point_cloud(
+    frame: Record3dFrame, downsample_factor: int
+) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.uint8]]:
+    """Point cloud computed by resizing every frame with skimage."""
+    rgb = frame.rgb[::downsample_factor, ::downsample_factor]
+    depth = np.asarray(
+        skimage.transform.resize(
+            frame.depth, rgb.shape[:2], order=0, anti_aliasing=False
+        )
+    )
+    mask = cast(
+        npt.NDArray[np.bool_],
+        skimage.transform.resize(frame.mask, rgb.shape[:2], order=0),
+    )
+    img_wh = rgb.shape[:2][::-1]
+    grid = (
+        np.stack(np.meshgrid(np.arange(img_wh[0]), np.arange(img_wh[1])), 2) + 0.5
+    ) * downsample_factor
+    grid = grid[mask]
+    homo_grid = np.pad(grid, ((0, 0), (0, 1)), constant_values=1)
+    local_dirs = np.einsum("ij,bj->bi", np.linalg.inv(frame.K), homo_grid)
+    dirs = np.einsum("ij,bj->bi", frame.T_world_camera[:3, :3], local_dirs)
+    points = (frame.T_world_camera[:, -1] + dirs * depth[mask][:, None]).astype(
+        np.float32
+    )
+    return points, rgb[mask]
+
+
+def test_point_cloud_matches_reference(tmp_path: Path) -> None:
+    _write_capture(tmp_path, num_frames=1)
+    frame = Record3dLoader(tmp_path).get_frame(0)
+    for downsample_factor in (1, 3, 5):
+        points, colors = frame.get_point_cloud(downsample_factor)
+        expected_points, expected_colors = _reference_point_cloud(
+            frame, downsample_factor
+        )
+        np.testing.assert_allclose(points, expected_points, rtol=1e-5, atol=1e-5)
+        np.testing.assert_equal(colors, expected_colors)
+
+
+def test_frames_are_prefetched_and_evicted(tmp_path: Path) -> None:
+    _write_capture(tmp_path, num_frames=6)
+    loader = Record3dLoader(tmp_path, cache_size=3, prefetch=2)
+    try:
+        frame = loader.get_frame(0)
+        assert list(loader._frames.keys()) == [0, 1, 2]
+        assert loader.get_frame(0) is frame
+
+        # Requesting a frame prefetches the ones after it, evicting the least
+        # recently requested frames.
+        loader.get_frame(3)
+        assert list(loader._frames.keys()) == [3, 4, 5]
+        loader.get_frame(5)
+        assert list(loader._frames.keys()) == [3, 4, 5]
+        np.testing.assert_allclose(
+            loader.get_frame(4).T_world_camera[:, -1], [0.4, 0, 0]
+        )
+    finally:
+        loader.close()
+
+
+def test_point_cloud_disk_cache(tmp_path: Path) -> None:
+    data_dir = tmp_path / "capture"
+    cache_dir = tmp_path / "cache"
+    _write_capture(data_dir, num_frames=2)
+
+    loader = Record3dLoader(data_dir, point_cloud_cache_dir=cache_dir)
+    points, colors = loader.get_point_cloud(1, downsample_factor=2)
+    loader.close()
+    assert len(list(cache_dir.glob("*/*.npz"))) == 1
+
+    # A new loader reads the point cloud from disk, without decoding the frame.
+    loader = Record3dLoader(data_dir, point_cloud_cache_dir=cache_dir)
+    cached_points, cached_colors = loader.get_point_cloud(1, downsample_factor=2)
+    assert len(loader._frames) == 0
+    loader.close()
+    np.testing.assert_equal(cached_points, points)
+    np.testing.assert_equal(cached_colors, colors)
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import viser
+import viser._client_autobuild
+from viser.infra._recording import read_recording_chunk, read_recording_index
+
+
+def test_scene_recording_is_chunked(tmp_path: Path) -> None:
+    # Mock the client autobuild to avoid building the client.
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+
+    server = viser.ViserServer()
+    recording_path = tmp_path / "recording.viser"
+    recorder = server._start_scene_recording(recording_path)
+    recorder._writer._chunk_bytes = 256
+    for i in range(20):
+        server.scene.add_frame(f"/frame_{i}", position=(i, 0.0, 0.0))
+        recorder.insert_sleep(0.1)
+        if i == 9:
+            recorder.set_loop_start()
+    recorder.end()
+    server.stop()
+
+    data = recording_path.read_bytes()
+    index = read_recording_index(data)
+    assert abs(index["durationSeconds"] - 2.0) < 1e-6
+    assert len(index["chunks"]) > 1
+
+    messages = []
+    for chunk in index["chunks"]:
+        chunk_messages = read_recording_chunk(data, chunk["offset"])
+        assert len(chunk_messages) == chunk["messageCount"]
+        assert chunk_messages[0][0] == chunk["startTime"]
+        messages.extend(chunk_messages)
+    assert len(messages) == index["messageCount"]
+    frame_names = [
+        message["name"] for _, message in messages if message["type"] == "FrameMessage"
+    ]
+    assert frame_names == ["/WorldAxes"] + [f"/frame_{i}" for i in range(20)]
+    assert messages[index["loopStartIndex"]][1]["name"] == "/frame_10"
@@ -0,0 +1,44 @@
+import numpy as np
+
+import viser
+import viser._client_autobuild
+from viser import _messages
+
+
+def _buffered_messages(server: viser.ViserServer) -> list:
+    buffer = server._websock_server.get_message_buffer()
+    return list(buffer.message_from_id.values())
+
+
+def test_set_transforms_sends_one_message():
+    # Mock the client autobuild to avoid building the client.
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+
+    server = viser.ViserServer()
+    try:
+        frames = [server.scene.add_frame(f"/frame_{i}") for i in range(100)]
+        names = [frame.name for frame in frames]
+        wxyzs = np.tile(np.array([0.0, 1.0, 0.0, 0.0]), (100, 1))
+        positions = np.arange(300, dtype=np.float64).reshape((100, 3))
+        num_messages = len(_buffered_messages(server))
+
+        server.scene.set_transforms(names, wxyzs, positions)
+        server.scene.set_transforms(names, wxyzs, positions + 1.0)
+
+        # Handles read back the new transforms.
+        np.testing.assert_allclose(frames[7].wxyz, [0.0, 1.0, 0.0, 0.0])
+        np.testing.assert_allclose(frames[7].position, [22.0, 23.0, 24.0])
+
+        # One message for all nodes, and the second update replaces the first.
+        messages = _buffered_messages(server)
+        assert len(messages) == num_messages + 1
+        message = messages[-1]
+        assert isinstance(message, _messages.SetTransformsMessage)
+        assert message.names == tuple(names)
+        serialized = message.as_serializable_dict()
+        np.testing.assert_allclose(
+            np.frombuffer(serialized["positions"], dtype=np.float32).reshape((100, 3)),
+            positions + 1.0,
+        )
+    finally:
+        server.stop()
@@ -0,0 +1,137 @@
+import numpy as np
+
+import viser.transforms as vtf
+from viser._scene_api import pack_gaussian_splats
+from viser._splat_quantization import (
+    decompose_covariances,
+    dequantize_gaussian_splats,
+    quantize_gaussian_splats,
+)
+
+
+def _make_gaussians(num_gaussians: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-5.0, 5.0, size=(num_gaussians, 3))
+    scales = np.exp(rng.uniform(-6.0, 0.0, size=(num_gaussians, 3)))
+    Rs = vtf.SO3.sample_uniform(rng, batch_axes=(num_gaussians,)).as_matrix()
+    covariances = np.einsum("nij,nj,nkj->nik", Rs, scales**2, Rs)
+    rgbs = rng.uniform(size=(num_gaussians, 3))
+    opacities = rng.uniform(size=(num_gaussians, 1))
+    return centers, covariances, rgbs, opacities, scales, Rs
+
+
+def test_quantized_buffer_is_half_the_size() -> None:
+    centers, covariances, rgbs, opacities, _, _ = _make_gaussians(100)
+    buffer, _ = quantize_gaussian_splats(centers, covariances, rgbs, opacities)
+    packed = pack_gaussian_splats(centers, covariances, rgbs, opacities)
+    assert buffer.dtype == np.uint32
+    assert buffer.nbytes == 16 * 100
+    assert buffer.nbytes * 2 == packed.nbytes
+
+
+def test_round_trip_error_bounds() -> None:
+    centers, covariances, rgbs, opacities, scales, Rs = _make_gaussians(10_000)
+    buffer, bounds = quantize_gaussian_splats(centers, covariances, rgbs, opacities)
+    centers_out, covariances_out, rgbs_out, opacities_out = dequantize_gaussian_splats(
+        buffer, bounds
+    )
+
+    # Centers.
+    center_step = (np.array(bounds[3:6]) - np.array(bounds[0:3])) / 65535
+    assert np.all(np.abs(centers_out - centers) <= center_step / 2 + 1e-9)
+
+    # Scales, from the eigenvalues of the covariances.
+    log_scale_step = (bounds[7] - bounds[6]) / 255
+    scales_out = np.sqrt(np.linalg.eigvalsh(covariances_out))
+    log_error = np.abs(np.log(scales_out) - np.log(np.sort(scales, axis=-1)))
+    assert np.all(log_error <= log_scale_step / 2 + 1e-6)
+
+    # Rotations. Only axes with distinct scales are defined, so compare the
+    # eigenvectors of the largest and smallest scales.
+    _, eigenvectors_out = np.linalg.eigh(covariances_out)
+    order = np.argsort(scales, axis=-1)
+    for column, index in ((0, order[:, 0]), (2, order[:, 2])):
+        axes = np.take_along_axis(Rs, index[:, None, None], axis=-1)[:, :, 0]
+        cosines = np.abs(np.sum(axes * eigenvectors_out[:, :, column], axis=-1))
+        angles = np.degrees(np.arccos(np.clip(cosines, -1.0, 1.0)))
+        # Axes with nearly equal scales can swap, which isn't a rotation error.
+        gaps = np.min(np.abs(np.diff(np.sort(np.log(scales)), axis=-1)), axis=-1)
+        assert np.all(angles[gaps > 0.1] <= 2.5)
+
+    # Colors and opacities match the unquantized layout.
+    expected_rgba = (
+        pack_gaussian_splats(centers, covariances, rgbs, opacities)[:, 7:8]
+        .view(np.uint8)
+        .astype(np.float64)
+    )
+    np.testing.assert_allclose(rgbs_out, expected_rgba[:, :3] / 255.0)
+    np.testing.assert_allclose(opacities_out, expected_rgba[:, 3:] / 255.0)
+
+
+def test_round_trip_isotropic_and_degenerate() -> None:
+    covariances = np.stack(
+        [
+            # Isotropic.
+            np.eye(3) * 0.01,
+            # Two equal scales.
+            np.diag([0.04, 0.01, 0.01]),
+            # Flat.
+            np.diag([0.01, 0.02, 0.0]),
+        ]
+    )
+    centers = np.zeros((3, 3))
+    rgbs = np.full((3, 3), 0.5)
+    opacities = np.ones((3, 1))
+    buffer, bounds = quantize_gaussian_splats(centers, covariances, rgbs, opacities)
+    centers_out, covariances_out, _, _ = dequantize_gaussian_splats(buffer, bounds)
+
+    np.testing.assert_allclose(centers_out, centers)
+    # Scales stay within the bound, except the flat one, which is raised to a
+    # small but nonzero scale.
+    log_scale_step = (bounds[7] - bounds[6]) / 255
+    scales = np.sqrt(np.linalg.eigvalsh(covariances))
+    scales_out = np.sqrt(np.linalg.eigvalsh(covariances_out))
+    log_error = np.abs(np.log(scales_out[scales > 0]) - np.log(scales[scales > 0]))
+    assert np.all(log_error <= log_scale_step / 2 + 1e-6)
+    assert 0.0 < scales_out[2, 0] <= 1e-6 * np.max(scales) * np.exp(log_scale_step)
+    # Rotations of the isotropic Gaussian are exact.
+    np.testing.assert_allclose(
+        covariances_out[0], np.eye(3) * scales_out[0, 0] ** 2, atol=1e-12
+    )
+
+
+def test_empty() -> None:
+    buffer, bounds = quantize_gaussian_splats(
+        np.zeros((0, 3)), np.zeros((0, 3, 3)), np.zeros((0, 3)), np.zeros((0, 1))
+    )
+    assert buffer.shape == (0, 4)
+    centers, covariances, _, _ = dequantize_gaussian_splats(buffer, bounds)
+    assert centers.shape == (0, 3)
+    assert covariances.shape == (0, 3, 3)
+
+
+def test_decomposed_covariances_can_be_reused() -> None:
+    centers, covariances, rgbs, opacities, _, _ = _make_gaussians(1000)
+    decomposed = decompose_covariances(covariances)
+    expected = quantize_gaussian_splats(centers, covariances, rgbs, opacities)
+    buffer, bounds = quantize_gaussian_splats(
+        centers, covariances, rgbs, opacities, decomposed
+    )
+    np.testing.assert_array_equal(buffer, expected[0])
+    assert bounds == expected[1]
+
+    # Selecting rows of the decomposition is the same as decomposing the
+    # selected covariances.
+    keep = np.flatnonzero(opacities[:, 0] > 0.5)
+    buffer, bounds = quantize_gaussian_splats(
+        centers[keep],
+        covariances[keep],
+        rgbs[keep],
+        opacities[keep],
+        (decomposed[0][keep], decomposed[1][keep]),
+    )
+    expected = quantize_gaussian_splats(
+        centers[keep], covariances[keep], rgbs[keep], opacities[keep]
+    )
+    np.testing.assert_array_equal(buffer, expected[0])
+    assert bounds == expected[1]
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from splat_sequence import EncodedSequence, SequenceDecoder, SequenceEncoder
+from viser._scene_handles import colors_to_uint8
+
+
+def _frames(num_frames: int, num_gaussians: int) -> list[dict[str, np.ndarray]]:
+    """Gaussians drifting and changing color a little each frame."""
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(-2.0, 3.0, size=(num_gaussians, 3)).astype(np.float32)
+    rgbs = rng.uniform(size=(num_gaussians, 3)).astype(np.float32)
+    opacities = rng.uniform(size=(num_gaussians, 1)).astype(np.float32)
+    covariances = np.tile(np.eye(3, dtype=np.float32) * 0.01, (num_gaussians, 1, 1))
+    frames = []
+    for _ in range(num_frames):
+        frames.append(
+            {
+                "centers": centers.copy(),
+                "rgbs": rgbs.copy(),
+                "opacities": opacities.copy(),
+                "covariances": covariances,
+            }
+        )
+        centers += rng.normal(scale=0.01, size=centers.shape).astype(np.float32)
+        rgbs = np.clip(rgbs + rng.normal(scale=0.05, size=rgbs.shape), 0.0, 1.0)
+        opacities = np.clip(
+            opacities + rng.normal(scale=0.05, size=opacities.shape), 0, 1
+        )
+    return frames
+
+
+def _encode(
+    frames: list[dict[str, np.ndarray]], keyframe_interval: int
+) -> EncodedSequence:
+    encoder = SequenceEncoder(keyframe_interval=keyframe_interval)
+    for frame in frames:
+        encoder.add(frame)  # type: ignore
+    return encoder.finish()
+
+
+def _check_frame(
+    decoded: dict[str, np.ndarray], expected: dict[str, np.ndarray], step: float
+) -> None:
+    # Centers are within half a grid step, up to float32 rounding.
+    np.testing.assert_array_less(
+        np.abs(decoded["centers"] - expected["centers"]), step / 2 + 1e-6
+    )
+    # Colors and opacities decode to the same 8-bit values.
+    np.testing.assert_array_equal(
+        colors_to_uint8(decoded["rgbs"]), colors_to_uint8(expected["rgbs"])
+    )
+    np.testing.assert_array_equal(
+        colors_to_uint8(decoded["opacities"]), colors_to_uint8(expected["opacities"])
+    )
+
+
+@pytest.mark.parametrize("keyframe_interval", [1, 4, 32])
+def test_round_trip(keyframe_interval: int) -> None:
+    frames = _frames(num_frames=10, num_gaussians=500)
+    sequence = _encode(frames, keyframe_interval)
+    assert sequence.num_frames == 10
+    assert sequence.num_gaussians == 500
+
+    decoder = SequenceDecoder(sequence, frames[0]["covariances"])
+    for i, frame in enumerate(frames):
+        _check_frame(decoder.frame(i), frame, sequence.step)  # type: ignore
+
+
+def test_random_access() -> None:
+    frames = _frames(num_frames=13, num_gaussians=200)
+    sequence = _encode(frames, keyframe_interval=4)
+    decoder = SequenceDecoder(sequence, frames[0]["covariances"])
+    # Seek forwards and backwards, within and across keyframes.
+    for i in [7, 2, 12, 3, 3, 8, 0, 11, 4]:
+        _check_frame(decoder.frame(i), frames[i], sequence.step)  # type: ignore
+
+
+def test_serialization() -> None:
+    frames = _frames(num_frames=6, num_gaussians=100)
+    sequence = _encode(frames, keyframe_interval=4)
+    data = sequence.to_bytes()
+    assert EncodedSequence.from_bytes(data) == sequence
+
+    with pytest.raises(ValueError):
+        EncodedSequence.from_bytes(b"not a sequence")
+    with pytest.raises(ValueError):
+        EncodedSequence.from_bytes(data[:-1])
@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+
+from viser.infra._static_files import StaticFileCache, etag_matches
+
+
+def test_static_file_cache(tmp_path: Path) -> None:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<html>" + "hello " * 1000 + "</html>")
+    (tmp_path / "assets" / "index-B1x2c3d4.js").write_text("let x = 1;" * 1000)
+    cache = StaticFileCache(tmp_path)
+    cache.precompress()
+
+    index = cache.get(tmp_path / "index.html")
+    assert index is not None
+    assert index.mime_type == "text/html; charset=utf-8"
+    assert index.cache_control() == "no-cache"
+    assert index.select_encoding("gzip, deflate") == "gzip"
+    assert index.select_encoding("identity") is None
+    assert index.etag_for("gzip") != index.etag_for(None)
+    assert etag_matches(f'W/"other", {index.etag}', index.etag)
+    assert not etag_matches('"other"', index.etag)
+
+    asset = cache.get(tmp_path / "assets" / "index-B1x2c3d4.js")
+    assert asset is not None
+    assert asset.cache_control() == "public, max-age=31536000, immutable"
+
+    assert cache.get(tmp_path / "missing.js") is None
+    assert cache.get(tmp_path / ".." / "outside.js") is None
+
+
+def test_static_file_cache_is_bounded(tmp_path: Path) -> None:
+    for i in range(4):
+        (tmp_path / f"{i}.bin").write_bytes(os.urandom(1024))
+    cache = StaticFileCache(tmp_path, max_bytes=2048)
+    for i in range(4):
+        assert cache.load(tmp_path / f"{i}.bin") is not None
+    assert len(cache._files) == 2
+
+
+def test_static_file_cache_miss_is_not_compressed(tmp_path: Path) -> None:
+    (tmp_path / "index.html").write_text("<html>" + "hello " * 1000 + "</html>")
+    cache = StaticFileCache(tmp_path)
+
+    # Requests before precompression finishes are served as-is...
+    index = cache.get(tmp_path / "index.html")
+    assert index is not None
+    assert index.select_encoding("gzip") is None
+
+    # ...while the file is compressed in the background.
+    compressed = cache.load(tmp_path / "index.html")
+    assert compressed is not None
+    assert compressed.select_encoding("gzip") == "gzip"
+    assert compressed.etag == index.etag
+    assert cache.get(tmp_path / "index.html") is compressed
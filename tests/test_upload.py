@@ -0,0 +1,182 @@
+import time
+from pathlib import Path
+
+import pytest
+
+import viser
+import viser._client_autobuild
+from viser import _messages
+from viser.infra import ClientId
+
+
+def _upload(
+    server: viser.ViserServer,
+    handle: viser.GuiUploadButtonHandle,
+    content: bytes,
+    part_size: int,
+    part_order: list[int] | None = None,
+) -> None:
+    """Send a file to the server the way the client's upload button does."""
+    parts = [content[i : i + part_size] for i in range(0, len(content), part_size)] or [
+        b""
+    ]
+    server.gui._handle_file_transfer_start(
+        ClientId(0),
+        _messages.FileTransferStart(
+            source_component_uuid=handle._impl.uuid,
+            transfer_uuid="transfer",
+            filename="model.splat",
+            mime_type="*/*",
+            part_count=len(parts),
+            size_bytes=len(content),
+        ),
+    )
+    for i in part_order or range(len(parts)):
+        server.gui._handle_file_transfer_part(
+            ClientId(0),
+            _messages.FileTransferPart(
+                source_component_uuid=handle._impl.uuid,
+                transfer_uuid="transfer",
+                part=i,
+                content=parts[i],
+            ),
+        )
+
+
+@pytest.fixture
+def server():
+    # Mock the client autobuild to avoid building the client.
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+    server = viser.ViserServer()
+    yield server
+    server.stop()
+
+
+def test_upload_to_memory(server: viser.ViserServer) -> None:
+    handle = server.gui.add_upload_button("Upload")
+    content = bytes(range(256)) * 10
+    _upload(server, handle, content, part_size=1000, part_order=[2, 0, 1])
+    assert handle.value.name == "model.splat"
+    assert handle.value.content == content
+    assert handle.value.path is None
+    assert handle.value.view is None
+
+
+def test_upload_spooled_to_disk(server: viser.ViserServer) -> None:
+    handle = server.gui.add_upload_button("Upload", spool_to_disk=True)
+    content = bytes(range(256)) * 10
+    _upload(server, handle, content, part_size=1000, part_order=[2, 0, 1])
+
+    first = handle.value
+    assert first.path is not None
+    assert first.path.suffix == ".splat"
+    assert first.path.read_bytes() == content
+    assert first.content == b""
+    assert first.view is not None
+    assert first.view.readonly
+    assert first.view.tobytes() == content
+
+    # The next upload replaces the file.
+    _upload(server, handle, b"", part_size=1000)
+    assert handle.value.view is not None
+    assert handle.value.view.tobytes() == b""
+    assert handle.value.path is not None
+    assert not first.path.exists()
+
+    handle.remove()
+    assert not handle.value.path.exists()
+
+
+def test_unfinished_uploads_are_deleted(server: viser.ViserServer) -> None:
+    handle = server.gui.add_upload_button("Upload", spool_to_disk=True)
+
+    def start_upload() -> Path:
+        server.gui._handle_file_transfer_start(
+            ClientId(0),
+            _messages.FileTransferStart(
+                source_component_uuid=handle._impl.uuid,
+                transfer_uuid="transfer",
+                filename="model.splat",
+                mime_type="*/*",
+                part_count=2,
+                size_bytes=2000,
+            ),
+        )
+        spool_file = server.gui._current_file_upload_states["transfer"]["spool_file"]
+        assert spool_file is not None
+        return Path(spool_file.name)
+
+    # The client disconnects.
+    path = start_upload()
+    assert path.exists()
+    server.gui._abort_file_uploads(client_id=ClientId(0))
+    assert not path.exists()
+    assert server.gui._current_file_upload_states == {}
+
+    # The server stops, with an upload in progress and a finished one.
+    _upload(server, handle, b"x" * 100, part_size=1000)
+    finished_path = handle.value.path
+    assert finished_path is not None and finished_path.exists()
+    path = start_upload()
+    server.stop()
+    assert not path.exists()
+    assert not finished_path.exists()
+
+
+def test_remove_button_during_upload(server: viser.ViserServer) -> None:
+    handle = server.gui.add_upload_button("Upload", spool_to_disk=True)
+    content = b"x" * 2500
+    _upload(server, handle, content[:1000], part_size=1000)
+    path = handle.value.path
+    assert path is not None
+
+    server.gui._handle_file_transfer_start(
+        ClientId(0),
+        _messages.FileTransferStart(
+            source_component_uuid=handle._impl.uuid,
+            transfer_uuid="transfer",
+            filename="model.splat",
+            mime_type="*/*",
+            part_count=3,
+            size_bytes=len(content),
+        ),
+    )
+    spool_file = server.gui._current_file_upload_states["transfer"]["spool_file"]
+    assert spool_file is not None
+    handle.remove()
+    assert not path.exists()
+    assert not Path(spool_file.name).exists()
+
+    # Parts that arrive later are ignored.
+    server.gui._handle_file_transfer_part(
+        ClientId(0),
+        _messages.FileTransferPart(
+            source_component_uuid=handle._impl.uuid,
+            transfer_uuid="transfer",
+            part=1,
+            content=content[1000:2000],
+        ),
+    )
+
+
+def test_upload_progress(server: viser.ViserServer, monkeypatch) -> None:
+    client = object()
+    monkeypatch.setattr(server.gui, "_get_client", lambda client_id: client)
+    handle = server.gui.add_upload_button("Upload", spool_to_disk=True)
+    events: list[viser.GuiUploadProgressEvent] = []
+    handle.on_upload_progress(events.append)
+    uploads: list[viser.GuiEvent] = []
+    handle.on_upload(uploads.append)
+
+    _upload(server, handle, b"x" * 2500, part_size=1000)
+    for _ in range(100):
+        if len(events) == 3 and len(uploads) == 1:
+            break
+        time.sleep(0.01)
+
+    assert sorted(event.transferred_bytes for event in events) == [1000, 2000, 2500]
+    assert all(event.total_bytes == 2500 for event in events)
+    assert all(event.filename == "model.splat" for event in events)
+    assert all(event.target is handle for event in events)
+    assert uploads[0].client is client
+    handle.remove()
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class StageTimings:
+    """Thread-safe record of how long each stage of a pipeline took."""
+
+    def __init__(self) -> None:
+        self._durations: defaultdict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._durations[stage].append(seconds)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start_time)
+
+    def summary(self) -> str:
+        with self._lock:
+            durations = dict(self._durations)
+        return "\n".join(
+            f"{stage:>10}: n={len(seconds):<5} total={sum(seconds):8.2f}s "
+            f"mean={sum(seconds) / len(seconds) * 1000:8.1f}ms "
+            f"max={max(seconds) * 1000:8.1f}ms"
+            for stage, seconds in durations.items()
+        )
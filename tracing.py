@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import threading
+import time
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+# Shared, reusable no-op span. Returned whenever no job is being traced.
+_NO_SPAN: AbstractContextManager[None] = contextlib.nullcontext()
+
+_active_trace: Trace | None = None
+
+
+def enabled() -> bool:
+    """Tracing is on when TRACE_DIR is set. Read lazily, after `.env` is loaded."""
+    return bool(os.getenv("TRACE_DIR"))
+
+
+@dataclass(frozen=True)
+class SpanRecord:
+    name: str
+    category: str
+    start: float
+    end: float
+    lane: str
+    args: dict[str, Any]
+
+
+@dataclass
+class Trace:
+    """Spans recorded while one job ran, from any thread or LLM task."""
+
+    name: str
+    start: float = field(default_factory=time.perf_counter)
+    end: float | None = None
+    spans: list[SpanRecord] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, span: SpanRecord) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Trace Event Format, for chrome://tracing or ui.perfetto.dev."""
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        tid_from_lane: dict[str, int] = {}
+        events: list[dict[str, Any]] = []
+        for span in spans:
+            if span.lane not in tid_from_lane:
+                tid_from_lane[span.lane] = len(tid_from_lane)
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": tid_from_lane[span.lane],
+                        "args": {"name": span.lane},
+                    }
+                )
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": (span.start - self.start) * 1e6,
+                    "dur": (span.end - span.start) * 1e6,
+                    "pid": pid,
+                    "tid": tid_from_lane[span.lane],
+                    "args": span.args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def stage_times(self) -> dict[str, tuple[int, float, float]]:
+        """Maps each span category to its span count, summed span time, and wall
+        time. Wall time counts overlapping spans, like concurrent LLM calls, once."""
+        with self._lock:
+            spans = list(self.spans)
+        stages: dict[str, tuple[int, float, float]] = {}
+        for category in sorted({span.category for span in spans}):
+            intervals = sorted(
+                (span.start, span.end) for span in spans if span.category == category
+            )
+            busy = sum(end - start for start, end in intervals)
+            wall = 0.0
+            covered_until = -float("inf")
+            for start, end in intervals:
+                if end > covered_until:
+                    wall += end - max(start, covered_until)
+                    covered_until = end
+            stages[category] = (len(intervals), busy, wall)
+        return stages
+
+    def summary_markdown(self) -> str:
+        total_seconds = (self.end or time.perf_counter()) - self.start
+        rows = "\n".join(
+            f"| {category} | {count} | {busy:.1f}s | {wall:.1f}s |"
+            for category, (count, busy, wall) in self.stage_times().items()
+        )
+        return (
+            f"**{self.name}**: {total_seconds:.1f}s\n\n"
+            "| Stage | Spans | Busy | Wall |\n| --- | --- | --- | --- |\n" + rows
+        )
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_category", "_args", "_start")
+
+    def __init__(
+        self, trace: Trace, name: str, category: str, args: dict[str, Any]
+    ) -> None:
+        self._trace = trace
+        self._name = name
+        self._category = category
+        self._args = args
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._trace.add(
+            SpanRecord(
+                self._name,
+                self._category,
+                self._start,
+                time.perf_counter(),
+                _current_lane(),
+                self._args,
+            )
+        )
+
+
+def span(name: str, category: str, **args: Any) -> AbstractContextManager[None]:
+    """Time a block as part of the job being traced, if any. `category` is the
+    pipeline stage the span is summarized under."""
+    trace = _active_trace
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name, category, args)
+
+
+@contextmanager
+def trace_job(name: str) -> Iterator[Trace | None]:
+    """Trace a job, like `auto_sample`, and write it to TRACE_DIR as Chrome trace
+    JSON. Yields None, and records nothing, when tracing is disabled."""
+    global _active_trace
+    if not enabled() or _active_trace is not None:
+        yield None
+        return
+
+    trace = Trace(name)
+    _active_trace = trace
+    try:
+        yield trace
+    finally:
+        _active_trace = None
+        trace.end = time.perf_counter()
+        trace_dir = os.environ["TRACE_DIR"]
+        os.makedirs(trace_dir, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        with open(f"{trace_dir}/{name}_{timestamp}.json", "w") as file:
+            json.dump(trace.to_chrome_trace(), file)
+
+
+def _current_lane() -> str:
+    """Concurrent LLM requests share a thread, so each task gets its own lane."""
+    lane = threading.current_thread().name
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        lane += f"/{task.get_name()}"
+    return lane